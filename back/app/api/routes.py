@@ -1,28 +1,65 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 import logging
+import os
 
-from app.models.database import get_db, FarmProfile, NFTCertificate
+from app.core.profiling import MemorySnapshots, ProfileStore, is_admin
+from app.core.responses import FastJSONResponse
+from app.core.tracing import SPAN_KIND_SERVER, span, traced
+from app.models.database import get_db, NFTCertificate
 from app.models.schemas import (
     WaterUsageData,
     WaterUsageResponse,
+    BulkIngestResponse,
+    UsageAnomalyInfo,
+    AnomalyBaseline,
+    UsageAnchorInfo,
+    TransferOrderRequest,
+    TransferOrderInfo,
+    CreditSettlementInfo,
+    UsageProofResponse,
     DashboardResponse,
     FarmStatistics,
+    FarmPeriodHistory,
     NFTMintResponse,
-    TokenBalance
+    TokenBalance,
+    EfficiencyReport,
+    FarmForecast,
+    ForecastReport,
+    BurnRequest
 )
 from app.services.water_service import WaterManagementService
-from app.services.solana_service import solana_service
-from app.services.real_nft_service import production_nft_service
-from app.services.watercredits_service import watercredits_service
+from app.services.idempotency import ReadingInFlight
+from app.services.ingest_guard import ingest_guard
+from app.services.farm_ledger import farm_ledger
+from app.services.traffic_capture import traffic_capture
+from app.services.sensor_listener import sensor_listener_status
+from app.services.bulk_ingest import (
+    BulkIngestService,
+    MSGPACK_CONTENT_TYPES,
+    NDJSON_CONTENT_TYPES,
+    iter_msgpack,
+    iter_ndjson,
+    msgpack_available
+)
+from app.services.export_service import UsageExportService, EXPORT_FORMATS
+from app.services.efficiency_service import EfficiencyService
+from app.services.forecast_service import ForecastService
+from app.services.heatmap_service import HeatmapService
+from app.services.anchor_service import AnchorService
+from app.services.transfer_service import CreditsUnavailable, TransferService
+from app.services.anomaly_service import ANOMALY_KINDS, AnomalyService, anomaly_detector
+from app.services.chain import get_nft_service, get_watercredits_service, loaded_chain_service
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
 @router.post("/water-usage", response_model=WaterUsageResponse)
+@traced("POST /api/water-usage", SPAN_KIND_SERVER)
 async def record_water_usage(
     usage_data: WaterUsageData,
     db: Session = Depends(get_db)
@@ -32,10 +69,33 @@ async def record_water_usage(
 
     This endpoint receives water consumption data from the oracle,
     calculates tokens consumed, and records the transaction on Solana devnet.
+
+    Readings are rate limited per farm and globally (429 with Retry-After),
+    and shed with 503 while ingestion is overloaded. A retry that arrives
+    while the original is still being recorded gets 409 with Retry-After.
     """
+    with span("ingest.admit", farm_id=usage_data.farm_id) as admit_span:
+        rejection = ingest_guard.admit(usage_data.farm_id)
+        admit_span.set_attribute("admitted", rejection is None)
+    if rejection:
+        raise HTTPException(
+            status_code=rejection.status_code,
+            detail=rejection.detail,
+            headers={"Retry-After": str(rejection.retry_after)}
+        )
+
     try:
-        result = await WaterManagementService.record_usage(db, usage_data)
+        with ingest_guard.track():
+            result = await WaterManagementService.record_usage(db, usage_data)
+        if traffic_capture:
+            traffic_capture.record([usage_data])
         return WaterUsageResponse(**result)
+    except ReadingInFlight as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
         logger.error(f"Error in record_water_usage: {e}")
         raise HTTPException(
@@ -44,14 +104,88 @@ async def record_water_usage(
         )
 
 
+@router.post("/water-usage/bulk", response_model=BulkIngestResponse)
+@traced("POST /api/water-usage/bulk", SPAN_KIND_SERVER)
+async def bulk_record_water_usage(
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """
+    Record a backlog of readings from a field gateway
+
+    The body is streamed as NDJSON (application/x-ndjson, one reading per
+    line) or as consecutive msgpack maps (application/msgpack). Readings are
+    parsed as the body arrives and recorded in batches, so memory use does
+    not grow with the upload size.
+
+    Returns per-line counts: accepted, duplicates (already recorded), and
+    rejected by reason (malformed, invalid, failed, overloaded), with the
+    first few errors. While ingestion is overloaded the upload is slowed
+    down; if it stays overloaded, resume_from_line tells the gateway where
+    to resend from.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in NDJSON_CONTENT_TYPES:
+        items = iter_ndjson(request.stream())
+    elif content_type in MSGPACK_CONTENT_TYPES:
+        if not msgpack_available():
+            raise HTTPException(
+                status_code=status.HTTP_501_NOT_IMPLEMENTED,
+                detail="Msgpack uploads require msgpack to be installed"
+            )
+        items = iter_msgpack(request.stream())
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Content-Type must be application/x-ndjson or application/msgpack"
+        )
+
+    try:
+        result = await BulkIngestService.ingest(db, items)
+        return BulkIngestResponse(**result)
+    except Exception as e:
+        logger.error(f"Error in bulk_record_water_usage: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to ingest bulk upload: {str(e)}"
+        )
+
+
 @router.get("/dashboard", response_model=DashboardResponse)
-async def get_dashboard(db: Session = Depends(get_db)):
+async def get_dashboard(
+    layout: str = "rows",
+    since: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
     """
     Get dashboard data for frontend
 
     Returns aggregated water usage data, farm statistics,
     and 30-day usage history for visualization.
+
+    The payload is built from trusted internal data and encoded once with
+    orjson, skipping response model re-validation.
+
+    Args:
+        layout: "rows" for a list of history records, or "columnar" for
+            parallel arrays (farm_id, timestamp, water_liters, ...) that
+            charts can consume directly
+        since: Cursor from a previous response. When given, only farms
+            with new readings and history added after the cursor are
+            returned (totals still cover all farms)
     """
+    if layout not in ("rows", "columnar"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Layout must be one of: rows, columnar"
+        )
+
+    if since is not None and since < 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor must be non-negative"
+        )
+
     try:
         # Get all farm statistics
         farms = WaterManagementService.get_all_statistics(db)
@@ -65,16 +199,30 @@ async def get_dashboard(db: Session = Depends(get_db)):
         overall_status = "economy" if overall_percentage <= 100 else "overspend"
 
         # Get usage history
-        history = WaterManagementService.get_usage_history(db, days=30)
+        if since is not None:
+            delta = WaterManagementService.get_usage_delta(
+                db, since, days=30, columnar=(layout == "columnar")
+            )
+            farms = [farm for farm in farms if farm.farm_id in delta["farm_ids"]]
+            history = delta["history"]
+            cursor = delta["cursor"]
+        else:
+            cursor = WaterManagementService.get_latest_record_id(db)
+            if layout == "columnar":
+                history = WaterManagementService.get_usage_history_columns(db, days=30, until_id=cursor)
+            else:
+                history = WaterManagementService.get_usage_history(db, days=30, until_id=cursor)
 
-        return DashboardResponse(
-            farms=farms,
-            total_water_used=total_water_used,
-            total_limit=total_limit,
-            overall_status=overall_status,
-            last_updated=datetime.now(),
-            water_usage_history=history
-        )
+        return FastJSONResponse({
+            "farms": [farm.model_dump() for farm in farms],
+            "total_water_used": total_water_used,
+            "total_limit": total_limit,
+            "overall_status": overall_status,
+            "last_updated": datetime.now(),
+            "water_usage_history": history,
+            "cursor": cursor,
+            "delta": since is not None
+        })
     except Exception as e:
         logger.error(f"Error in get_dashboard: {e}")
         raise HTTPException(
@@ -83,6 +231,63 @@ async def get_dashboard(db: Session = Depends(get_db)):
         )
 
 
+@router.get("/export/usage")
+async def export_usage(
+    farm_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    format: str = "csv"
+):
+    """
+    Export raw water usage history
+
+    Streams records as CSV or Parquet in fixed-size chunks read from a
+    server-side cursor, so the result set is never held in memory.
+
+    Args:
+        farm_id: Optional farm filter (1-10)
+        start: Inclusive start of the time range
+        end: Exclusive end of the time range
+        format: "csv" or "parquet"
+    """
+    if farm_id is not None and (farm_id < 1 or farm_id > 10):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Farm ID must be between 1 and 10"
+        )
+
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Format must be one of: {', '.join(EXPORT_FORMATS)}"
+        )
+
+    if start and end and start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Start must be before end"
+        )
+
+    if format == "parquet":
+        if not UsageExportService.parquet_available():
+            raise HTTPException(
+                status_code=status.HTTP_501_NOT_IMPLEMENTED,
+                detail="Parquet export requires pyarrow to be installed"
+            )
+        stream = UsageExportService.stream_parquet(farm_id, start, end)
+    else:
+        stream = UsageExportService.stream_csv(farm_id, start, end)
+
+    scope = f"farm_{farm_id}" if farm_id is not None else "all_farms"
+    filename = f"water_usage_{scope}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format}"
+
+    return StreamingResponse(
+        stream,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 @router.get("/farms/{farm_id}/statistics", response_model=FarmStatistics)
 async def get_farm_statistics(farm_id: int, db: Session = Depends(get_db)):
     """Get statistics for a specific farm"""
@@ -103,11 +308,88 @@ async def get_farm_statistics(farm_id: int, db: Session = Depends(get_db)):
         )
 
 
+@router.get("/farms/{farm_id}/periods", response_model=FarmPeriodHistory)
+async def get_farm_periods(farm_id: int, limit: int = 12, db: Session = Depends(get_db)):
+    """
+    Get a farm's usage per accounting period (month), most recent first
+
+    Args:
+        farm_id: Farm ID (1-10)
+        limit: Number of periods to return (1-120)
+    """
+    if farm_id < 1 or farm_id > 10:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Farm ID must be between 1 and 10"
+        )
+
+    if limit < 1 or limit > 120:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Limit must be between 1 and 120"
+        )
+
+    try:
+        return WaterManagementService.get_period_history(db, farm_id, limit)
+    except Exception as e:
+        logger.error(f"Error getting farm periods: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get farm periods: {str(e)}"
+        )
+
+
+@router.get("/forecast", response_model=ForecastReport)
+async def get_forecast(db: Session = Depends(get_db)):
+    """
+    Get quota burn-down forecast for all farms
+
+    Projects each farm's usage to the end of the current period and the
+    time it is expected to cross its water limit.
+    """
+    try:
+        return ForecastService.get_report(db)
+    except Exception as e:
+        logger.error(f"Error computing forecast: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to compute forecast: {str(e)}"
+        )
+
+
+@router.get("/farms/{farm_id}/forecast", response_model=FarmForecast)
+async def get_farm_forecast(farm_id: int, db: Session = Depends(get_db)):
+    """Get quota burn-down forecast for a specific farm"""
+    if farm_id < 1 or farm_id > 10:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Farm ID must be between 1 and 10"
+        )
+
+    try:
+        forecast = ForecastService.get_farm_forecast(db, farm_id)
+    except Exception as e:
+        logger.error(f"Error computing farm forecast: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to compute forecast: {str(e)}"
+        )
+
+    if forecast is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Farm {farm_id} not found"
+        )
+    return forecast
+
+
 @router.post("/nft/mint", response_model=NFTMintResponse)
+@traced("POST /api/nft/mint", SPAN_KIND_SERVER)
 async def mint_nft_certificate(
     farm_id: int,
     water_consumed: float,
-    efficiency_score: float = 0.95,
+    efficiency_score: Optional[float] = None,
+    x_admin_token: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """
@@ -119,8 +401,27 @@ async def mint_nft_certificate(
     - Generated certificate image
     - On-chain transaction
     - Stored in database
+
+    The efficiency score is computed from the farm's usage history for the
+    current period. Only requests carrying the X-Admin-Token may pass one
+    explicitly.
     """
+    if efficiency_score is not None and not is_admin(x_admin_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin token required to set efficiency_score"
+        )
+
     try:
+        if efficiency_score is None:
+            with span("efficiency.score", farm_id=farm_id):
+                efficiency_score = EfficiencyService.get_farm_score(db, farm_id)
+            if efficiency_score is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Farm {farm_id} not found"
+                )
+
         metadata = {
             "farm_id": farm_id,
             "water_consumed_liters": water_consumed,
@@ -130,7 +431,7 @@ async def mint_nft_certificate(
         }
 
         # Mint real NFT on Solana
-        result = await production_nft_service.mint_nft_certificate(
+        result = await get_nft_service().mint_nft_certificate(
             farm_id=farm_id,
             water_consumed=water_consumed,
             efficiency_score=efficiency_score,
@@ -157,8 +458,9 @@ async def mint_nft_certificate(
             network=result["network"]
         )
         db.add(nft_record)
-        db.commit()
-        db.refresh(nft_record)
+        with span("db.commit"):
+            db.commit()
+            db.refresh(nft_record)
 
         logger.info(f"✅ NFT saved to database: {result['nft_address']}")
 
@@ -177,6 +479,60 @@ async def mint_nft_certificate(
         )
 
 
+@router.get("/efficiency", response_model=EfficiencyReport)
+async def get_efficiency(period: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Get water efficiency scores for all farms
+
+    Scores are computed from hourly usage rollups, normalized for weather,
+    and cached per period until new readings arrive.
+
+    Args:
+        period: Accounting period as YYYY-MM (default: current month)
+    """
+    try:
+        return EfficiencyService.get_report(db, period)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error computing efficiency: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to compute efficiency: {str(e)}"
+        )
+
+
+@router.get("/analytics/heatmap")
+async def get_heatmap(period: Optional[str] = None, by: str = "hour", db: Session = Depends(get_db)):
+    """
+    Get a farms × hour-of-day (or × day-of-week) consumption heatmap
+
+    Built from hourly usage rollups and cached per period until new readings
+    arrive. Rows follow farm_ids and columns follow columns; mean_liters is
+    liters per reading, null where a farm has no readings.
+
+    Args:
+        period: Accounting period as YYYY-MM (default: current month)
+        by: "hour" (24 columns) or "weekday" (7 columns, Monday first)
+    """
+    try:
+        return FastJSONResponse(HeatmapService.get_heatmap(db, period, by))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error computing heatmap: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to compute heatmap: {str(e)}"
+        )
+
+
 @router.get("/farms/{farm_id}/nfts")
 async def get_farm_nfts(farm_id: int, db: Session = Depends(get_db)):
     """Get all NFT certificates for a farm"""
@@ -222,7 +578,7 @@ async def get_token_balance(farm_id: int, db: Session = Depends(get_db)):
         )
 
     try:
-        farm = db.query(FarmProfile).filter(FarmProfile.farm_id == farm_id).first()
+        farm = farm_ledger.get(db, farm_id)
 
         if not farm:
             return TokenBalance(
@@ -232,14 +588,15 @@ async def get_token_balance(farm_id: int, db: Session = Depends(get_db)):
                 total_minted=0.0
             )
 
-        # Mock calculation: balance = limit - consumed
-        balance = max(0, farm.water_limit - farm.total_water_used)
+        # Mock calculation: balance = this period's quota - consumed
+        stats = WaterManagementService.get_farm_statistics(db, farm_id)
+        balance = max(0, stats.water_limit - stats.total_water_used)
 
         return TokenBalance(
             farm_id=farm.farm_id,
             balance=balance,
-            total_consumed=farm.total_tokens_consumed,
-            total_minted=farm.water_limit
+            total_consumed=stats.tokens_consumed,
+            total_minted=stats.water_limit
         )
     except Exception as e:
         logger.error(f"Error getting token balance: {e}")
@@ -251,11 +608,16 @@ async def get_token_balance(farm_id: int, db: Session = Depends(get_db)):
 
 @router.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (never builds the chain services)"""
+    watercredits = loaded_chain_service("watercredits")
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "solana_network": "devnet"
+        "solana_network": "devnet",
+        "balance_cache": watercredits.balance_cache_status() if watercredits else None,
+        "ingestion": ingest_guard.status(),
+        "sensor_listener": sensor_listener_status(),
+        "farm_ledger": farm_ledger.status()
     }
 
 
@@ -272,7 +634,7 @@ async def create_watercredits_token():
     Should be called once during initial setup.
     """
     try:
-        result = await watercredits_service.create_watercredits_token()
+        result = await get_watercredits_service().create_watercredits_token()
 
         if not result.get("success"):
             raise HTTPException(
@@ -307,7 +669,7 @@ async def mint_quota_to_farmer(farm_id: int, amount: float = 100000.0):
         )
 
     try:
-        result = await watercredits_service.mint_quota_to_farmer(farm_id, amount)
+        result = await get_watercredits_service().mint_quota_to_farmer(farm_id, amount)
 
         if not result.get("success"):
             raise HTTPException(
@@ -342,7 +704,7 @@ async def burn_watercredits(farm_id: int, water_liters: float):
         )
 
     try:
-        result = await watercredits_service.burn_on_water_usage(farm_id, water_liters)
+        result = await get_watercredits_service().burn_on_water_usage(farm_id, water_liters)
 
         if not result.get("success"):
             raise HTTPException(
@@ -361,6 +723,70 @@ async def burn_watercredits(farm_id: int, water_liters: float):
         )
 
 
+@router.post("/watercredits/burn-batch")
+async def burn_watercredits_batch(burns: List[BurnRequest]):
+    """
+    Burn WaterCredits for many farms at once
+
+    Burns are packed into v0 versioned transactions using the address
+    lookup table, so one transaction carries many burns.
+    """
+    if not burns:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one burn is required"
+        )
+
+    try:
+        result = await get_watercredits_service().burn_batch(
+            [(burn.farm_id, burn.water_liters) for burn in burns]
+        )
+
+        if not result.get("success"):
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=result.get("error", "Failed to burn tokens")
+            )
+
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in batch burn: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to burn tokens: {str(e)}"
+        )
+
+
+@router.post("/watercredits/lookup-table")
+async def setup_lookup_table():
+    """
+    Create and populate the address lookup table (run once, re-run to add farms)
+
+    Holds the WaterCredits mint, farm token accounts and program IDs so
+    v0 batch transactions can reference them by 1-byte index.
+    """
+    try:
+        result = await get_watercredits_service().setup_lookup_table(list(range(1, 11)))
+
+        if not result.get("success"):
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=result.get("error", "Failed to set up lookup table")
+            )
+
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error setting up lookup table: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to set up lookup table: {str(e)}"
+        )
+
+
 @router.get("/watercredits/balance/{farm_id}")
 async def get_watercredits_balance(farm_id: int):
     """
@@ -376,7 +802,7 @@ async def get_watercredits_balance(farm_id: int):
         )
 
     try:
-        result = await watercredits_service.get_balance(farm_id)
+        result = await get_watercredits_service().get_balance(farm_id)
         return result
     except Exception as e:
         logger.error(f"Error getting balance: {e}")
@@ -400,7 +826,7 @@ async def get_token_info():
     - Token features and properties
     """
     try:
-        info = watercredits_service.get_token_info()
+        info = get_watercredits_service().get_token_info()
         return info
     except Exception as e:
         logger.error(f"Error getting token info: {e}")
@@ -408,3 +834,405 @@ async def get_token_info():
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get token info: {str(e)}"
         )
+
+
+@router.get("/transactions/stats")
+async def get_transaction_stats():
+    """
+    Landing statistics for chain writes
+
+    Per service: landing rate, average broadcasts per transaction, how many
+    needed a fresh blockhash, p50/p95 latency and the most recent sends.
+    """
+    try:
+        return {
+            "watercredits": get_watercredits_service().transaction_stats(),
+            "nft": get_nft_service().transaction_stats()
+        }
+    except Exception as e:
+        logger.error(f"Error getting transaction stats: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get transaction stats: {str(e)}"
+        )
+
+
+# ============================================================================
+# Admin Profiling Endpoints
+# ============================================================================
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Allow only requests carrying the configured X-Admin-Token"""
+    if not is_admin(x_admin_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin token required"
+        )
+
+
+@router.get("/admin/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    """
+    Stored request profiles, newest first
+
+    Profile a request by sending `X-Profile: 1` (or `?profile=1`) together
+    with `X-Admin-Token` to /api/dashboard, /api/water-usage or
+    /api/nft/mint; the profile ID comes back in the X-Profile-Id header.
+    """
+    return {"profiles": ProfileStore.list_profiles()}
+
+
+@router.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def get_profile(profile_id: str, format: str = "folded", limit: int = 20):
+    """
+    A stored profile
+
+    Args:
+        format: "folded" (flame graph input for flamegraph.pl / speedscope)
+                or "summary" (top functions by inclusive and self time)
+        limit: Functions in the summary (1-200)
+    """
+    if format not in ("folded", "summary"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Format must be 'folded' or 'summary'"
+        )
+    if limit < 1 or limit > 200:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Limit must be between 1 and 200"
+        )
+
+    folded = ProfileStore.read(profile_id)
+    if folded is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Profile {profile_id} not found"
+        )
+
+    if format == "folded":
+        return PlainTextResponse(folded)
+    return {"id": profile_id, "functions": ProfileStore.top_functions(folded, limit)}
+
+
+@router.post("/admin/memory/snapshots", dependencies=[Depends(require_admin)])
+async def take_memory_snapshot(limit: int = 20):
+    """
+    Take a tracemalloc snapshot of this worker
+
+    The first snapshot starts tracing, so only allocations made after it are
+    seen; take a baseline, exercise the API, then diff a second snapshot.
+    """
+    try:
+        return MemorySnapshots.take(max(1, min(limit, 200)))
+    except Exception as e:
+        logger.error(f"Error taking memory snapshot: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to take memory snapshot: {str(e)}"
+        )
+
+
+@router.get("/admin/memory/snapshots", dependencies=[Depends(require_admin)])
+async def list_memory_snapshots():
+    """IDs of this worker's memory snapshots"""
+    return {"pid": os.getpid(), "snapshots": MemorySnapshots.list_ids()}
+
+
+@router.get("/admin/memory/diff", dependencies=[Depends(require_admin)])
+async def diff_memory_snapshots(from_id: int, to_id: int, limit: int = 20):
+    """Allocation growth between two snapshots, by source line"""
+    diff = MemorySnapshots.diff(from_id, to_id, max(1, min(limit, 200)))
+    if diff is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Snapshots {from_id} and {to_id} not found in worker {os.getpid()}"
+        )
+    return diff
+
+
+@router.delete("/admin/memory/snapshots", dependencies=[Depends(require_admin)])
+async def stop_memory_tracing():
+    """Stop tracemalloc and drop this worker's snapshots"""
+    MemorySnapshots.stop()
+    return {"success": True}
+
+
+# ============================================================================
+# Anchoring Endpoints
+# ============================================================================
+
+@router.get("/water-usage/proof", response_model=UsageProofResponse)
+async def get_usage_proof(
+    record_id: Optional[int] = None,
+    reading_key: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Inclusion proof of a usage record in its anchored Merkle root
+
+    Look the record up by ID or by reading key ("<farm_id>#<reading_id>",
+    or "<farm_id>@<timestamp>" for readings sent without an ID). Check the
+    proof offline with scripts/verify_proof.py.
+    """
+    if (record_id is None) == (reading_key is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Give exactly one of record_id or reading_key"
+        )
+
+    try:
+        proof = AnchorService.get_proof(db, record_id=record_id, reading_key=reading_key)
+    except Exception as e:
+        logger.error(f"Error getting usage proof: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get usage proof: {str(e)}"
+        )
+
+    if proof is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Record not found or not anchored yet"
+        )
+    return UsageProofResponse(**proof)
+
+
+@router.get("/anchors", response_model=List[UsageAnchorInfo])
+async def list_anchors(limit: int = 50, db: Session = Depends(get_db)):
+    """Most recent anchored windows, newest first"""
+    if limit < 1 or limit > 500:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Limit must be between 1 and 500"
+        )
+    return AnchorService.list_anchors(db, limit)
+
+
+@router.post("/admin/anchors/run", dependencies=[Depends(require_admin)])
+async def run_anchoring(db: Session = Depends(get_db)):
+    """Anchor closed windows and post pending memos now, without waiting for the scheduler"""
+    if not AnchorService.enabled():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Anchoring is disabled (ANCHOR_WINDOW_MINUTES=0)"
+        )
+    try:
+        return await AnchorService.run(db)
+    except Exception as e:
+        logger.error(f"Error running anchoring: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to run anchoring: {str(e)}"
+        )
+
+
+# ============================================================================
+# Anomaly Endpoints
+# ============================================================================
+
+def _check_anomaly_filters(farm_id: Optional[int], kind: Optional[str] = None):
+    if farm_id is not None and (farm_id < 1 or farm_id > 10):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Farm ID must be between 1 and 10"
+        )
+    if kind is not None and kind not in ANOMALY_KINDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Kind must be one of: {', '.join(ANOMALY_KINDS)}"
+        )
+
+
+@router.get("/anomalies", response_model=List[UsageAnomalyInfo])
+async def list_anomalies(
+    farm_id: Optional[int] = None,
+    kind: Optional[str] = None,
+    since: Optional[datetime] = None,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    """
+    Readings flagged by the streaming anomaly detector, newest first
+
+    Args:
+        farm_id: Optional farm filter (1-10)
+        kind: "spike", "night_flow" or "rain_usage"
+        since: Only readings taken at or after this time
+        limit: Maximum anomalies returned (1-1000)
+    """
+    _check_anomaly_filters(farm_id, kind)
+    if limit < 1 or limit > 1000:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Limit must be between 1 and 1000"
+        )
+
+    try:
+        return AnomalyService.list_anomalies(db, farm_id, kind, since, limit)
+    except Exception as e:
+        logger.error(f"Error listing anomalies: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to list anomalies: {str(e)}"
+        )
+
+
+@router.get("/anomalies/stream")
+async def stream_anomalies(
+    request: Request,
+    farm_id: Optional[int] = None,
+    last_event_id: Optional[int] = Header(None)
+):
+    """
+    Live anomalies as server-sent events ("anomaly" events, JSON data)
+
+    Starts with anomalies flagged after the connection opens, or after
+    Last-Event-ID when the client reconnects.
+    """
+    _check_anomaly_filters(farm_id)
+    return StreamingResponse(
+        AnomalyService.stream(request.is_disconnected, last_event_id, farm_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/anomalies/baselines", response_model=List[AnomalyBaseline])
+async def get_anomaly_baselines(farm_id: Optional[int] = None):
+    """Usage baselines learned by this worker, per farm, hour of day and weather"""
+    _check_anomaly_filters(farm_id)
+    return anomaly_detector.baselines(farm_id)
+
+
+# ============================================================================
+# Transfer Endpoints
+# ============================================================================
+
+TRANSFER_STATUSES = ("open", "settling", "settled", "cancelled")
+
+
+@router.post("/transfers", response_model=TransferOrderInfo)
+async def create_transfer(request: TransferOrderRequest, db: Session = Depends(get_db)):
+    """
+    Request a WaterCredits transfer from one farm to another
+
+    The order is settled with all other open orders at the next settlement,
+    netted into as few on-chain transfers as possible.
+    """
+    for farm_id in (request.from_farm_id, request.to_farm_id):
+        if farm_id < 1 or farm_id > 10:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Farm ID must be between 1 and 10"
+            )
+    if request.from_farm_id == request.to_farm_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot transfer to the same farm"
+        )
+
+    try:
+        return await TransferService.create_order(db, request)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except CreditsUnavailable as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error creating transfer order: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create transfer order: {str(e)}"
+        )
+
+
+@router.get("/transfers", response_model=List[TransferOrderInfo])
+async def list_transfers(
+    farm_id: Optional[int] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    """Transfer orders, newest first, optionally for one farm (paying or receiving)"""
+    if farm_id is not None and (farm_id < 1 or farm_id > 10):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Farm ID must be between 1 and 10"
+        )
+    if status_filter is not None and status_filter not in TRANSFER_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Status must be one of: {', '.join(TRANSFER_STATUSES)}"
+        )
+    if limit < 1 or limit > 1000:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Limit must be between 1 and 1000"
+        )
+    return TransferService.list_orders(db, farm_id, status_filter, limit)
+
+
+@router.delete("/transfers/{order_id}", response_model=TransferOrderInfo)
+async def cancel_transfer(order_id: int, db: Session = Depends(get_db)):
+    """Cancel a transfer order that has not been picked up by a settlement yet"""
+    order = TransferService.cancel_order(db, order_id)
+    if order is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Transfer order not found"
+        )
+    if order.status != "cancelled":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Transfer order is already {order.status}"
+        )
+    return order
+
+
+@router.get("/settlements", response_model=List[CreditSettlementInfo])
+async def list_settlements(limit: int = 50, db: Session = Depends(get_db)):
+    """Most recent settlements of transfer orders, newest first"""
+    if limit < 1 or limit > 500:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Limit must be between 1 and 500"
+        )
+    return TransferService.list_settlements(db, limit)
+
+
+@router.post("/admin/settlements/{settlement_id}/cancel", response_model=CreditSettlementInfo,
+             dependencies=[Depends(require_admin)])
+async def cancel_settlement(settlement_id: int, db: Session = Depends(get_db)):
+    """Give up on a failed or pending settlement and return its orders to the book"""
+    try:
+        settlement = TransferService.cancel_settlement(db, settlement_id)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    if settlement is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Settlement not found"
+        )
+    return TransferService.settlement_summary(settlement)
+
+
+@router.post("/admin/settlements/run", dependencies=[Depends(require_admin)])
+async def run_settlement(db: Session = Depends(get_db)):
+    """Net open transfer orders and send pending settlements now, without waiting for the scheduler"""
+    try:
+        return await TransferService.run(db)
+    except Exception as e:
+        logger.error(f"Error running settlement: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to run settlement: {str(e)}"
+        )
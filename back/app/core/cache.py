@@ -0,0 +1,134 @@
+"""
+Ingest-aware result caches
+
+Every accepted reading bumps the generation of its accounting period.
+Cached analytics are stored per period together with the generation they
+were computed at, and are recomputed only after that period sees new data.
+
+With several workers the counters live in a small memory-mapped file
+(SHARED_STATE_PATH), so a reading ingested by one worker invalidates the
+caches of all of them.
+"""
+
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections import defaultdict
+from typing import Any, Callable, Dict, Tuple
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+class _LocalGenerations:
+    """Per-process generation counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generations: Dict[str, int] = defaultdict(int)
+
+    def bump(self, period: str) -> int:
+        with self._lock:
+            self._generations[period] += 1
+            return self._generations[period]
+
+    def get(self, period: str) -> int:
+        return self._generations[period]
+
+
+class _SharedGenerations:
+    """
+    Generation counters shared between processes through an mmap'd file
+
+    Periods hash into a fixed table of u64 slots. A collision only causes
+    an extra invalidation, never a stale read.
+    """
+
+    SLOTS = 4096
+
+    def __init__(self, path: str):
+        size = self.SLOTS * 8
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+        # flock excludes other processes, not other threads sharing the fd
+        self._lock = threading.Lock()
+
+    def _offset(self, period: str) -> int:
+        return (zlib.crc32(period.encode()) % self.SLOTS) * 8
+
+    def bump(self, period: str) -> int:
+        offset = self._offset(period)
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                value = struct.unpack_from("<Q", self._map, offset)[0] + 1
+                struct.pack_into("<Q", self._map, offset, value)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return value
+
+    def get(self, period: str) -> int:
+        return struct.unpack_from("<Q", self._map, self._offset(period))[0]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def _generations():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if settings.shared_state_path:
+                    _store = _SharedGenerations(settings.shared_state_path)
+                else:
+                    _store = _LocalGenerations()
+    return _store
+
+
+def bump_generation(period: str) -> int:
+    """Mark a period as changed by a new reading"""
+    return _generations().bump(period)
+
+
+def get_generation(period: str) -> int:
+    """Current generation of a period"""
+    return _generations().get(period)
+
+
+class PeriodCache:
+    """Cache of computed values keyed by period, invalidated on ingest"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._entries: Dict[Any, Tuple[int, Any]] = {}
+
+    def get_or_compute(self, period: str, compute: Callable[[], Any], key: Any = None, bucket: Any = None) -> Any:
+        """
+        Return the cached value for a period, recomputing it if stale
+
+        A value that also depends on the clock passes a time bucket (such as
+        the current hour); a new bucket recomputes it in place.
+        """
+        cache_key = (period, key)
+        generation = (get_generation(period), bucket)
+
+        entry = self._entries.get(cache_key)
+        if entry is not None and entry[0] == generation:
+            return entry[1]
+
+        value = compute()
+        self._entries[cache_key] = (generation, value)
+        return value
+
+    def clear(self):
+        """Drop all cached values"""
+        self._entries.clear()
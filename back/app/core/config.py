@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Dict
 
 
 class Settings(BaseSettings):
@@ -16,11 +17,91 @@ class Settings(BaseSettings):
     # Solana Settings
     solana_network: str = "devnet"
     solana_rpc_url: str = "https://api.devnet.solana.com"
+    solana_ws_url: str = ""  # Defaults to the RPC URL with a ws(s):// scheme
+    balance_subscriber_enabled: bool = False  # Serve balances from a websocket-fed cache
+    farm_wallets: Dict[int, str] = {}  # JSON: {"1": "<farm wallet pubkey>", ...}
+
+    # Transaction Fees
+    priority_fee_percentile: float = 75.0  # Percentile of recent fees to pay
+    priority_fee_min_micro_lamports: int = 0
+    priority_fee_max_micro_lamports: int = 1_000_000  # Fee ceiling per compute unit
+    compute_unit_margin: float = 1.15  # Headroom over simulated compute units
+    compute_unit_limit_fallback: int = 200_000  # Used when simulation fails
+    tx_rebroadcast_interval_seconds: float = 2.0  # Re-send unconfirmed transactions this often
+    tx_max_resigns: int = 2  # Fresh-blockhash rebuilds after expiry before giving up
 
     # Water Management Settings
     default_water_limit_liters: int = 100000  # Default monthly limit
     water_credit_rate: float = 1.0  # 1 liter = 1 token
 
+    # Ingestion Settings
+    ingest_dedupe_cache_size: int = 100000  # Recent reading keys kept in memory
+    ingest_inflight_wait_seconds: float = 2.0  # Wait for a concurrent ingest of the same reading before 409
+    ingest_farm_rate_per_second: float = 5.0  # Per-farm token bucket refill (0 disables)
+    ingest_farm_burst: int = 50
+    ingest_global_rate_per_second: float = 500.0  # Global token bucket refill (0 disables)
+    ingest_global_burst: int = 1000
+    ingest_shed_latency_ms: float = 500.0  # Shed load above this ingest latency EWMA (0 disables)
+    ingest_max_inflight: int = 64  # Shed load above this many concurrent ingests (0 disables)
+    ingest_batch_size: int = 500  # Readings per transaction for bulk ingestion
+    ingest_bulk_max_wait_seconds: float = 30.0  # Backpressure wait before a bulk upload is cut short
+    ingest_capture_path: str = ""  # Append accepted readings to this NDJSON trace (for replay)
+
+    # Binary Sensor Listener (0 disables a port)
+    sensor_listener_host: str = "0.0.0.0"
+    sensor_udp_port: int = 0
+    sensor_tcp_port: int = 0
+    sensor_flush_interval_ms: float = 50.0  # Longest a reading waits for its batch
+    sensor_max_pending: int = 20000  # Buffered readings before UDP drops / TCP pauses
+
+    # Anomaly Detection Settings
+    anomaly_detection_enabled: bool = True
+    anomaly_ewma_alpha: float = 0.05  # Weight of each reading in the per-bucket mean and variance
+    anomaly_min_samples: int = 20  # Readings a farm/hour/rain bucket needs before it flags anything
+    anomaly_z_threshold: float = 4.0  # Spike: this many standard deviations above the bucket mean
+    anomaly_min_std_liters: float = 10.0  # Floor on the standard deviation used for z-scores
+    anomaly_night_hours: str = "0-5"  # Inclusive hour range, may wrap (e.g. "22-4"); empty disables
+    anomaly_flow_liters: float = 1.0  # Readings above this count as flow
+    anomaly_rain_mm: float = 1.0  # Readings with at least this rainfall go to the rain buckets
+    anomaly_rain_usage_ratio: float = 0.5  # Rain usage: at least this share of the dry mean at that hour
+    anomaly_stream_poll_seconds: float = 1.0  # How often /api/anomalies/stream checks for new anomalies
+    anomaly_seed_days: int = 60  # Days of hourly rollups baselines are rebuilt from at startup (0 disables)
+
+    # Analytics Settings
+    forecast_window_hours: int = 72  # Trailing hours used to fit usage trends
+
+    # Export Settings
+    export_chunk_size: int = 5000  # Rows fetched from the cursor per chunk
+
+    # Partition Settings
+    partition_dir: str = ""  # Directory for archived monthly record files; empty disables archiving
+    partition_hot_months: int = 2  # Months kept in the main table, including the current one
+
+    # Anchoring Settings
+    anchor_window_minutes: int = 0  # Post a Merkle root of each window's records on-chain (0 disables)
+    anchor_grace_seconds: int = 30  # Wait after a window closes before anchoring it
+
+    # Transfer Settings
+    transfer_settlement_minutes: int = 0  # Net and settle open transfer orders this often (0: admin runs only)
+    transfer_max_order_amount: float = 1_000_000.0  # WC per order
+
+    # Admin Settings
+    admin_token: str = ""  # X-Admin-Token for profiling endpoints; empty disables them
+    profile_dir: str = "data/profiles"  # Folded-stack flame graphs of profiled requests
+    profile_sample_interval_ms: float = 1.0
+    tracemalloc_frames: int = 1  # Traceback depth recorded per allocation
+
+    # Tracing Settings
+    tracing_exporter: str = ""  # "console", "otlp-file" or empty (disabled)
+    tracing_file: str = "data/traces.jsonl"  # OTLP/JSON lines for the otlp-file exporter
+    tracing_sample_ratio: float = 1.0  # Fraction of traces recorded
+    tracing_service_name: str = "sucount-api"
+
+    # Multi-worker Settings
+    signer_socket: str = ""  # Unix socket of the signer process; set to proxy chain calls to it
+    signer_authkey: str = ""  # Shared secret of the workers and the signer; required with signer_socket
+    shared_state_path: str = ""  # mmap file for cache generations shared between workers
+
     class Config:
         env_file = ".env"
 
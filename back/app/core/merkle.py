@@ -0,0 +1,77 @@
+"""
+Merkle trees for anchoring usage readings
+
+SHA-256 with the RFC 6962 domain separation: a leaf hashes as
+H(0x00 || leaf) and an inner node as H(0x01 || left || right), so a leaf
+can never be passed off as an inner node. A level with an odd number of
+nodes carries its last node up unchanged instead of pairing it with a copy
+of itself, so no two different leaf lists share a root.
+
+Only the standard library is used, so scripts/verify_proof.py can check
+proofs without the backend.
+"""
+
+import hashlib
+from typing import Dict, List, Sequence, Tuple
+
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+
+def leaf_hash(leaf: bytes) -> bytes:
+    return hashlib.sha256(LEAF_PREFIX + leaf).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def build_tree(leaves: Sequence[bytes]) -> Tuple[bytes, List[List[Dict[str, str]]]]:
+    """
+    Merkle root of the leaves and an inclusion proof per leaf
+
+    A proof lists the sibling hashes from the leaf up to the root, each with
+    the side it sits on: [{"side": "right", "hash": "<hex>"}, ...].
+    """
+    if not leaves:
+        raise ValueError("Cannot build a Merkle tree without leaves")
+
+    level = [leaf_hash(leaf) for leaf in leaves]
+    # positions[i]: index of leaf i's ancestor in the current level
+    positions = list(range(len(leaves)))
+    proofs: List[List[Dict[str, str]]] = [[] for _ in leaves]
+
+    while len(level) > 1:
+        for leaf, position in enumerate(positions):
+            sibling = position ^ 1
+            if sibling < len(level):
+                proofs[leaf].append({
+                    "side": "left" if sibling < position else "right",
+                    "hash": level[sibling].hex(),
+                })
+            positions[leaf] = position // 2
+
+        parents = [node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])
+        level = parents
+
+    return level[0], proofs
+
+
+def root_from_proof(leaf: bytes, proof: Sequence[Dict[str, str]]) -> bytes:
+    """Fold an inclusion proof up from a leaf to the root it implies"""
+    current = leaf_hash(leaf)
+    for step in proof:
+        sibling = bytes.fromhex(step["hash"])
+        if step["side"] == "left":
+            current = node_hash(sibling, current)
+        elif step["side"] == "right":
+            current = node_hash(current, sibling)
+        else:
+            raise ValueError(f"Invalid proof side: {step['side']!r}")
+    return current
+
+
+def verify_proof(leaf: bytes, proof: Sequence[Dict[str, str]], root: bytes) -> bool:
+    return root_from_proof(leaf, proof) == root
@@ -0,0 +1,37 @@
+"""
+Accounting period helpers
+
+Water limits are monthly, so a period is a calendar month keyed as "YYYY-MM".
+"""
+
+from datetime import datetime
+from typing import Optional, Tuple
+
+
+def period_key(moment: Optional[datetime] = None) -> str:
+    """Return the period key for a moment (defaults to now)"""
+    moment = moment or datetime.now()
+    return moment.strftime("%Y-%m")
+
+
+def period_bounds(period: str) -> Tuple[datetime, datetime]:
+    """Return the [start, end) datetimes of a period key"""
+    try:
+        start = datetime.strptime(period, "%Y-%m")
+    except ValueError:
+        raise ValueError(f"Invalid period '{period}', expected YYYY-MM")
+
+    if start.month == 12:
+        end = start.replace(year=start.year + 1, month=1)
+    else:
+        end = start.replace(month=start.month + 1)
+    return start, end
+
+
+def period_elapsed_fraction(period: str, moment: Optional[datetime] = None) -> float:
+    """Fraction of the period that has elapsed at a moment, in [0, 1]"""
+    moment = moment or datetime.now()
+    start, end = period_bounds(period)
+    total = (end - start).total_seconds()
+    elapsed = (moment - start).total_seconds()
+    return min(1.0, max(0.0, elapsed / total))
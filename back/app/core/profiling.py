@@ -0,0 +1,361 @@
+"""
+On-demand Profiling
+
+Admins can run a single request under a sampling profiler by sending
+`X-Profile: 1` (or `?profile=1`) with their `X-Admin-Token`. A background
+thread samples the Python stacks every few milliseconds while the request
+runs and the result is stored as a folded-stack flame graph
+(`frame;frame;frame count` per line, readable by flamegraph.pl and
+speedscope). This shows whether a slow dashboard spends its time in the
+database queries, in Pydantic or in JSON encoding, without redeploying.
+
+Memory snapshots wrap tracemalloc: the first snapshot starts tracing, and
+any two snapshots can be diffed by allocation site.
+
+Profiles are files (shared by all workers); memory snapshots live in the
+memory of the worker that took them.
+"""
+
+import logging
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Stacks of the profiled thread that end in one of these are the event loop
+# waiting for I/O, recorded as a single "idle" frame
+IDLE_FUNCTIONS = {"select", "poll", "epoll", "kqueue"}
+
+MAX_MEMORY_SNAPSHOTS = 10
+_PROFILE_ID = re.compile(r"^[0-9]{8}T[0-9]{6}_[0-9a-f]{6}_[a-z0-9_-]+$")
+
+
+def is_admin(token: Optional[str]) -> bool:
+    """Whether a token grants admin access (never, while ADMIN_TOKEN is unset)"""
+    return bool(settings.admin_token) and bool(token) and secrets.compare_digest(
+        token.encode(), settings.admin_token.encode()
+    )
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(APP_DIR):
+        filename = os.path.relpath(filename, os.path.dirname(APP_DIR))
+    else:
+        # Library code: keep the path below site-packages / the stdlib dir
+        parts = filename.replace("\\", "/").split("/")
+        filename = "/".join(parts[-2:])
+    # co_qualname is new in Python 3.11
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({filename}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Samples one thread's stack at a fixed interval
+
+    Threads running application code (e.g. a sync route in the threadpool)
+    are sampled as well, since they do work for the profiled request. Other
+    requests served by the same worker meanwhile show up too, so profile on
+    a quiet worker when possible.
+    """
+
+    def __init__(self, thread_id: int, interval_ms: float):
+        self.thread_id = thread_id
+        self.interval = interval_ms / 1000
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self.started = 0.0
+        self.elapsed = 0.0
+
+    def _stack(self, frame) -> List[str]:
+        stack = []
+        while frame is not None:
+            stack.append(_frame_label(frame.f_code))
+            frame = frame.f_back
+        stack.reverse()
+        return stack
+
+    def _sample(self):
+        own = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            if thread_id == self.thread_id:
+                if frame.f_code.co_name in IDLE_FUNCTIONS:
+                    self.stacks["(idle)"] += 1
+                    continue
+            elif not _runs_app_code(frame):
+                continue
+            self.stacks[";".join(self._stack(frame))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def folded(self) -> str:
+        """Flame graph input: one `stack count` line per distinct stack"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _runs_app_code(frame) -> bool:
+    while frame is not None:
+        if frame.f_code.co_filename.startswith(APP_DIR):
+            return True
+        frame = frame.f_back
+    return False
+
+
+class ProfileStore:
+    """Folded-stack profiles saved under PROFILE_DIR"""
+
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _path(profile_id: str) -> str:
+        return os.path.join(settings.profile_dir, f"{profile_id}.folded")
+
+    @staticmethod
+    def try_begin() -> bool:
+        """Only one request is profiled at a time (per worker)"""
+        return ProfileStore._lock.acquire(blocking=False)
+
+    @staticmethod
+    def end():
+        ProfileStore._lock.release()
+
+    @staticmethod
+    def save(profiler: SamplingProfiler, method: str, path: str, status_code: int) -> str:
+        name = re.sub(r"[^a-z0-9]+", "-", path.lower()).strip("-") or "root"
+        profile_id = f"{datetime.now():%Y%m%dT%H%M%S}_{secrets.token_hex(3)}_{name}"
+        os.makedirs(settings.profile_dir, exist_ok=True)
+
+        header = (
+            f"# {method} {path} -> {status_code}, {profiler.elapsed * 1000:.1f} ms, "
+            f"{profiler.samples} samples every {profiler.interval * 1000:g} ms\n"
+        )
+        with open(ProfileStore._path(profile_id), "w") as f:
+            f.write(header)
+            f.write(profiler.folded())
+
+        logger.info(f"🔬 Profiled {method} {path} in {profiler.elapsed * 1000:.1f} ms → {profile_id}")
+        return profile_id
+
+    @staticmethod
+    def list_profiles() -> List[Dict]:
+        if not os.path.isdir(settings.profile_dir):
+            return []
+        profiles = []
+        for filename in sorted(os.listdir(settings.profile_dir), reverse=True):
+            if not filename.endswith(".folded"):
+                continue
+            path = os.path.join(settings.profile_dir, filename)
+            with open(path) as f:
+                header = f.readline().lstrip("# ").strip()
+            profiles.append({
+                "id": filename[:-len(".folded")],
+                "request": header,
+                "size_bytes": os.path.getsize(path),
+            })
+        return profiles
+
+    @staticmethod
+    def read(profile_id: str) -> Optional[str]:
+        """Folded stacks of a profile, without the header line"""
+        if not _PROFILE_ID.match(profile_id) or not os.path.exists(ProfileStore._path(profile_id)):
+            return None
+        with open(ProfileStore._path(profile_id)) as f:
+            return "".join(line for line in f if not line.startswith("#"))
+
+    @staticmethod
+    def top_functions(folded: str, limit: int = 20) -> List[Dict]:
+        """Functions by inclusive and self sample counts"""
+        inclusive: Counter = Counter()
+        exclusive: Counter = Counter()
+        total = 0
+        for line in folded.splitlines():
+            stack, _, count = line.rpartition(" ")
+            frames = stack.split(";")
+            count = int(count)
+            total += count
+            exclusive[frames[-1]] += count
+            for frame in dict.fromkeys(frames):
+                inclusive[frame] += count
+
+        return [
+            {
+                "function": frame,
+                "inclusive_pct": round(count / total * 100, 1),
+                "self_pct": round(exclusive[frame] / total * 100, 1),
+            }
+            for frame, count in inclusive.most_common(limit)
+        ] if total else []
+
+
+class MemorySnapshots:
+    """tracemalloc snapshots of this worker, kept in memory"""
+
+    _snapshots: "OrderedDict[int, tracemalloc.Snapshot]" = OrderedDict()
+    _next_id = 1
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _top(stats, limit: int) -> List[Dict]:
+        return [
+            {
+                "location": str(stat.traceback[0]) if stat.traceback else "?",
+                "size_kb": round(stat.size / 1024, 1),
+                "count": stat.count,
+                **({"size_diff_kb": round(stat.size_diff / 1024, 1), "count_diff": stat.count_diff}
+                   if hasattr(stat, "size_diff") else {}),
+            }
+            for stat in stats[:limit]
+        ]
+
+    @staticmethod
+    def take(limit: int = 20) -> Dict:
+        """Snapshot current allocations (starting tracemalloc on first use)"""
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start(settings.tracemalloc_frames)
+            logger.info("🧠 tracemalloc started")
+
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ])
+        with MemorySnapshots._lock:
+            snapshot_id = MemorySnapshots._next_id
+            MemorySnapshots._next_id += 1
+            MemorySnapshots._snapshots[snapshot_id] = snapshot
+            while len(MemorySnapshots._snapshots) > MAX_MEMORY_SNAPSHOTS:
+                MemorySnapshots._snapshots.popitem(last=False)
+
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "id": snapshot_id,
+            "pid": os.getpid(),
+            "tracing_started": started,
+            "traced_kb": round(current / 1024, 1),
+            "peak_kb": round(peak / 1024, 1),
+            "top": MemorySnapshots._top(snapshot.statistics("lineno"), limit),
+        }
+
+    @staticmethod
+    def list_ids() -> List[int]:
+        with MemorySnapshots._lock:
+            return list(MemorySnapshots._snapshots)
+
+    @staticmethod
+    def diff(old_id: int, new_id: int, limit: int = 20) -> Optional[Dict]:
+        """Allocation growth from one snapshot to another, largest first"""
+        with MemorySnapshots._lock:
+            old = MemorySnapshots._snapshots.get(old_id)
+            new = MemorySnapshots._snapshots.get(new_id)
+        if old is None or new is None:
+            return None
+
+        stats = new.compare_to(old, "lineno")
+        return {
+            "from": old_id,
+            "to": new_id,
+            "size_diff_kb": round(sum(stat.size_diff for stat in stats) / 1024, 1),
+            "top": MemorySnapshots._top(stats, limit),
+        }
+
+    @staticmethod
+    def stop():
+        """Stop tracing and drop all snapshots"""
+        with MemorySnapshots._lock:
+            MemorySnapshots._snapshots.clear()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            logger.info("🧠 tracemalloc stopped")
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling admin-flagged requests to PROFILED_PATHS
+
+    Other requests pass straight through. The profile ID is returned in the
+    X-Profile-Id response header.
+    """
+
+    PROFILED_PATHS = {"/api/dashboard", "/api/water-usage", "/api/nft/mint"}
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def _wants_profile(scope) -> bool:
+        if scope["type"] != "http" or scope["path"] not in ProfilingMiddleware.PROFILED_PATHS:
+            return False
+        headers = dict(scope["headers"])
+        flagged = headers.get(b"x-profile") == b"1" or b"profile=1" in scope["query_string"].split(b"&")
+        token = headers.get(b"x-admin-token", b"").decode("latin-1")
+        return flagged and is_admin(token)
+
+    async def __call__(self, scope, receive, send):
+        if not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if not ProfileStore.try_begin():
+            logger.warning("⚠️  Profiler busy, serving request unprofiled")
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            profiler = SamplingProfiler(threading.get_ident(), settings.profile_sample_interval_ms)
+            start_message = None
+
+            async def send_after_profile(message):
+                # Hold the response start until the body is ready, so the
+                # profile ID can go in its headers
+                nonlocal start_message
+                if message["type"] == "http.response.start":
+                    start_message = message
+                    return
+                if start_message is not None and profiler.elapsed == 0.0:
+                    profiler.stop()
+                    profile_id = ProfileStore.save(
+                        profiler, scope["method"], scope["path"], start_message["status"]
+                    )
+                    start_message["headers"] = list(start_message.get("headers", [])) + [
+                        (b"x-profile-id", profile_id.encode())
+                    ]
+                    await send(start_message)
+                await send(message)
+
+            profiler.start()
+            try:
+                await self.app(scope, receive, send_after_profile)
+            finally:
+                if profiler.elapsed == 0.0:
+                    profiler.stop()
+        finally:
+            ProfileStore.end()
@@ -0,0 +1,22 @@
+"""
+Fast JSON responses
+
+Routes that assemble their payload from trusted internal data can return
+FastJSONResponse directly. FastAPI then skips response_model validation and
+jsonable_encoder, and the payload is encoded once by orjson.
+"""
+
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded with orjson (datetimes and NumPy arrays included)"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
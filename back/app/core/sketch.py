@@ -0,0 +1,94 @@
+"""
+Streaming statistics
+
+EwmaStats and QuantileSketch take one observation at a time in constant
+time and keep a bounded amount of state, so baselines can be maintained on
+every ingested reading without rescanning history.
+"""
+
+import math
+from typing import Dict, Optional
+
+# Values at or below this count as zero in the sketch (no logarithm)
+ZERO_THRESHOLD = 1e-9
+
+
+class EwmaStats:
+    """Exponentially weighted moving mean and variance"""
+
+    __slots__ = ("alpha", "count", "mean", "variance")
+
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.count = 0
+        self.mean = 0.0
+        self.variance = 0.0
+
+    def update(self, value: float):
+        self.count += 1
+        # Plain running mean while 1/n is above alpha, so the first values
+        # are not weighted against a mean of zero
+        alpha = max(self.alpha, 1.0 / self.count)
+        diff = value - self.mean
+        increment = alpha * diff
+        self.mean += increment
+        self.variance = (1.0 - alpha) * (self.variance + diff * increment)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def zscore(self, value: float, min_std: float = 0.0) -> float:
+        """Deviations of a value from the mean, with std floored at min_std"""
+        std = max(self.std, min_std)
+        if std == 0.0:
+            return 0.0 if value == self.mean else math.inf
+        return (value - self.mean) / std
+
+
+class QuantileSketch:
+    """
+    Relative-error quantile sketch of non-negative values (DDSketch)
+
+    Each value lands in a logarithmic bin, so any quantile comes back within
+    relative_accuracy of the true value. Past max_bins the two lowest bins
+    merge, so only the lowest quantiles lose accuracy.
+    """
+
+    __slots__ = ("max_bins", "bins", "zero_count", "count", "_gamma", "_log_gamma")
+
+    def __init__(self, relative_accuracy: float = 0.05, max_bins: int = 128):
+        self.max_bins = max_bins
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self._gamma = (1.0 + relative_accuracy) / (1.0 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+
+    def add(self, value: float):
+        self.count += 1
+        if value <= ZERO_THRESHOLD:
+            self.zero_count += 1
+            return
+
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[index] = self.bins.get(index, 0) + 1
+        if len(self.bins) > self.max_bins:
+            lowest = self.bins.pop(min(self.bins))
+            self.bins[min(self.bins)] += lowest
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated q-quantile (0..1), None while empty"""
+        if not self.count:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                # Midpoint of the bin (gamma^(i-1), gamma^i] in relative terms
+                return 2.0 * self._gamma ** index / (self._gamma + 1.0)
+        return 2.0 * self._gamma ** max(self.bins) / (self._gamma + 1.0)
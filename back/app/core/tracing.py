@@ -0,0 +1,268 @@
+"""
+Request Tracing
+
+Nested timing spans for the slow paths (ingestion, NFT mint, chain writes).
+The current span lives in a context variable, so spans nest across awaits
+and into threadpool calls without being passed around, and concurrent
+requests never mix.
+
+When a trace's root span ends, the whole trace is exported:
+- TRACING_EXPORTER=otlp-file appends one OTLP/JSON ExportTraceServiceRequest
+  per line to TRACING_FILE (readable by the OpenTelemetry Collector's
+  otlpjsonfile receiver, Jaeger and similar tools)
+- TRACING_EXPORTER=console logs the trace as an indented tree of durations
+
+With no exporter set, `span()` is a no-op.
+"""
+
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# OTLP enum values
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+STATUS_ERROR = 2
+
+
+class Span:
+    """One timed operation in a trace"""
+
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_id", "start_ns",
+                 "end_ns", "attributes", "error", "root", "children")
+
+    def __init__(
+        self,
+        name: str,
+        kind: int,
+        parent: Optional["Span"],
+        attributes: Dict[str, Any],
+        remote_parent: Optional[Tuple[str, str]] = None
+    ):
+        self.name = name
+        self.kind = kind
+        self.span_id = os.urandom(8).hex()
+        if parent is not None:
+            self.trace_id, self.parent_id, self.root = parent.trace_id, parent.span_id, parent.root
+        elif remote_parent is not None:
+            # Continues a trace from another process; exported from this one
+            (self.trace_id, self.parent_id), self.root = remote_parent, self
+        else:
+            self.trace_id, self.parent_id, self.root = os.urandom(16).hex(), None, self
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        # Finished spans of the whole trace, collected on the root
+        self.children: List["Span"] = []
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+
+    @property
+    def recording(self) -> bool:
+        return True
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+
+class _NoopSpan:
+    """Stand-in when tracing is off or the trace was not sampled"""
+
+    recording = False
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, **attributes: Any):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current: ContextVar[Optional[Any]] = ContextVar("current_span", default=None)
+
+
+def current_span():
+    """The active span (a no-op span outside of traces)"""
+    return _current.get() or NOOP_SPAN
+
+
+def trace_context() -> Optional[Tuple[str, str]]:
+    """(trace ID, span ID) of the active span, to continue the trace in another process"""
+    current = _current.get()
+    return (current.trace_id, current.span_id) if isinstance(current, Span) else None
+
+
+@contextmanager
+def span(
+    name: str,
+    kind: int = SPAN_KIND_INTERNAL,
+    remote_parent: Optional[Tuple[str, str]] = None,
+    **attributes: Any
+) -> Iterator[Any]:
+    """
+    Time a block as a child of the current span (or as a new trace)
+
+        with span("db.commit", farm_id=3) as s:
+            db.commit()
+            s.set_attribute("rows", 2)
+
+    `remote_parent` is a trace_context() from another process; it is used
+    when there is no current span here.
+    """
+    parent = _current.get()
+    if not settings.tracing_exporter or parent is NOOP_SPAN:
+        yield NOOP_SPAN
+        return
+
+    if parent is None and remote_parent is None and random.random() >= settings.tracing_sample_ratio:
+        # Unsampled trace: its children are no-ops too
+        token = _current.set(NOOP_SPAN)
+        try:
+            yield NOOP_SPAN
+        finally:
+            _current.reset(token)
+        return
+
+    current = Span(name, kind, parent, attributes, remote_parent if parent is None else None)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        current.end_ns = time.time_ns()
+        if current.root is current:
+            _export(current)
+        else:
+            current.root.children.append(current)
+
+
+def traced(name: Optional[str] = None, kind: int = SPAN_KIND_INTERNAL):
+    """Decorator running a function (sync or async) inside a span"""
+    def decorator(func: Callable):
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, kind):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, kind):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+# ============================================================================
+# Exporters
+# ============================================================================
+
+_file_lock = threading.Lock()
+
+
+def _otlp_value(value: Any) -> Dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(s: Span) -> Dict:
+    encoded = {
+        "traceId": s.trace_id,
+        "spanId": s.span_id,
+        "name": s.name,
+        "kind": s.kind,
+        "startTimeUnixNano": str(s.start_ns),
+        "endTimeUnixNano": str(s.end_ns),
+        "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+    }
+    if s.parent_id:
+        encoded["parentSpanId"] = s.parent_id
+    if s.error:
+        encoded["status"] = {"code": STATUS_ERROR, "message": s.error}
+    return encoded
+
+
+def otlp_request(root: Span) -> Dict:
+    """OTLP/JSON ExportTraceServiceRequest for a finished trace"""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": settings.tracing_service_name}},
+                {"key": "service.version", "value": {"stringValue": settings.app_version}},
+                {"key": "process.pid", "value": {"intValue": str(os.getpid())}},
+            ]},
+            "scopeSpans": [{
+                "scope": {"name": __name__},
+                "spans": [_otlp_span(s) for s in [root] + root.children],
+            }],
+        }]
+    }
+
+
+def format_tree(root: Span) -> str:
+    """Indented tree of span durations"""
+    by_parent: Dict[Optional[str], List[Span]] = {}
+    for s in root.children:
+        by_parent.setdefault(s.parent_id, []).append(s)
+
+    lines = []
+
+    def walk(s: Span, depth: int):
+        attributes = " ".join(f"{k}={v}" for k, v in s.attributes.items())
+        error = f" ❌ {s.error}" if s.error else ""
+        lines.append(f"{'  ' * depth}{s.name} {s.duration_ms:.1f}ms {attributes}".rstrip() + error)
+        for child in sorted(by_parent.get(s.span_id, []), key=lambda c: c.start_ns):
+            walk(child, depth + 1)
+
+    walk(root, 0)
+    return "\n".join(lines)
+
+
+def _export(root: Span):
+    try:
+        if settings.tracing_exporter == "console":
+            logger.info(f"🧵 trace {root.trace_id}\n{format_tree(root)}")
+        elif settings.tracing_exporter == "otlp-file":
+            line = json.dumps(otlp_request(root), separators=(",", ":"))
+            directory = os.path.dirname(settings.tracing_file)
+            with _file_lock:
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(settings.tracing_file, "a") as f:
+                    f.write(line + "\n")
+    except Exception as e:
+        # Tracing must never break the request it observes
+        logger.error(f"Error exporting trace: {e}")
@@ -5,7 +5,15 @@ import logging
 import os
 
 from app.core.config import get_settings
-from app.models.database import init_db
+from app.core.profiling import ProfilingMiddleware
+from app.models.database import SessionLocal
+from app.services.maintenance import run_startup_maintenance
+from app.services.farm_ledger import farm_ledger
+from app.services.anomaly_service import AnomalyService
+from app.services.chain import get_watercredits_service
+from app.services.sensor_listener import start_sensor_listener, stop_sensor_listener
+from app.services.anchor_service import AnchorService, anchor_scheduler
+from app.services.transfer_service import TransferService, settlement_scheduler
 from app.api.routes import router
 
 # Configure logging
@@ -36,6 +44,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Admin-only request profiling (X-Profile: 1 with X-Admin-Token)
+app.add_middleware(ProfilingMiddleware)
+
 # Include API routes
 app.include_router(router, prefix="/api", tags=["api"])
 
@@ -50,8 +61,42 @@ async def startup_event():
     """Initialize database on startup"""
     logger.info("Starting SuCount Water Management API")
     logger.info(f"Solana Network: {settings.solana_network}")
-    init_db()
-    logger.info("Database initialized")
+    if settings.signer_socket and not settings.signer_authkey:
+        raise RuntimeError("SIGNER_AUTHKEY must be set when chain calls go to the signer (SIGNER_SOCKET)")
+    # In multi-worker mode the signer has already run it, before the workers started
+    if not settings.signer_socket:
+        run_startup_maintenance()
+
+    # Per process: ledger and anomaly baselines live in memory
+    db = SessionLocal()
+    try:
+        farm_ledger.load(db)
+        AnomalyService.seed(db)
+    finally:
+        db.close()
+
+    # In multi-worker mode the signer process runs the subscriber
+    if settings.balance_subscriber_enabled and not settings.signer_socket:
+        get_watercredits_service().start_balance_subscriber()
+
+    # Binary UDP/TCP readings (SENSOR_UDP_PORT / SENSOR_TCP_PORT)
+    await start_sensor_listener()
+
+    # Merkle roots of closed windows posted on-chain (ANCHOR_WINDOW_MINUTES)
+    if AnchorService.enabled():
+        anchor_scheduler.start()
+    if TransferService.enabled():
+        settlement_scheduler.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks"""
+    await stop_sensor_listener()
+    await anchor_scheduler.stop()
+    await settlement_scheduler.stop()
+    if settings.balance_subscriber_enabled and not settings.signer_socket:
+        await get_watercredits_service().stop_balance_subscriber()
 
 
 @app.get("/")
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, Float, String, DateTime, Text
+from sqlalchemy import create_engine, inspect, text, Column, Integer, Float, String, DateTime, Text, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
@@ -22,6 +22,8 @@ class WaterUsageRecord(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     farm_id = Column(Integer, nullable=False, index=True)
+    # Idempotency key: farm + client reading ID, or farm + timestamp
+    reading_key = Column(String, unique=True, nullable=True, index=True)
     timestamp = Column(DateTime, default=datetime.now, nullable=False)
     water_liters = Column(Float, nullable=False)
     rainfall_mm = Column(Float, nullable=True)
@@ -29,7 +31,53 @@ class WaterUsageRecord(Base):
     humidity_percent = Column(Float, nullable=True)
     tokens_consumed = Column(Float, nullable=False)
     solana_tx_id = Column(String, nullable=True)
-    created_at = Column(DateTime, default=datetime.now)
+    created_at = Column(DateTime, default=datetime.now, index=True)  # Anchor windows are by arrival
+
+
+class WaterUsageRollup(Base):
+    """Hourly per-farm aggregate of water usage records"""
+    __tablename__ = "water_usage_rollups"
+    __table_args__ = (UniqueConstraint("farm_id", "hour", name="uq_rollup_farm_hour"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    farm_id = Column(Integer, nullable=False, index=True)
+    hour = Column(DateTime, nullable=False, index=True)  # Truncated to the hour
+    readings = Column(Integer, default=0, nullable=False)
+    water_liters = Column(Float, default=0.0, nullable=False)
+    tokens_consumed = Column(Float, default=0.0, nullable=False)
+    # Weather sums with their own counts, since every field is optional
+    rainfall_sum = Column(Float, default=0.0, nullable=False)
+    rainfall_count = Column(Integer, default=0, nullable=False)
+    temperature_sum = Column(Float, default=0.0, nullable=False)
+    temperature_count = Column(Integer, default=0, nullable=False)
+    humidity_sum = Column(Float, default=0.0, nullable=False)
+    humidity_count = Column(Integer, default=0, nullable=False)
+
+
+class UsagePartition(Base):
+    """Catalog of months archived out of water_usage_records into their own files"""
+    __tablename__ = "usage_partitions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    period = Column(String, unique=True, nullable=False, index=True)  # "YYYY-MM"
+    path = Column(String, nullable=False)  # SQLite file holding the month's records
+    records = Column(Integer, default=0, nullable=False)
+    archived_at = Column(DateTime, default=datetime.now)
+
+
+class FarmPeriodUsage(Base):
+    """Per-farm usage counters for one accounting period (calendar month)"""
+    __tablename__ = "farm_period_usage"
+    __table_args__ = (UniqueConstraint("farm_id", "period", name="uq_period_usage_farm_period"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    farm_id = Column(Integer, nullable=False, index=True)
+    period = Column(String, nullable=False, index=True)  # "YYYY-MM"
+    water_limit = Column(Float, nullable=False)  # Farm's limit when the period opened
+    water_liters = Column(Float, default=0.0, nullable=False)
+    tokens_consumed = Column(Float, default=0.0, nullable=False)
+    readings = Column(Integer, default=0, nullable=False)
+    last_updated = Column(DateTime, default=datetime.now)
 
 
 class FarmProfile(Base):
@@ -45,6 +93,23 @@ class FarmProfile(Base):
     last_updated = Column(DateTime, default=datetime.now)
 
 
+class UsageAnomaly(Base):
+    """Reading flagged by the streaming anomaly detector"""
+    __tablename__ = "usage_anomalies"
+
+    id = Column(Integer, primary_key=True, index=True)
+    farm_id = Column(Integer, nullable=False, index=True)
+    kind = Column(String, nullable=False, index=True)  # spike, night_flow or rain_usage
+    reading_key = Column(String, nullable=True, index=True)
+    timestamp = Column(DateTime, nullable=False, index=True)  # Of the reading
+    water_liters = Column(Float, nullable=False)
+    rainfall_mm = Column(Float, nullable=True)
+    baseline_liters = Column(Float, nullable=True)  # Bucket mean the reading was compared with
+    zscore = Column(Float, nullable=True)
+    detail = Column(String, nullable=False)
+    detected_at = Column(DateTime, default=datetime.now)
+
+
 class NFTCertificate(Base):
     """Database model for minted NFT certificates"""
     __tablename__ = "nft_certificates"
@@ -62,6 +127,71 @@ class NFTCertificate(Base):
     network = Column(String, default="devnet")
 
 
+class UsageAnchor(Base):
+    """Merkle root of one time window of usage records, posted in a Memo transaction"""
+    __tablename__ = "usage_anchors"
+
+    id = Column(Integer, primary_key=True, index=True)
+    window_start = Column(DateTime, unique=True, nullable=False, index=True)  # Records by created_at
+    window_end = Column(DateTime, nullable=False)
+    leaves = Column(Integer, nullable=False)
+    merkle_root = Column(String, nullable=False)  # Hex SHA-256
+    memo = Column(String, nullable=False)
+    status = Column(String, default="pending", nullable=False)  # pending, sending, anchored or failed
+    transaction_signature = Column(String, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
+    attempted_at = Column(DateTime, nullable=True)
+    anchored_at = Column(DateTime, nullable=True)
+
+
+class UsageProof(Base):
+    """Inclusion proof of one usage record in its window's Merkle root"""
+    __tablename__ = "usage_proofs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    record_id = Column(Integer, unique=True, nullable=False, index=True)
+    reading_key = Column(String, nullable=True, index=True)
+    anchor_id = Column(Integer, nullable=False, index=True)
+    leaf_index = Column(Integer, nullable=False)
+    leaf = Column(Text, nullable=False)  # Canonical JSON of the record, as hashed
+    proof = Column(Text, nullable=False)  # JSON list of {"side", "hash"} up to the root
+
+
+class CreditTransferOrder(Base):
+    """Requested farm-to-farm WaterCredits transfer, settled off-chain in net batches"""
+    __tablename__ = "credit_transfer_orders"
+
+    id = Column(Integer, primary_key=True, index=True)
+    client_order_id = Column(String, unique=True, nullable=True, index=True)  # Retries with the same ID are ignored
+    from_farm_id = Column(Integer, nullable=False, index=True)
+    to_farm_id = Column(Integer, nullable=False, index=True)
+    amount = Column(Float, nullable=False)  # WC
+    status = Column(String, default="open", nullable=False, index=True)  # open, settling, settled or cancelled
+    settlement_id = Column(Integer, nullable=True, index=True)
+    created_at = Column(DateTime, default=datetime.now)
+    settled_at = Column(DateTime, nullable=True)
+
+
+class CreditSettlement(Base):
+    """One netting of open transfer orders into the fewest farm-to-farm transfers"""
+    __tablename__ = "credit_settlements"
+
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(String, default="pending", nullable=False)  # pending, sending, settled, failed or cancelled
+    orders = Column(Integer, default=0, nullable=False)
+    gross_amount = Column(Float, default=0.0, nullable=False)  # WC requested across all orders
+    net_amount = Column(Float, default=0.0, nullable=False)  # WC actually moved
+    legs = Column(Text, nullable=False)  # JSON list of net transfers with their signatures
+    transactions = Column(Integer, default=0, nullable=False)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
+    attempted_at = Column(DateTime, nullable=True)
+    settled_at = Column(DateTime, nullable=True)
+
+
 def get_db():
     """Database session dependency"""
     db = SessionLocal()
@@ -71,9 +201,29 @@ def get_db():
         db.close()
 
 
+def _upgrade_schema():
+    """Add columns and indexes introduced after a database was first created"""
+    inspector = inspect(engine)
+    columns = {column["name"] for column in inspector.get_columns("water_usage_records")}
+
+    with engine.begin() as conn:
+        if "reading_key" not in columns:
+            conn.execute(text("ALTER TABLE water_usage_records ADD COLUMN reading_key VARCHAR"))
+            conn.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS ix_water_usage_records_reading_key "
+                "ON water_usage_records (reading_key)"
+            ))
+        # Databases created before anchor windows scanned the table for each window
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_water_usage_records_created_at "
+            "ON water_usage_records (created_at)"
+        ))
+
+
 def init_db():
     """Initialize database tables"""
     Base.metadata.create_all(bind=engine)
+    _upgrade_schema()
 
     # Create default farm profiles
     db = SessionLocal()
@@ -1,11 +1,16 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict, Union
 
 
 class WaterUsageData(BaseModel):
     """Water usage data from oracle"""
     farm_id: int = Field(..., description="Farm identifier (1-10)")
+    reading_id: Optional[str] = Field(
+        None,
+        max_length=128,
+        description="Client-supplied reading ID; retries with the same ID are ignored"
+    )
     timestamp: datetime = Field(default_factory=datetime.now)
     water_liters: float = Field(..., gt=0, description="Water consumption in liters")
     rainfall_mm: Optional[float] = Field(None, ge=0, description="Rainfall in millimeters")
@@ -16,6 +21,7 @@ class WaterUsageData(BaseModel):
         json_schema_extra = {
             "example": {
                 "farm_id": 1,
+                "reading_id": "gw-17-000451",
                 "timestamp": "2025-10-27T12:00:00",
                 "water_liters": 150.5,
                 "rainfall_mm": 5.2,
@@ -34,16 +40,166 @@ class WaterUsageResponse(BaseModel):
     tokens_consumed: float
     solana_tx_id: Optional[str] = None
     timestamp: datetime
+    duplicate: bool = False  # True if this reading was already recorded
+
+
+class BulkIngestError(BaseModel):
+    """A rejected line of a bulk upload"""
+    line: int  # 1-based line (NDJSON) or object (msgpack) number
+    reason: str  # "malformed", "invalid", "failed" or "overloaded"
+    error: str
+
+
+class BulkIngestResponse(BaseModel):
+    """Outcome of a bulk upload"""
+    lines: int  # Lines read from the body
+    accepted: int
+    duplicates: int
+    rejected: Dict[str, int]  # By reason
+    errors: List[BulkIngestError]  # First rejected lines, for debugging
+    resume_from_line: Optional[int] = None  # Set when the upload was cut short; resend from here
+
+
+class UsageAnomalyInfo(BaseModel):
+    """A reading flagged by the streaming anomaly detector"""
+    id: int
+    farm_id: int
+    kind: str  # "spike", "night_flow" or "rain_usage"
+    reading_key: Optional[str] = None
+    timestamp: datetime  # Of the reading
+    water_liters: float
+    rainfall_mm: Optional[float] = None
+    baseline_liters: Optional[float] = None  # Mean of the farm's readings at that hour and weather
+    zscore: Optional[float] = None
+    detail: str
+    detected_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class AnomalyBaseline(BaseModel):
+    """Learned usage of one farm at one hour of day, in dry or rainy weather"""
+    farm_id: int
+    hour: int  # 0-23
+    rain: bool
+    readings: int
+    mean_liters: float  # EWMA
+    std_liters: float
+    p50_liters: Optional[float] = None
+    p95_liters: Optional[float] = None
+
+
+class TransferOrderRequest(BaseModel):
+    """Request to move WaterCredits from one farm to another"""
+    from_farm_id: int = Field(..., description="Paying farm (1-10)")
+    to_farm_id: int = Field(..., description="Receiving farm (1-10)")
+    amount: float = Field(..., gt=0, description="WaterCredits to transfer")
+    client_order_id: Optional[str] = Field(
+        None,
+        max_length=128,
+        description="Client-supplied order ID; retries with the same ID return the original order"
+    )
+
+
+class TransferOrderInfo(BaseModel):
+    """A transfer order and where it is in settlement"""
+    id: int
+    client_order_id: Optional[str] = None
+    from_farm_id: int
+    to_farm_id: int
+    amount: float
+    status: str  # "open", "settling", "settled" or "cancelled"
+    settlement_id: Optional[int] = None
+    created_at: datetime
+    settled_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class SettlementLeg(BaseModel):
+    """One net transfer of a settlement"""
+    from_farm_id: int
+    to_farm_id: int
+    amount: float
+    on_chain: bool  # False when both farms share the authority's token account
+    signature: Optional[str] = None
+
+
+class CreditSettlementInfo(BaseModel):
+    """A settlement of transfer orders"""
+    id: int
+    status: str  # "pending", "sending", "settled", "failed" or "cancelled"
+    orders: int
+    gross_amount: float
+    net_amount: float
+    legs: List[SettlementLeg]
+    transactions: int
+    error: Optional[str] = None
+    attempts: int
+    created_at: datetime
+    settled_at: Optional[datetime] = None
+
+
+class UsageAnchorInfo(BaseModel):
+    """A window of usage records anchored on-chain by its Merkle root"""
+    id: int
+    window_start: datetime
+    window_end: datetime
+    leaves: int
+    merkle_root: str  # Hex SHA-256
+    memo: str  # Exact memo posted on-chain
+    status: str  # "pending", "sending", "anchored" or "failed"
+    transaction_signature: Optional[str] = None
+    attempts: int
+    anchored_at: Optional[datetime] = None
+
+
+class ProofStep(BaseModel):
+    """Sibling hash on the path from a leaf to the Merkle root"""
+    side: str  # "left" or "right" of the running hash
+    hash: str
+
+
+class UsageProofResponse(BaseModel):
+    """Inclusion proof of a usage record in an anchored Merkle root"""
+    record_id: int
+    reading_key: Optional[str] = None
+    leaf: str  # Canonical JSON of the record; hashed as SHA-256(0x00 || leaf)
+    leaf_index: int
+    proof: List[ProofStep]
+    merkle_root: str
+    anchor: UsageAnchorInfo
+    explorer_url: Optional[str] = None
 
 
 class FarmStatistics(BaseModel):
-    """Statistics for a single farm"""
+    """Statistics for a single farm in the current period"""
     farm_id: int
     total_water_used: float
     water_limit: float
     tokens_consumed: float
     status: str  # "economy" or "overspend"
     percentage_used: float
+    period: Optional[str] = None  # "YYYY-MM"
+
+
+class FarmPeriodStatistics(BaseModel):
+    """Usage of a farm in one accounting period"""
+    period: str
+    water_used: float
+    water_limit: float
+    tokens_consumed: float
+    readings: int
+    percentage_used: float
+    status: str
+
+
+class FarmPeriodHistory(BaseModel):
+    """Per-period usage of a farm, most recent first"""
+    farm_id: int
+    periods: List[FarmPeriodStatistics]
 
 
 class DashboardResponse(BaseModel):
@@ -53,7 +209,10 @@ class DashboardResponse(BaseModel):
     total_limit: float
     overall_status: str
     last_updated: datetime
-    water_usage_history: List[dict]  # Last 30 days
+    # Last 30 days: a list of records, or parallel arrays for layout=columnar
+    water_usage_history: Union[List[dict], Dict[str, list]]
+    cursor: int  # Pass back as `since` to receive only newer data
+    delta: bool = False  # True if farms/history only cover changes since the cursor
 
 
 class NFTMintResponse(BaseModel):
@@ -64,6 +223,50 @@ class NFTMintResponse(BaseModel):
     message: str = "NFT minted successfully (MOCK)"
 
 
+class FarmEfficiency(BaseModel):
+    """Efficiency score for a single farm"""
+    farm_id: int
+    water_used: float
+    weather_adjusted_usage: float
+    prorated_limit: float
+    usage_ratio: float
+    efficiency_score: float  # 0.0 - 1.0
+    readings: int
+
+
+class EfficiencyReport(BaseModel):
+    """Efficiency scores for all farms in a period"""
+    period: str  # YYYY-MM
+    computed_at: datetime
+    farms: List[FarmEfficiency]
+
+
+class FarmForecast(BaseModel):
+    """Projected end-of-period usage for a single farm"""
+    farm_id: int
+    water_used: float  # Current period so far
+    water_limit: float
+    hourly_rate: float  # Fitted liters per hour
+    projected_usage: float
+    projected_percentage: float
+    projected_status: str  # "economy" or "overspend"
+    limit_crossing_at: Optional[datetime] = None  # None if not expected this period
+
+
+class ForecastReport(BaseModel):
+    """Burn-down forecast for all farms"""
+    period: str  # YYYY-MM
+    period_end: datetime
+    computed_at: datetime
+    farms: List[FarmForecast]
+
+
+class BurnRequest(BaseModel):
+    """A single farm burn in a batch"""
+    farm_id: int = Field(..., ge=1, le=10, description="Farm identifier (1-10)")
+    water_liters: float = Field(..., gt=0, description="Water used in liters")
+
+
 class TokenBalance(BaseModel):
     """Water credits token balance"""
     farm_id: int
@@ -0,0 +1,297 @@
+"""
+Merkle Anchoring of Usage Records
+
+Sending a transaction per reading is unaffordable, so readings are anchored
+on-chain in windows instead. Each closed window of ANCHOR_WINDOW_MINUTES
+(by record created_at) becomes one Merkle tree over its records, ordered
+by ID; only the root goes on-chain, in one Memo transaction signed by the
+authority:
+
+    {"app":"sucount","v":1,"window":"2025-10-27T12:00:00","leaves":1234,"root":"<hex>"}
+
+Each record's leaf (canonical JSON of its fields) and inclusion proof are
+stored in usage_proofs, so any single reading can be proven against the
+memo without the rest of its window (see scripts/verify_proof.py).
+
+A window is claimed by inserting its anchor row, and a send by moving the
+row to "sending", so several workers can run the scheduler without posting
+a root twice. Failed sends are retried on the next run. Records archived
+into partitions before they were anchored are not anchored.
+"""
+
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, func, insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.merkle import build_tree
+from app.core.tracing import span, traced
+from app.models.database import SessionLocal, UsageAnchor, UsageProof, WaterUsageRecord
+from app.services.chain import get_watercredits_service
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+WINDOW_EPOCH = datetime(1970, 1, 1)
+# A "sending" claim older than this is treated as a crashed sender
+STALE_SEND = timedelta(minutes=10)
+
+LEAF_FIELDS = [
+    "id",
+    "farm_id",
+    "reading_key",
+    "timestamp",
+    "water_liters",
+    "tokens_consumed",
+    "rainfall_mm",
+    "temperature_c",
+    "humidity_percent",
+]
+
+
+def record_leaf(row) -> str:
+    """Canonical JSON of a record's anchored fields (the Merkle leaf)"""
+    values = {field: getattr(row, field) for field in LEAF_FIELDS}
+    values["timestamp"] = values["timestamp"].isoformat()
+    return json.dumps(values, sort_keys=True, separators=(",", ":"))
+
+
+def anchor_memo(window_start: datetime, leaves: int, root: str) -> str:
+    return json.dumps(
+        {"app": "sucount", "v": 1, "window": window_start.isoformat(), "leaves": leaves, "root": root},
+        separators=(",", ":")
+    )
+
+
+class AnchorService:
+    """Service for anchoring usage records on-chain by Merkle root"""
+
+    @staticmethod
+    def enabled() -> bool:
+        return settings.anchor_window_minutes > 0
+
+    @staticmethod
+    def window_length() -> timedelta:
+        return timedelta(minutes=settings.anchor_window_minutes)
+
+    @staticmethod
+    def window_start(moment: datetime) -> datetime:
+        """Start of the window containing a moment"""
+        length = AnchorService.window_length()
+        return WINDOW_EPOCH + ((moment - WINDOW_EPOCH) // length) * length
+
+    @staticmethod
+    def _build(db: Session, window_start: datetime, window_end: datetime) -> Optional[UsageAnchor]:
+        """Build and store the tree for a window; None if another worker claimed it"""
+        columns = [getattr(WaterUsageRecord, field) for field in LEAF_FIELDS]
+        rows = db.execute(
+            select(*columns).where(
+                WaterUsageRecord.created_at >= window_start,
+                WaterUsageRecord.created_at < window_end
+            ).order_by(WaterUsageRecord.id)
+        ).all()
+
+        with span("merkle.build", leaves=len(rows)):
+            leaves = [record_leaf(row) for row in rows]
+            root, proofs = build_tree([leaf.encode() for leaf in leaves])
+
+        anchor = UsageAnchor(
+            window_start=window_start,
+            window_end=window_end,
+            leaves=len(rows),
+            merkle_root=root.hex(),
+            memo=anchor_memo(window_start, len(rows), root.hex()),
+            status="pending"
+        )
+        try:
+            db.add(anchor)
+            db.flush()
+            db.execute(insert(UsageProof.__table__), [
+                {
+                    "record_id": row.id,
+                    "reading_key": row.reading_key,
+                    "anchor_id": anchor.id,
+                    "leaf_index": index,
+                    "leaf": leaf,
+                    "proof": json.dumps(proof, separators=(",", ":")),
+                }
+                for index, (row, leaf, proof) in enumerate(zip(rows, leaves, proofs))
+            ])
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return None
+
+        logger.info(f"🌳 Built anchor for {window_start} ({len(rows)} records, root {root.hex()[:16]}...)")
+        return anchor
+
+    @staticmethod
+    def build_closed_windows(db: Session, now: Optional[datetime] = None) -> List[UsageAnchor]:
+        """Build anchors for every closed window with unanchored records"""
+        now = now or datetime.now()
+        # Windows ending before this have closed on every worker's clock
+        cutoff = AnchorService.window_start(now - timedelta(seconds=settings.anchor_grace_seconds))
+        built = []
+
+        last_end = db.query(func.max(UsageAnchor.window_end)).scalar()
+        while True:
+            query = db.query(func.min(WaterUsageRecord.created_at)).filter(WaterUsageRecord.created_at < cutoff)
+            if last_end is not None:
+                query = query.filter(WaterUsageRecord.created_at >= last_end)
+            first = query.scalar()
+            if first is None:
+                return built
+
+            window_start = AnchorService.window_start(first)
+            window_end = window_start + AnchorService.window_length()
+            anchor = AnchorService._build(db, window_start, window_end)
+            if anchor is not None:
+                built.append(anchor)
+            last_end = window_end
+
+    @staticmethod
+    async def send_pending(db: Session) -> Dict[str, int]:
+        """Post the memos of unsent anchors, oldest first; stops at the first failure"""
+        now = datetime.now()
+        sendable = or_(
+            UsageAnchor.status.in_(["pending", "failed"]),
+            and_(UsageAnchor.status == "sending", UsageAnchor.attempted_at < now - STALE_SEND)
+        )
+        counts = {"anchored": 0, "failed": 0}
+
+        for anchor in db.query(UsageAnchor).filter(sendable).order_by(UsageAnchor.window_start).all():
+            # Claim the send; another worker may have got there first
+            claimed = db.query(UsageAnchor).filter(UsageAnchor.id == anchor.id, sendable).update(
+                {"status": "sending", "attempted_at": now, "attempts": UsageAnchor.attempts + 1},
+                synchronize_session=False
+            )
+            db.commit()
+            if not claimed:
+                continue
+
+            result = await get_watercredits_service().post_memo(anchor.memo)
+            db.refresh(anchor)
+            if result.get("success"):
+                anchor.status = "anchored"
+                anchor.transaction_signature = result["transaction_signature"]
+                anchor.anchored_at = datetime.now()
+                anchor.error = None
+                counts["anchored"] += 1
+            else:
+                anchor.status = "failed"
+                anchor.error = result.get("error")
+                counts["failed"] += 1
+            db.commit()
+
+            if anchor.status == "failed":
+                logger.warning(f"⚠️  Anchor for {anchor.window_start} not posted: {anchor.error}")
+                break
+
+        return counts
+
+    @staticmethod
+    @traced()
+    async def run(db: Session) -> Dict[str, int]:
+        """Build anchors for closed windows and post pending memos"""
+        built = AnchorService.build_closed_windows(db)
+        counts = await AnchorService.send_pending(db)
+        return {"built": len(built), **counts}
+
+    @staticmethod
+    def get_proof(db: Session, record_id: Optional[int] = None,
+                  reading_key: Optional[str] = None) -> Optional[Dict]:
+        """Proof of a record (by ID or reading key) with its anchor, None if not anchored yet"""
+        query = db.query(UsageProof, UsageAnchor).join(UsageAnchor, UsageAnchor.id == UsageProof.anchor_id)
+        if record_id is not None:
+            query = query.filter(UsageProof.record_id == record_id)
+        else:
+            query = query.filter(UsageProof.reading_key == reading_key)
+        found = query.first()
+        if found is None:
+            return None
+
+        proof, anchor = found
+        signature = anchor.transaction_signature
+        return {
+            "record_id": proof.record_id,
+            "reading_key": proof.reading_key,
+            "leaf": proof.leaf,
+            "leaf_index": proof.leaf_index,
+            "proof": json.loads(proof.proof),
+            "merkle_root": anchor.merkle_root,
+            "anchor": AnchorService.anchor_summary(anchor),
+            "explorer_url": (
+                f"https://explorer.solana.com/tx/{signature}?cluster={settings.solana_network}"
+                if signature else None
+            ),
+        }
+
+    @staticmethod
+    def anchor_summary(anchor: UsageAnchor) -> Dict:
+        return {
+            "id": anchor.id,
+            "window_start": anchor.window_start,
+            "window_end": anchor.window_end,
+            "leaves": anchor.leaves,
+            "merkle_root": anchor.merkle_root,
+            "memo": anchor.memo,
+            "status": anchor.status,
+            "transaction_signature": anchor.transaction_signature,
+            "attempts": anchor.attempts,
+            "anchored_at": anchor.anchored_at,
+        }
+
+    @staticmethod
+    def list_anchors(db: Session, limit: int = 50) -> List[Dict]:
+        anchors = db.query(UsageAnchor).order_by(UsageAnchor.window_start.desc()).limit(limit).all()
+        return [AnchorService.anchor_summary(anchor) for anchor in anchors]
+
+
+class AnchorScheduler:
+    """Background task running AnchorService.run after each window closes"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            db = SessionLocal()
+            try:
+                result = await AnchorService.run(db)
+                if result["built"] or result["anchored"] or result["failed"]:
+                    logger.info(f"⚓ Anchoring: {result}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error anchoring usage records: {e}")
+            finally:
+                db.close()
+
+            now = datetime.now()
+            next_run = (
+                AnchorService.window_start(now) + AnchorService.window_length()
+                + timedelta(seconds=settings.anchor_grace_seconds)
+            )
+            await asyncio.sleep(max(1.0, (next_run - now).total_seconds()))
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+anchor_scheduler = AnchorScheduler()
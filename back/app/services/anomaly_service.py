@@ -0,0 +1,332 @@
+"""
+Streaming Anomaly Detection
+
+Every accepted reading updates its farm's baseline for that hour of day in
+dry or rainy weather (rainfall of at least ANOMALY_RAIN_MM): an EWMA mean
+and variance and a quantile sketch of water_liters, all O(1) per reading.
+Before the update the reading is checked against the baseline:
+
+  spike       ANOMALY_Z_THRESHOLD standard deviations above the bucket mean
+  night_flow  flow during ANOMALY_NIGHT_HOURS at an hour the farm is not
+              known to irrigate (too few readings, or a median below
+              ANOMALY_FLOW_LITERS) - the usual sign of a leak
+  rain_usage  flow while it rains, at ANOMALY_RAIN_USAGE_RATIO or more of
+              the farm's dry-weather mean for that hour
+
+Flagged readings are stored in usage_anomalies and still feed the baseline,
+so a new pattern that persists becomes normal after ANOMALY_MIN_SAMPLES
+readings. Baselines live in memory. At startup each process rebuilds them
+from the last ANOMALY_SEED_DAYS of hourly rollups, which hold the readings
+of every worker, and then learns from the readings it ingests itself.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Awaitable, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.sketch import EwmaStats, QuantileSketch
+from app.core.tracing import span
+from app.models.database import SessionLocal, UsageAnomaly
+from app.models.schemas import UsageAnomalyInfo
+from app.services.rollup_service import RollupService
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+ANOMALY_KINDS = ("spike", "night_flow", "rain_usage")
+STREAM_KEEPALIVE_SECONDS = 15.0
+STREAM_BATCH = 500
+
+
+def parse_hours(spec: str) -> FrozenSet[int]:
+    """Hours in an inclusive "start-end" range, wrapping past midnight"""
+    if not spec.strip():
+        return frozenset()
+    start, end = (int(part) % 24 for part in spec.split("-"))
+    hours = {start}
+    while start != end:
+        start = (start + 1) % 24
+        hours.add(start)
+    return frozenset(hours)
+
+
+class _Bucket:
+    """Baseline of one farm at one hour of day and weather"""
+
+    __slots__ = ("stats", "sketch")
+
+    def __init__(self):
+        self.stats = EwmaStats(settings.anomaly_ewma_alpha)
+        self.sketch = QuantileSketch()
+
+    @property
+    def learned(self) -> bool:
+        return self.stats.count >= settings.anomaly_min_samples
+
+
+class AnomalyDetector:
+    """Per-farm, per-hour, per-weather baselines and the rules checked against them"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[Tuple[int, int, bool], _Bucket] = {}
+        self.night_hours = parse_hours(settings.anomaly_night_hours)
+
+    def _bucket(self, farm_id: int, hour: int, rain: bool) -> _Bucket:
+        key = (farm_id, hour, rain)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket()
+        return bucket
+
+    def check(
+        self,
+        farm_id: int,
+        timestamp: datetime,
+        water_liters: float,
+        rainfall_mm: Optional[float]
+    ) -> List[Dict]:
+        """Anomalies of a reading against its baseline, which it then updates"""
+        hour = timestamp.hour
+        rain = rainfall_mm is not None and rainfall_mm >= settings.anomaly_rain_mm
+        flow = water_liters > settings.anomaly_flow_liters
+        found = []
+
+        with self._lock:
+            bucket = self._bucket(farm_id, hour, rain)
+            stats = bucket.stats
+
+            if bucket.learned:
+                zscore = stats.zscore(water_liters, settings.anomaly_min_std_liters)
+                if zscore >= settings.anomaly_z_threshold:
+                    found.append({
+                        "kind": "spike",
+                        "baseline_liters": stats.mean,
+                        "zscore": zscore,
+                        "detail": (
+                            f"{water_liters:.1f} L is {zscore:.1f} standard deviations above "
+                            f"the usual {stats.mean:.1f} L at {hour:02d}:00"
+                        ),
+                    })
+
+            if flow and hour in self.night_hours:
+                median = bucket.sketch.quantile(0.5)
+                if not bucket.learned or median <= settings.anomaly_flow_liters:
+                    found.append({
+                        "kind": "night_flow",
+                        "baseline_liters": stats.mean if stats.count else None,
+                        "zscore": None,
+                        "detail": f"Flow of {water_liters:.1f} L at {hour:02d}:00, when the farm does not irrigate",
+                    })
+
+            if flow and rain:
+                dry = self._buckets.get((farm_id, hour, False))
+                if (
+                    dry is not None and dry.learned and dry.stats.mean > settings.anomaly_flow_liters
+                    and water_liters >= settings.anomaly_rain_usage_ratio * dry.stats.mean
+                ):
+                    found.append({
+                        "kind": "rain_usage",
+                        "baseline_liters": dry.stats.mean,
+                        "zscore": None,
+                        "detail": (
+                            f"{water_liters:.1f} L during {rainfall_mm:.1f} mm of rain "
+                            f"({water_liters / dry.stats.mean:.0%} of the dry-weather {dry.stats.mean:.1f} L)"
+                        ),
+                    })
+
+            stats.update(water_liters)
+            bucket.sketch.add(water_liters)
+
+        return found
+
+    def seed(self, rollups: Dict[str, np.ndarray]) -> int:
+        """
+        Replace the baselines with ones rebuilt from hourly rollups
+
+        Each farm-hour adds its mean reading to the bucket of its hour of day
+        and weather (rain if its mean rainfall reaches ANOMALY_RAIN_MM), oldest
+        first, and the bucket counts every reading it covers. Returns the
+        number of buckets.
+        """
+        order = np.argsort(rollups["hour"], kind="stable")
+        readings = rollups["readings"][order]
+        rain_count = rollups["rainfall_count"][order]
+        rain = (rain_count > 0) & (
+            rollups["rainfall_sum"][order] >= settings.anomaly_rain_mm * np.maximum(rain_count, 1)
+        )
+        rows = zip(
+            rollups["farm_id"][order].tolist(),
+            (rollups["hour"][order].astype("datetime64[h]").astype(np.int64) % 24).tolist(),
+            rain.tolist(),
+            (rollups["water_liters"][order] / np.maximum(readings, 1)).tolist(),
+            readings.tolist()
+        )
+
+        with self._lock:
+            self._buckets = {}
+            covered: Dict[_Bucket, int] = {}
+            for farm_id, hour, is_rain, mean_liters, count in rows:
+                if count <= 0:
+                    continue
+                bucket = self._bucket(farm_id, hour, is_rain)
+                bucket.stats.update(mean_liters)
+                bucket.sketch.add(mean_liters)
+                covered[bucket] = covered.get(bucket, 0) + count
+            # Learned after ANOMALY_MIN_SAMPLES readings, not hours
+            for bucket, count in covered.items():
+                bucket.stats.count = count
+            return len(self._buckets)
+
+    def baselines(self, farm_id: Optional[int] = None) -> List[Dict]:
+        """Learned baselines, by farm, hour and weather"""
+        with self._lock:
+            items = sorted(
+                (key, bucket) for key, bucket in self._buckets.items()
+                if farm_id is None or key[0] == farm_id
+            )
+            return [
+                {
+                    "farm_id": key[0],
+                    "hour": key[1],
+                    "rain": key[2],
+                    "readings": bucket.stats.count,
+                    "mean_liters": round(bucket.stats.mean, 3),
+                    "std_liters": round(bucket.stats.std, 3),
+                    "p50_liters": bucket.sketch.quantile(0.5),
+                    "p95_liters": bucket.sketch.quantile(0.95),
+                }
+                for key, bucket in items
+            ]
+
+
+anomaly_detector = AnomalyDetector()
+
+
+class AnomalyService:
+    """Service for flagging and serving usage anomalies"""
+
+    @staticmethod
+    def enabled() -> bool:
+        return settings.anomaly_detection_enabled
+
+    @staticmethod
+    def seed(db: Session) -> int:
+        """Rebuild this process's baselines from recent hourly rollups"""
+        if not AnomalyService.enabled() or settings.anomaly_seed_days <= 0:
+            return 0
+        start = datetime.now() - timedelta(days=settings.anomaly_seed_days)
+        buckets = anomaly_detector.seed(RollupService.load_arrays(db, start))
+        logger.info(f"Anomaly baselines seeded: {buckets} buckets from {settings.anomaly_seed_days} days of rollups")
+        return buckets
+
+    @staticmethod
+    def observe(
+        db: Session,
+        readings: Iterable[Tuple[Optional[str], int, datetime, float, Optional[float]]]
+    ) -> int:
+        """
+        Check committed readings and store their anomalies
+
+        Takes (reading_key, farm_id, timestamp, water_liters, rainfall_mm)
+        tuples. Never raises: a failure here must not fail ingestion.
+        """
+        if not AnomalyService.enabled():
+            return 0
+
+        try:
+            rows = []
+            with span("anomaly.check"):
+                for key, farm_id, timestamp, water_liters, rainfall_mm in readings:
+                    for anomaly in anomaly_detector.check(farm_id, timestamp, water_liters, rainfall_mm):
+                        rows.append({
+                            "farm_id": farm_id,
+                            "reading_key": key,
+                            "timestamp": timestamp,
+                            "water_liters": water_liters,
+                            "rainfall_mm": rainfall_mm,
+                            "detected_at": datetime.now(),
+                            **anomaly,
+                        })
+            if rows:
+                db.execute(insert(UsageAnomaly.__table__), rows)
+                db.commit()
+                for row in rows:
+                    logger.warning(f"🚨 Farm {row['farm_id']} {row['kind']}: {row['detail']}")
+            return len(rows)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error checking readings for anomalies: {e}")
+            return 0
+
+    @staticmethod
+    def list_anomalies(
+        db: Session,
+        farm_id: Optional[int] = None,
+        kind: Optional[str] = None,
+        since: Optional[datetime] = None,
+        limit: int = 100
+    ) -> List[UsageAnomaly]:
+        """Most recent anomalies first"""
+        query = db.query(UsageAnomaly)
+        if farm_id is not None:
+            query = query.filter(UsageAnomaly.farm_id == farm_id)
+        if kind is not None:
+            query = query.filter(UsageAnomaly.kind == kind)
+        if since is not None:
+            query = query.filter(UsageAnomaly.timestamp >= since)
+        return query.order_by(UsageAnomaly.id.desc()).limit(limit).all()
+
+    @staticmethod
+    async def stream(
+        is_disconnected: Callable[[], Awaitable[bool]],
+        after_id: Optional[int] = None,
+        farm_id: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        """
+        Server-sent events of new anomalies
+
+        Polls usage_anomalies by ID, so anomalies flagged by any worker are
+        delivered. The event ID is the anomaly ID: a client reconnecting with
+        Last-Event-ID continues where it left off.
+        """
+        if after_id is None:
+            db = SessionLocal()
+            try:
+                after_id = db.query(func.max(UsageAnomaly.id)).scalar() or 0
+            finally:
+                db.close()
+
+        last_event = time.monotonic()
+        while not await is_disconnected():
+            db = SessionLocal()
+            try:
+                query = db.query(UsageAnomaly).filter(UsageAnomaly.id > after_id)
+                if farm_id is not None:
+                    query = query.filter(UsageAnomaly.farm_id == farm_id)
+                anomalies = query.order_by(UsageAnomaly.id).limit(STREAM_BATCH).all()
+            finally:
+                db.close()
+
+            for anomaly in anomalies:
+                after_id = anomaly.id
+                data = UsageAnomalyInfo.model_validate(anomaly).model_dump_json()
+                yield f"id: {anomaly.id}\nevent: anomaly\ndata: {data}\n\n"
+
+            now = time.monotonic()
+            if anomalies:
+                last_event = now
+            elif now - last_event >= STREAM_KEEPALIVE_SECONDS:
+                last_event = now
+                yield ": keepalive\n\n"
+
+            if len(anomalies) < STREAM_BATCH:
+                await asyncio.sleep(settings.anomaly_stream_poll_seconds)
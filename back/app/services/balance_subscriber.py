@@ -0,0 +1,192 @@
+"""
+Push-based WaterCredits balance cache
+
+A background task keeps an accountSubscribe websocket subscription open for
+each distinct farm token account and for the mint, and mirrors their balances and
+the token supply in memory. Balance lookups are served from memory instead
+of an RPC round trip. After any disconnect the subscriptions are re-opened
+and the cache is resynced with one bulk getMultipleAccounts call, so
+updates missed while offline are not lost.
+"""
+
+import asyncio
+import logging
+import struct
+import time
+from typing import Dict, List, Optional
+
+from solana.rpc.api import Client
+from solana.rpc.commitment import Confirmed
+from solana.rpc.websocket_api import connect
+from solders.account_decoder import UiAccountEncoding
+from solders.commitment_config import CommitmentLevel
+from solders.pubkey import Pubkey
+from solders.rpc.config import RpcAccountInfoConfig
+from solders.rpc.requests import AccountSubscribe
+from solders.rpc.responses import AccountNotification, SubscriptionResult
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# SPL Token account layouts
+TOKEN_ACCOUNT_AMOUNT_OFFSET = 64  # mint (32) + owner (32)
+MINT_SUPPLY_OFFSET = 36  # mint_authority option (4 + 32)
+
+# getMultipleAccounts accepts at most 100 keys per call
+MULTIPLE_ACCOUNTS_LIMIT = 100
+MAX_RECONNECT_DELAY_SECONDS = 30.0
+
+
+def _read_u64(data: bytes, offset: int) -> Optional[int]:
+    """Little-endian u64 at offset, or None if the account data is too short"""
+    if len(data) < offset + 8:
+        return None
+    return struct.unpack_from("<Q", data, offset)[0]
+
+
+def websocket_url(rpc_url: str) -> str:
+    """Websocket endpoint matching an HTTP RPC URL"""
+    if rpc_url.startswith("https://"):
+        return "wss://" + rpc_url[len("https://"):]
+    if rpc_url.startswith("http://"):
+        return "ws://" + rpc_url[len("http://"):]
+    return rpc_url
+
+
+class BalanceSubscriber:
+    """In-memory mirror of the farm token account balances and mint supply"""
+
+    def __init__(self, client: Client, mint: Pubkey, token_accounts: Dict[int, Pubkey],
+                 ws_url: Optional[str] = None):
+        self.client = client
+        self.mint = mint
+        self.token_accounts = token_accounts
+        self.ws_url = ws_url or settings.solana_ws_url or websocket_url(settings.solana_rpc_url)
+
+        # Raw amounts in token units; None means the account does not exist
+        self._amounts: Dict[Pubkey, Optional[int]] = {}
+        self._supply: Optional[int] = None
+        self._slots: Dict[Pubkey, int] = {}  # Slot of the newest data applied per account
+        self._task: Optional[asyncio.Task] = None
+
+        self.live = False  # True while subscribed and resynced
+        self.resyncs = 0
+        self.notifications = 0
+        self.last_update: Optional[float] = None
+
+    def _apply(self, pubkey: Pubkey, data: Optional[bytes], slot: int):
+        """Update the cache from an account's raw data, ignoring anything older than we hold"""
+        if slot < self._slots.get(pubkey, -1):
+            return
+        self._slots[pubkey] = slot
+        if pubkey == self.mint:
+            self._supply = _read_u64(data, MINT_SUPPLY_OFFSET) if data else None
+        else:
+            self._amounts[pubkey] = _read_u64(data, TOKEN_ACCOUNT_AMOUNT_OFFSET) if data else None
+        self.last_update = time.time()
+
+    def _watched(self) -> List[Pubkey]:
+        """
+        Mint and distinct token accounts, in a stable order
+
+        Farms without their own wallet share the authority's account; it is
+        subscribed and fetched once, and every farm mapped to it reads the
+        same cache entry.
+        """
+        return list(dict.fromkeys([self.mint, *self.token_accounts.values()]))
+
+    def resync(self):
+        """Reload every watched account with bulk getMultipleAccounts calls"""
+        accounts = self._watched()
+        for i in range(0, len(accounts), MULTIPLE_ACCOUNTS_LIMIT):
+            chunk = accounts[i:i + MULTIPLE_ACCOUNTS_LIMIT]
+            response = self.client.get_multiple_accounts(chunk, commitment=Confirmed)
+            for pubkey, account in zip(chunk, response.value):
+                self._apply(pubkey, bytes(account.data) if account else None, response.context.slot)
+        self.resyncs += 1
+        logger.info(f"🔄 Balance cache resynced ({len(accounts)} accounts)")
+
+    async def _listen(self):
+        """Subscribe, resync, then apply notifications until the socket drops"""
+        async with connect(self.ws_url) as ws:
+            watched = self._watched()
+            config = RpcAccountInfoConfig(encoding=UiAccountEncoding.Base64, commitment=CommitmentLevel.Confirmed)
+            # Request id = index into watched
+            await ws.send_data([AccountSubscribe(pubkey, config, i) for i, pubkey in enumerate(watched)])
+
+            # Subscribed before the bulk fetch, so no change can fall in between;
+            # notifications buffered meanwhile are applied after it, by slot
+            await asyncio.to_thread(self.resync)
+
+            subscriptions: Dict[int, Pubkey] = {}
+            self.live = True
+            logger.info(f"📡 Balance subscriber live on {self.ws_url}")
+
+            async for messages in ws:
+                for message in messages:
+                    if isinstance(message, SubscriptionResult):
+                        subscriptions[message.result] = watched[message.id]
+                    elif isinstance(message, AccountNotification):
+                        pubkey = subscriptions.get(message.subscription)
+                        if pubkey is not None:
+                            self._apply(pubkey, bytes(message.result.value.data), message.result.context.slot)
+                            self.notifications += 1
+
+    async def _run(self):
+        """Keep the subscription alive, reconnecting with backoff"""
+        delay = 1.0
+        while True:
+            try:
+                await self._listen()
+                delay = 1.0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️  Balance subscriber disconnected: {e}")
+            finally:
+                self.live = False
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY_SECONDS)
+
+    def start(self):
+        """Start the background subscription task on the running event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def balance_units(self, farm_id: int) -> Optional[int]:
+        """
+        Cached balance of a farm's token account in token units
+
+        Raises:
+            KeyError: if the cache cannot answer (not live or farm not watched)
+        """
+        pubkey = self.token_accounts.get(farm_id)
+        if not self.live or pubkey is None or pubkey not in self._amounts:
+            raise KeyError(farm_id)
+        return self._amounts[pubkey]
+
+    def supply_units(self) -> Optional[int]:
+        """Cached mint supply in token units, or None if not known"""
+        return self._supply if self.live else None
+
+    def status(self) -> Dict:
+        return {
+            "live": self.live,
+            "accounts": len(self._watched()),
+            "farms": len(self.token_accounts),
+            "resyncs": self.resyncs,
+            "notifications": self.notifications,
+            "last_update": self.last_update,
+        }
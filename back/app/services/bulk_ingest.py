@@ -0,0 +1,205 @@
+"""
+Bulk Ingestion
+
+Field gateways that were offline upload their backlog in one streamed
+request body, as NDJSON (one reading per line) or as a stream of msgpack
+maps. Readings are parsed as the body arrives and written in batches of
+INGEST_BATCH_SIZE through WaterManagementService.record_usage_batch, so an
+upload of any size is held in memory one batch at a time.
+
+Admission waits instead of failing: while the global rate limit or the load
+shedder holds a batch back, the body is simply not read, and TCP flow
+control slows the gateway down. Only after INGEST_BULK_MAX_WAIT_SECONDS is
+the upload cut short, with the line to resume from.
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+import orjson
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.schemas import WaterUsageData
+from app.services.ingest_guard import ingest_guard
+from app.services.traffic_capture import traffic_capture
+from app.services.water_service import WaterManagementService
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+NDJSON_CONTENT_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+MSGPACK_CONTENT_TYPES = {"application/msgpack", "application/x-msgpack", "application/vnd.msgpack"}
+
+# A line longer than this is rejected without buffering the rest of it
+MAX_LINE_BYTES = 64 * 1024
+MAX_REPORTED_ERRORS = 20
+
+
+class MalformedLine(Exception):
+    """A line or object that could not be decoded"""
+
+
+def msgpack_available() -> bool:
+    """Check whether the optional msgpack dependency is installed"""
+    try:
+        import msgpack  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """(line number, decoded value or MalformedLine) per non-blank line"""
+    buffer = bytearray()
+    line = 0
+    too_long = False
+
+    def decode(raw: bytes) -> Any:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError as e:
+            return MalformedLine(f"Invalid JSON: {e}")
+
+    async for chunk in chunks:
+        buffer += chunk
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            raw = bytes(buffer[start:end]).strip()
+            start = end + 1
+            line += 1
+            if too_long:
+                too_long = False
+                yield line, MalformedLine(f"Line longer than {MAX_LINE_BYTES} bytes")
+            elif raw:
+                yield line, decode(raw)
+        del buffer[:start]
+
+        if len(buffer) > MAX_LINE_BYTES:
+            # Drop the rest of this line as it arrives
+            too_long = True
+            buffer.clear()
+
+    line += 1
+    if too_long:
+        yield line, MalformedLine(f"Line longer than {MAX_LINE_BYTES} bytes")
+    elif buffer.strip():
+        yield line, decode(bytes(buffer))
+
+
+async def iter_msgpack(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """(object number, decoded value) per msgpack object; stops at corrupt data"""
+    import msgpack
+
+    unpacker = msgpack.Unpacker(raw=False, max_buffer_size=16 * MAX_LINE_BYTES, timestamp=3)
+    number = 0
+    try:
+        async for chunk in chunks:
+            unpacker.feed(chunk)
+            for value in unpacker:
+                number += 1
+                yield number, value
+    except (msgpack.UnpackException, ValueError) as e:
+        # A msgpack stream cannot be resynchronised after corrupt data
+        yield number + 1, MalformedLine(f"Invalid msgpack data: {e}")
+
+
+class BulkIngestService:
+    """Streams a bulk upload into batched writes"""
+
+    @staticmethod
+    async def _admit(readings: int) -> bool:
+        """Wait for admission of a batch; False once the wait limit is reached"""
+        deadline = time.monotonic() + settings.ingest_bulk_max_wait_seconds
+        while True:
+            rejection = ingest_guard.admit_bulk(readings)
+            if rejection is None:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(rejection.retry_after, remaining, 1.0))
+
+    @staticmethod
+    async def ingest(db: Session, items: AsyncIterator[Tuple[int, Any]]) -> Dict:
+        """
+        Validate and record readings from a decoded stream
+
+        Returns the BulkIngestResponse fields.
+        """
+        lines = accepted = duplicates = 0
+        rejected: Counter = Counter()
+        errors: List[Dict] = []
+        batch: List[Tuple[int, WaterUsageData]] = []
+
+        def reject(line: int, reason: str, error: str):
+            rejected[reason] += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"line": line, "reason": reason, "error": error})
+
+        async def flush() -> bool:
+            nonlocal accepted, duplicates
+            readings = [reading for _, reading in batch]
+
+            if not await BulkIngestService._admit(len(readings)):
+                return False
+
+            try:
+                with ingest_guard.track():
+                    counts = await WaterManagementService.record_usage_batch(db, readings)
+                accepted += counts["accepted"]
+                duplicates += counts["duplicates"]
+                if traffic_capture:
+                    traffic_capture.record(readings)
+            except Exception as e:
+                for line, _ in batch:
+                    reject(line, "failed", str(e))
+            batch.clear()
+            return True
+
+        async for line, value in items:
+            lines += 1
+            if isinstance(value, MalformedLine):
+                reject(line, "malformed", str(value))
+                continue
+            try:
+                batch.append((line, WaterUsageData.model_validate(value)))
+            except ValidationError as e:
+                first = e.errors()[0]
+                field = ".".join(str(part) for part in first["loc"]) or "reading"
+                reject(line, "invalid", f"{field}: {first['msg']}")
+                continue
+
+            if len(batch) >= settings.ingest_batch_size and not await flush():
+                break
+        else:
+            if batch:
+                await flush()
+
+        resume_from_line = None
+        if batch:
+            # Still overloaded: the rest of the body is left unread
+            resume_from_line = batch[0][0]
+            for line, _ in batch:
+                reject(line, "overloaded", "Ingestion stayed overloaded; resend from resume_from_line")
+            logger.warning(f"⚠️  Bulk upload cut short at line {resume_from_line}")
+
+        logger.info(
+            f"Bulk upload: {lines} lines, {accepted} accepted, {duplicates} duplicates, "
+            f"{sum(rejected.values())} rejected"
+        )
+        return {
+            "lines": lines,
+            "accepted": accepted,
+            "duplicates": duplicates,
+            "rejected": dict(rejected),
+            "errors": errors,
+            "resume_from_line": resume_from_line,
+        }
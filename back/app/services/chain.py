@@ -0,0 +1,89 @@
+"""
+Chain Service Accessors
+
+The chain services pull in solana, solders, httpx and PIL and hold RPC
+clients, so they are imported and built on first use instead of when the
+API starts. Replicas that only serve dashboard reads never load them.
+
+In multi-worker mode (SIGNER_SOCKET set) each accessor returns a proxy to
+the signer process, so workers never hold the authority keypair. Local
+services all sign with one authority (load_authority).
+"""
+
+import importlib
+import logging
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from app.core.config import get_settings
+from app.services.signer_client import RemoteService
+
+if TYPE_CHECKING:
+    from solders.keypair import Keypair
+    from app.services.real_nft_service import ProductionNFTService
+    from app.services.solana_service import SolanaService
+    from app.services.watercredits_service import WaterCreditsService
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Service name -> (module, class) of its local implementation
+CHAIN_SERVICES = {
+    "watercredits": ("app.services.watercredits_service", "WaterCreditsService"),
+    "nft": ("app.services.real_nft_service", "ProductionNFTService"),
+    "solana": ("app.services.solana_service", "SolanaService"),
+}
+
+_services: Dict[str, Any] = {}
+_authority: Optional["Keypair"] = None
+_lock = threading.Lock()
+
+
+def load_authority() -> "Keypair":
+    """The SOLANA_AUTHORITY_KEY keypair, or a new one for this process if unset"""
+    from solders.keypair import Keypair
+
+    authority_key = os.getenv("SOLANA_AUTHORITY_KEY")
+    if authority_key:
+        return Keypair.from_base58_string(authority_key)
+
+    authority = Keypair()
+    logger.warning(f"⚠️  No SOLANA_AUTHORITY_KEY. Generated new keypair {authority.pubkey()} for all chain services.")
+    return authority
+
+
+def get_chain_service(name: str) -> Any:
+    """Shared instance of a chain service, imported and built on first use"""
+    service = _services.get(name)
+    if service is None:
+        with _lock:
+            service = _services.get(name)
+            if service is None:
+                if settings.signer_socket:
+                    service = RemoteService(name)
+                else:
+                    global _authority
+                    if _authority is None:
+                        _authority = load_authority()
+                    module, cls = CHAIN_SERVICES[name]
+                    service = getattr(importlib.import_module(module), cls)(authority=_authority)
+                _services[name] = service
+    return service
+
+
+def loaded_chain_service(name: str) -> Optional[Any]:
+    """The chain service if it was already built, without building it"""
+    return _services.get(name)
+
+
+def get_watercredits_service() -> "WaterCreditsService":
+    return get_chain_service("watercredits")
+
+
+def get_nft_service() -> "ProductionNFTService":
+    return get_chain_service("nft")
+
+
+def get_solana_service() -> "SolanaService":
+    return get_chain_service("solana")
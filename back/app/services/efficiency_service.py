@@ -0,0 +1,127 @@
+"""
+Water Efficiency Scoring Engine
+
+Scores every farm in one vectorized NumPy pass over the hourly rollups.
+Usage is normalized for weather (rain lowers irrigation demand, heat and
+dry air raise it) and compared with the farm's quota pro-rated to the
+elapsed part of the period.
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.cache import PeriodCache
+from app.core.periods import period_key, period_bounds, period_elapsed_fraction
+from app.models.database import FarmProfile
+from app.models.schemas import EfficiencyReport, FarmEfficiency
+from app.services.rollup_service import RollupService, farm_rows
+
+logger = logging.getLogger(__name__)
+
+_cache = PeriodCache("efficiency")
+
+
+def _mean_or_nan(sums: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Elementwise sums / counts with NaN where there is no data"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def weather_demand_factor(
+    rainfall_mm: np.ndarray,
+    temperature_c: np.ndarray,
+    humidity_percent: np.ndarray
+) -> np.ndarray:
+    """
+    Relative irrigation demand implied by the weather
+
+    1.0 is a neutral day. Missing weather (NaN) counts as neutral.
+    """
+    rain_factor = 1.0 - np.minimum(0.5, np.nan_to_num(rainfall_mm, nan=0.0) / 20.0)
+    temp_factor = 1.0 + np.maximum(0.0, np.nan_to_num(temperature_c, nan=25.0) - 25.0) * 0.03
+    humidity_factor = 1.0 + np.maximum(0.0, 50.0 - np.nan_to_num(humidity_percent, nan=50.0)) * 0.02
+    return rain_factor * temp_factor * humidity_factor
+
+
+class EfficiencyService:
+    """Service for computing farm water efficiency scores"""
+
+    @staticmethod
+    def _compute(db: Session, period: str, now: datetime) -> EfficiencyReport:
+        """Score all farms for a period in one pass"""
+        start, end = period_bounds(period)
+
+        farms = db.query(FarmProfile.farm_id, FarmProfile.water_limit).order_by(FarmProfile.farm_id).all()
+        farm_ids = np.array([farm_id for farm_id, _ in farms], dtype=np.int64)
+        limits = np.array([limit for _, limit in farms], dtype=np.float64)
+
+        rollups = RollupService.load_arrays(db, start, end)
+        # Rollups for farms without a profile are ignored
+        index, known = farm_rows(farm_ids, rollups["farm_id"])
+        index = index[known]
+
+        factor = weather_demand_factor(
+            _mean_or_nan(rollups["rainfall_sum"], rollups["rainfall_count"])[known],
+            _mean_or_nan(rollups["temperature_sum"], rollups["temperature_count"])[known],
+            _mean_or_nan(rollups["humidity_sum"], rollups["humidity_count"])[known]
+        )
+        liters = rollups["water_liters"][known]
+
+        n = len(farm_ids)
+        used = np.bincount(index, weights=liters, minlength=n)
+        adjusted = np.bincount(index, weights=liters / factor, minlength=n)
+        readings = np.bincount(index, weights=rollups["readings"][known], minlength=n).astype(np.int64)
+
+        # Never pro-rate below one day so early-period scores stay meaningful
+        period_days = (end - start).days
+        elapsed = max(period_elapsed_fraction(period, now), 1.0 / period_days)
+        prorated = limits * elapsed
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.where(prorated > 0, adjusted / prorated, 0.0)
+        scores = np.clip(1.0 - 0.5 * ratio, 0.0, 1.0)
+
+        return EfficiencyReport(
+            period=period,
+            computed_at=now,
+            farms=[
+                FarmEfficiency(
+                    farm_id=int(farm_ids[i]),
+                    water_used=round(float(used[i]), 2),
+                    weather_adjusted_usage=round(float(adjusted[i]), 2),
+                    prorated_limit=round(float(prorated[i]), 2),
+                    usage_ratio=round(float(ratio[i]), 4),
+                    efficiency_score=round(float(scores[i]), 4),
+                    readings=int(readings[i])
+                )
+                for i in range(n)
+            ]
+        )
+
+    @staticmethod
+    def get_report(db: Session, period: Optional[str] = None) -> EfficiencyReport:
+        """
+        Get efficiency scores for all farms, cached per period until new
+        readings arrive or, while the period is open, until the hour changes
+        """
+        period = period or period_key()
+        period_bounds(period)  # Validate before caching anything under this key
+        # The pro-rated quota grows with the elapsed time; score as of the hour
+        now = datetime.now().replace(minute=0, second=0, microsecond=0)
+        elapsed = period_elapsed_fraction(period, now)
+        return _cache.get_or_compute(
+            period,
+            lambda: EfficiencyService._compute(db, period, now),
+            bucket=now if 0.0 < elapsed < 1.0 else None
+        )
+
+    @staticmethod
+    def get_farm_score(db: Session, farm_id: int, period: Optional[str] = None) -> Optional[float]:
+        """Efficiency score of a single farm, or None if the farm is unknown"""
+        report = EfficiencyService.get_report(db, period)
+        scores: Dict[int, float] = {farm.farm_id: farm.efficiency_score for farm in report.farms}
+        return scores.get(farm_id)
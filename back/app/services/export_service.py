@@ -0,0 +1,170 @@
+"""
+Usage History Export Service
+
+Streams water usage records as CSV or Parquet straight from a
+server-side cursor, one fixed-size chunk at a time.
+"""
+
+import csv
+import io
+import logging
+from datetime import datetime
+from typing import Iterator, List, Optional
+
+from sqlalchemy import select
+
+from app.core.config import get_settings
+from app.models.database import SessionLocal, WaterUsageRecord
+from app.services.partition_service import PartitionService
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+EXPORT_COLUMNS = [
+    "id",
+    "farm_id",
+    "timestamp",
+    "water_liters",
+    "tokens_consumed",
+    "rainfall_mm",
+    "temperature_c",
+    "humidity_percent",
+    "solana_tx_id",
+]
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to the caller"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._buffer.extend(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+class UsageExportService:
+    """Service for exporting raw usage history"""
+
+    @staticmethod
+    def _iter_chunks(
+        farm_id: Optional[int],
+        start: Optional[datetime],
+        end: Optional[datetime],
+        chunk_size: int
+    ) -> Iterator[List[tuple]]:
+        """Yield lists of record tuples read through a server-side cursor"""
+        columns = [getattr(WaterUsageRecord, name) for name in EXPORT_COLUMNS]
+        query = select(*columns).order_by(WaterUsageRecord.timestamp, WaterUsageRecord.id)
+
+        if farm_id is not None:
+            query = query.where(WaterUsageRecord.farm_id == farm_id)
+        if start is not None:
+            query = query.where(WaterUsageRecord.timestamp >= start)
+        if end is not None:
+            query = query.where(WaterUsageRecord.timestamp < end)
+
+        # The generator outlives the request-scoped session, so it owns its own
+        db = SessionLocal()
+        try:
+            # Reads archived months too, merged by (timestamp, id)
+            yield from PartitionService.iter_chunks(
+                db, query, key=lambda row: (row[2], row[0]), chunk_size=chunk_size, start=start, end=end
+            )
+        finally:
+            db.close()
+
+    @staticmethod
+    def stream_csv(
+        farm_id: Optional[int] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        chunk_size: Optional[int] = None
+    ) -> Iterator[bytes]:
+        """Stream usage records as CSV, one encoded chunk per cursor batch"""
+        chunk_size = chunk_size or settings.export_chunk_size
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        writer.writerow(EXPORT_COLUMNS)
+        yield buffer.getvalue().encode("utf-8")
+
+        for rows in UsageExportService._iter_chunks(farm_id, start, end, chunk_size):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(
+                (row[0], row[1], row[2].isoformat(), *row[3:])
+                for row in rows
+            )
+            yield buffer.getvalue().encode("utf-8")
+
+    @staticmethod
+    def stream_parquet(
+        farm_id: Optional[int] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        chunk_size: Optional[int] = None
+    ) -> Iterator[bytes]:
+        """Stream usage records as Parquet, one row group per cursor batch"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        chunk_size = chunk_size or settings.export_chunk_size
+        schema = pa.schema([
+            ("id", pa.int64()),
+            ("farm_id", pa.int32()),
+            ("timestamp", pa.timestamp("us")),
+            ("water_liters", pa.float64()),
+            ("tokens_consumed", pa.float64()),
+            ("rainfall_mm", pa.float64()),
+            ("temperature_c", pa.float64()),
+            ("humidity_percent", pa.float64()),
+            ("solana_tx_id", pa.string()),
+        ])
+
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema)
+        try:
+            for rows in UsageExportService._iter_chunks(farm_id, start, end, chunk_size):
+                columns = list(zip(*rows))
+                batch = pa.RecordBatch.from_arrays(
+                    [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                    schema=schema
+                )
+                writer.write_batch(batch)
+                yield sink.drain()
+        finally:
+            writer.close()
+        yield sink.drain()
+
+    @staticmethod
+    def parquet_available() -> bool:
+        """Check whether the optional pyarrow dependency is installed"""
+        try:
+            import pyarrow.parquet  # noqa: F401
+            return True
+        except ImportError:
+            return False
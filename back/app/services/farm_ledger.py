@@ -0,0 +1,195 @@
+"""
+In-memory Farm Ledger
+
+Farm statistics and balances are the hottest reads, so every farm's limit,
+lifetime totals and current-period counters are kept in memory as parallel
+arrays (one slot per farm, found through a farm ID index) and served without
+touching SQLite.
+
+The database stays authoritative: writers commit to farm_profiles and
+farm_period_usage first (write-through) and then apply the same deltas to
+the ledger. Every farm write bumps the "farms" generation (shared between
+workers with SHARED_STATE_PATH); when the generation moved by more than this
+process's own write, or the period rolled over, the ledger reloads from the
+database on the next read.
+"""
+
+import logging
+import threading
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.cache import bump_generation, get_generation
+from app.core.periods import period_key
+from app.models.database import FarmPeriodUsage, FarmProfile
+
+logger = logging.getLogger(__name__)
+
+LEDGER_GENERATION = "farms"
+
+
+class FarmEntry(NamedTuple):
+    """One farm's ledger row"""
+    farm_id: int
+    water_limit: float
+    total_water_used: float
+    total_tokens_consumed: float
+    period_liters: float  # Current period
+    period_tokens: float
+    period_readings: int
+
+
+class FarmDelta(NamedTuple):
+    """A committed change to one farm"""
+    farm_id: int
+    water_limit: float
+    water_liters: float
+    tokens_consumed: float
+    period: str  # Period of the readings
+    readings: int = 1
+
+
+class FarmLedger:
+    """Array-backed table of farm limits, totals and current-period usage"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._slots: Dict[int, int] = {}
+        self._columns()
+        self.period: Optional[str] = None
+        # "farms" generation the arrays reflect; None forces a reload
+        self.generation: Optional[int] = None
+        self.loads = 0
+
+    def _columns(self):
+        self.farm_ids = array("q")
+        self.water_limit = array("d")
+        self.total_water_used = array("d")
+        self.total_tokens_consumed = array("d")
+        self.period_liters = array("d")
+        self.period_tokens = array("d")
+        self.period_readings = array("q")
+
+    def _add_slot(self, farm_id: int, water_limit: float) -> int:
+        slot = self._slots[farm_id] = len(self.farm_ids)
+        self.farm_ids.append(farm_id)
+        self.water_limit.append(water_limit)
+        for column in (self.total_water_used, self.total_tokens_consumed,
+                       self.period_liters, self.period_tokens):
+            column.append(0.0)
+        self.period_readings.append(0)
+        return slot
+
+    def load(self, db: Session):
+        """Rebuild the arrays from farm_profiles and the current period's counters"""
+        # Read before the queries: a write landing meanwhile forces another load
+        generation = get_generation(LEDGER_GENERATION)
+        period = period_key()
+
+        farms = db.query(
+            FarmProfile.farm_id,
+            FarmProfile.water_limit,
+            FarmProfile.total_water_used,
+            FarmProfile.total_tokens_consumed
+        ).order_by(FarmProfile.farm_id).all()
+        usage = {
+            farm_id: (liters, tokens, readings)
+            for farm_id, liters, tokens, readings in db.query(
+                FarmPeriodUsage.farm_id,
+                FarmPeriodUsage.water_liters,
+                FarmPeriodUsage.tokens_consumed,
+                FarmPeriodUsage.readings
+            ).filter(FarmPeriodUsage.period == period)
+        }
+
+        with self._lock:
+            self._slots = {}
+            self._columns()
+            for farm_id, water_limit, total_water, total_tokens in farms:
+                slot = self._add_slot(farm_id, water_limit)
+                self.total_water_used[slot] = total_water or 0.0
+                self.total_tokens_consumed[slot] = total_tokens or 0.0
+                if farm_id in usage:
+                    liters, tokens, readings = usage[farm_id]
+                    self.period_liters[slot] = liters
+                    self.period_tokens[slot] = tokens
+                    self.period_readings[slot] = readings
+            self.period = period
+            self.generation = generation
+            self.loads += 1
+
+        logger.info(f"📒 Farm ledger loaded ({len(farms)} farms, period {period})")
+
+    def _fresh(self, db: Session):
+        if self.generation != get_generation(LEDGER_GENERATION) or self.period != period_key():
+            self.load(db)
+
+    def _entry(self, slot: int) -> FarmEntry:
+        return FarmEntry(
+            self.farm_ids[slot],
+            self.water_limit[slot],
+            self.total_water_used[slot],
+            self.total_tokens_consumed[slot],
+            self.period_liters[slot],
+            self.period_tokens[slot],
+            self.period_readings[slot],
+        )
+
+    def get(self, db: Session, farm_id: int) -> Optional[FarmEntry]:
+        """A farm's row, None if the farm has no profile"""
+        self._fresh(db)
+        with self._lock:
+            slot = self._slots.get(farm_id)
+            return self._entry(slot) if slot is not None else None
+
+    def all(self, db: Session) -> List[FarmEntry]:
+        """Every farm's row, by farm ID"""
+        self._fresh(db)
+        with self._lock:
+            return [self._entry(slot) for slot in range(len(self.farm_ids))]
+
+    def apply(self, deltas: Iterable[FarmDelta]):
+        """
+        Apply changes already committed to the database
+
+        If another process (or a write that skipped the ledger) changed farms
+        since the last sync, the ledger is marked stale instead.
+        """
+        deltas = list(deltas)
+        if not deltas:
+            return
+
+        with self._lock:
+            generation = bump_generation(LEDGER_GENERATION)
+            if self.generation is None or generation != self.generation + 1:
+                self.generation = None
+                return
+
+            for delta in deltas:
+                slot = self._slots.get(delta.farm_id)
+                if slot is None:
+                    slot = self._add_slot(delta.farm_id, delta.water_limit)
+                self.total_water_used[slot] += delta.water_liters
+                self.total_tokens_consumed[slot] += delta.tokens_consumed
+                if delta.period == self.period:
+                    self.period_liters[slot] += delta.water_liters
+                    self.period_tokens[slot] += delta.tokens_consumed
+                    self.period_readings[slot] += delta.readings
+            self.generation = generation
+
+    def invalidate(self):
+        """Force a reload on the next read (after writes that bypass apply)"""
+        bump_generation(LEDGER_GENERATION)
+
+    def status(self) -> Dict:
+        return {
+            "farms": len(self.farm_ids),
+            "period": self.period,
+            "generation": self.generation,
+            "loads": self.loads,
+        }
+
+
+farm_ledger = FarmLedger()
@@ -0,0 +1,137 @@
+"""
+Quota Burn-down Forecasting
+
+Projects each farm's usage to the end of the current period and the
+moment it is expected to cross its water limit. Trends for all farms are
+fitted at once: hourly rollups are laid out as a farms x hours matrix of
+cumulative usage and a least-squares slope is taken along each row.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.cache import PeriodCache
+from app.core.config import get_settings
+from app.core.periods import period_key, period_bounds
+from app.models.database import FarmProfile
+from app.models.schemas import FarmForecast, ForecastReport
+from app.services.rollup_service import RollupService, farm_rows, truncate_to_hour
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_cache = PeriodCache("forecast")
+
+
+def fit_hourly_rates(cumulative: np.ndarray) -> np.ndarray:
+    """
+    Least-squares slope of every row of a cumulative usage matrix
+
+    Args:
+        cumulative: farms x hours matrix of cumulative liters
+
+    Returns:
+        Liters per hour for each farm
+    """
+    hours = cumulative.shape[1]
+    if hours < 2:
+        return cumulative[:, -1].astype(np.float64) if hours else np.zeros(cumulative.shape[0])
+
+    t = np.arange(hours, dtype=np.float64)
+    t_centered = t - t.mean()
+    y_centered = cumulative - cumulative.mean(axis=1, keepdims=True)
+    return (y_centered @ t_centered) / (t_centered @ t_centered)
+
+
+class ForecastService:
+    """Service for projecting quota burn-down"""
+
+    @staticmethod
+    def _compute(db: Session, now: datetime) -> ForecastReport:
+        """Forecast all farms for the current period"""
+        period = period_key(now)
+        start, end = period_bounds(period)
+
+        farms = db.query(FarmProfile.farm_id, FarmProfile.water_limit).order_by(FarmProfile.farm_id).all()
+        farm_ids = np.array([farm_id for farm_id, _ in farms], dtype=np.int64)
+        limits = np.array([limit for _, limit in farms], dtype=np.float64)
+        n = len(farm_ids)
+
+        current_hour = truncate_to_hour(now)
+        window_start = max(start, current_hour - timedelta(hours=settings.forecast_window_hours - 1))
+        window_hours = int((current_hour - window_start).total_seconds() // 3600) + 1
+
+        rollups = RollupService.load_arrays(db, start, end)
+        row, known = farm_rows(farm_ids, rollups["farm_id"])
+        row, liters, hour = row[known], rollups["water_liters"][known], rollups["hour"][known]
+
+        # Usage before the fitting window only contributes to the running total
+        col = ((hour - np.datetime64(window_start, "s")) // np.timedelta64(1, "h")).astype(np.int64)
+        before = col < 0
+        in_window = ~before & (col < window_hours)
+
+        hourly = np.zeros((n, window_hours), dtype=np.float64)
+        np.add.at(hourly, (row[in_window], col[in_window]), liters[in_window])
+        baseline = np.bincount(row[before], weights=liters[before], minlength=n)
+        cumulative = baseline[:, None] + np.cumsum(hourly, axis=1)
+
+        used = baseline + hourly.sum(axis=1)
+        rates = np.maximum(fit_hourly_rates(cumulative), 0.0)
+
+        hours_left = max((end - now).total_seconds() / 3600.0, 0.0)
+        projected = used + rates * hours_left
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            hours_to_limit = np.where(rates > 0, (limits - used) / rates, np.inf)
+            projected_pct = np.where(limits > 0, projected / limits * 100, 0.0)
+
+        forecasts = []
+        for i in range(n):
+            if used[i] > limits[i]:
+                crossing = now  # Already over the limit
+            elif hours_to_limit[i] <= hours_left:
+                crossing = now + timedelta(hours=float(hours_to_limit[i]))
+            else:
+                crossing = None
+
+            forecasts.append(FarmForecast(
+                farm_id=int(farm_ids[i]),
+                water_used=round(float(used[i]), 2),
+                water_limit=float(limits[i]),
+                hourly_rate=round(float(rates[i]), 2),
+                projected_usage=round(float(projected[i]), 2),
+                projected_percentage=round(float(projected_pct[i]), 2),
+                projected_status="economy" if projected[i] <= limits[i] else "overspend",
+                limit_crossing_at=crossing
+            ))
+
+        return ForecastReport(
+            period=period,
+            period_end=end,
+            computed_at=now,
+            farms=forecasts
+        )
+
+    @staticmethod
+    def get_report(db: Session) -> ForecastReport:
+        """Forecast all farms, cached until the next reading is ingested or the hour changes"""
+        now = datetime.now()
+        period = period_key(now)
+        return _cache.get_or_compute(
+            period,
+            lambda: ForecastService._compute(db, now),
+            bucket=truncate_to_hour(now)
+        )
+
+    @staticmethod
+    def get_farm_forecast(db: Session, farm_id: int) -> Optional[FarmForecast]:
+        """Forecast for a single farm, or None if the farm is unknown"""
+        report = ForecastService.get_report(db)
+        for forecast in report.farms:
+            if forecast.farm_id == farm_id:
+                return forecast
+        return None
@@ -0,0 +1,89 @@
+"""
+Consumption Heatmap
+
+Farms × hour of day (or × day of week) matrices of water usage for one
+period, built in one NumPy pass over the hourly rollups and returned as
+plain arrays, so the dashboard can draw when farms irrigate without
+downloading raw readings.
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.cache import PeriodCache
+from app.core.periods import period_key, period_bounds
+from app.models.database import FarmProfile
+from app.services.rollup_service import RollupService, farm_rows
+
+logger = logging.getLogger(__name__)
+
+_cache = PeriodCache("heatmap")
+
+HEATMAP_COLUMNS = {
+    "hour": [f"{hour:02d}:00" for hour in range(24)],
+    "weekday": ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"],
+}
+
+# 1970-01-01 was a Thursday
+_EPOCH_WEEKDAY = 3
+
+
+def heatmap_columns(hours: np.ndarray, by: str) -> np.ndarray:
+    """Column of each rollup hour: hour of day (0-23) or day of week (0 = Monday)"""
+    if by == "hour":
+        return hours.astype("datetime64[h]").astype(np.int64) % 24
+    return (hours.astype("datetime64[D]").astype(np.int64) + _EPOCH_WEEKDAY) % 7
+
+
+class HeatmapService:
+    """Service for farm × time-of-day consumption matrices"""
+
+    @staticmethod
+    def _compute(db: Session, period: str, by: str) -> Dict:
+        """Total, mean and reading count per farm and column in one pass"""
+        start, end = period_bounds(period)
+
+        farm_ids = np.array(
+            [farm_id for farm_id, in db.query(FarmProfile.farm_id).order_by(FarmProfile.farm_id)],
+            dtype=np.int64
+        )
+        rollups = RollupService.load_arrays(db, start, end)
+        # Rollups for farms without a profile are ignored
+        index, known = farm_rows(farm_ids, rollups["farm_id"])
+
+        n, width = len(farm_ids), len(HEATMAP_COLUMNS[by])
+        cells = index[known] * width + heatmap_columns(rollups["hour"][known], by)
+        total = np.bincount(cells, weights=rollups["water_liters"][known], minlength=n * width).reshape(n, width)
+        readings = np.bincount(cells, weights=rollups["readings"][known], minlength=n * width).reshape(n, width)
+
+        # Liters per reading; NaN (null in JSON) where a farm has no readings
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = np.where(readings > 0, total / np.maximum(readings, 1), np.nan)
+
+        return {
+            "period": period,
+            "by": by,
+            "computed_at": datetime.now(),
+            "farm_ids": farm_ids,
+            "columns": HEATMAP_COLUMNS[by],
+            "total_liters": np.round(total, 2),
+            "mean_liters": np.round(mean, 2),
+            "readings": readings.astype(np.int64),
+        }
+
+    @staticmethod
+    def get_heatmap(db: Session, period: Optional[str] = None, by: str = "hour") -> Dict:
+        """Get the heatmap of a period, cached until new readings arrive"""
+        if by not in HEATMAP_COLUMNS:
+            raise ValueError(f"Invalid heatmap axis '{by}', expected one of: {', '.join(HEATMAP_COLUMNS)}")
+        period = period or period_key()
+        period_bounds(period)  # Validate before caching anything under this key
+        return _cache.get_or_compute(
+            period,
+            lambda: HeatmapService._compute(db, period, by),
+            key=by
+        )
@@ -0,0 +1,93 @@
+"""
+Idempotent Ingestion
+
+Readings are identified by a key built from the client-supplied reading ID
+or, failing that, the farm and reading timestamp. Recently seen keys are
+kept in a bounded LRU so retries are rejected in O(1) without touching the
+database; the unique index on WaterUsageRecord.reading_key is the durable
+backstop for keys that have been evicted or were seen before a restart.
+
+A retry that arrives while the original is still being ingested waits for
+it to finish; if it does not finish in time, the retry is refused with
+ReadingInFlight rather than answered before the outcome is known.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from app.core.config import get_settings
+from app.models.schemas import WaterUsageData
+
+settings = get_settings()
+
+# Poll interval while waiting for another request's claim on a key
+CLAIM_POLL_SECONDS = 0.05
+
+
+class ReadingInFlight(Exception):
+    """Another request is still ingesting the same reading; retry later"""
+
+
+def reading_key(usage_data: WaterUsageData) -> str:
+    """Idempotency key of a reading"""
+    if usage_data.reading_id:
+        return f"{usage_data.farm_id}#{usage_data.reading_id}"
+    return f"{usage_data.farm_id}@{usage_data.timestamp.isoformat()}"
+
+
+class RecentKeyCache:
+    """Bounded LRU of recently ingested reading keys and their responses"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._inflight = set()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the stored response for a key, refreshing its recency"""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+            return result
+
+    def put(self, key: str, result: Dict):
+        """Remember the response of an ingested reading"""
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def claim(self, key: str) -> bool:
+        """Mark a key as being ingested; False if another request holds it"""
+        with self._lock:
+            if key in self._inflight:
+                return False
+            self._inflight.add(key)
+            return True
+
+    async def wait_claim(self, key: str, timeout: float) -> bool:
+        """claim() a key, waiting up to timeout seconds for another request to release it"""
+        deadline = time.monotonic() + timeout
+        while not self.claim(key):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(CLAIM_POLL_SECONDS, remaining))
+        return True
+
+    def release(self, key: str):
+        """Release a key claimed with claim()"""
+        with self._lock:
+            self._inflight.discard(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+recent_readings = RecentKeyCache(settings.ingest_dedupe_cache_size)
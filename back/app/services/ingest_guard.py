@@ -0,0 +1,205 @@
+"""
+Ingestion Backpressure
+
+Token buckets limit readings per farm and globally, so one flooding gateway
+is throttled on its own bucket before it can crowd out other farms. A load
+shedder tracks an exponentially weighted moving average of ingest latency
+and the number of in-flight ingests, and rejects new readings while the
+database is saturated, before SQLite lock contention cascades into the
+dashboard.
+
+Limits are per process; with several workers each enforces its own share.
+"""
+
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, NamedTuple, Optional
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Idle (full) farm buckets are dropped once this many are tracked
+MAX_TRACKED_FARMS = 10000
+
+
+class Rejection(NamedTuple):
+    """Why a reading was not admitted"""
+    status_code: int  # 429 (rate limited) or 503 (overloaded)
+    retry_after: int  # Seconds, for the Retry-After header
+    detail: str
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `burst`"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, n: float = 1.0, now: Optional[float] = None) -> float:
+        """Take n tokens; returns 0 on success, else seconds until n are available"""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self.tokens >= n:
+            self.tokens -= n
+            return 0.0
+        if self.rate <= 0 or n > self.burst:
+            return math.inf
+        return (n - self.tokens) / self.rate
+
+    def refund(self, n: float = 1.0):
+        self.tokens = min(self.burst, self.tokens + n)
+
+    def is_full(self, now: float) -> bool:
+        return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+
+class LoadShedder:
+    """
+    Sheds ingest load on high latency or too many in-flight requests
+
+    The latency average decays with wall-clock time as well as with new
+    samples, so shedding ends on its own once traffic backs off.
+    """
+
+    HALF_LIFE_SECONDS = 1.0
+
+    def __init__(self, latency_threshold_ms: float, max_inflight: int, alpha: float = 0.2):
+        self.latency_threshold_ms = latency_threshold_ms
+        self.max_inflight = max_inflight
+        self.alpha = alpha
+        self.latency_ms = 0.0
+        self.inflight = 0
+        self.updated = time.monotonic()
+
+    def current_latency_ms(self, now: float) -> float:
+        return self.latency_ms * 0.5 ** (max(0.0, now - self.updated) / self.HALF_LIFE_SECONDS)
+
+    def observe(self, latency_ms: float, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        self.latency_ms = (1 - self.alpha) * self.current_latency_ms(now) + self.alpha * latency_ms
+        self.updated = now
+
+    def overloaded(self, now: Optional[float] = None) -> Optional[str]:
+        """Reason to shed, or None"""
+        now = time.monotonic() if now is None else now
+        if self.max_inflight and self.inflight >= self.max_inflight:
+            return f"{self.inflight} ingests in flight"
+        if self.latency_threshold_ms and self.current_latency_ms(now) > self.latency_threshold_ms:
+            return f"ingest latency {self.current_latency_ms(now):.0f}ms"
+        return None
+
+
+class IngestGuard:
+    """Admission control for /api/water-usage"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._farms: Dict[int, TokenBucket] = {}
+        self._global = TokenBucket(settings.ingest_global_rate_per_second, settings.ingest_global_burst)
+        self.shedder = LoadShedder(settings.ingest_shed_latency_ms, settings.ingest_max_inflight)
+        self.rejected = {"farm": 0, "global": 0, "shed": 0}
+
+    def _farm_bucket(self, farm_id: int, now: float) -> TokenBucket:
+        bucket = self._farms.get(farm_id)
+        if bucket is None:
+            if len(self._farms) >= MAX_TRACKED_FARMS:
+                # A full bucket is indistinguishable from a new one
+                self._farms = {k: b for k, b in self._farms.items() if not b.is_full(now)}
+            bucket = self._farms[farm_id] = TokenBucket(
+                settings.ingest_farm_rate_per_second, settings.ingest_farm_burst
+            )
+        return bucket
+
+    def admit(self, farm_id: int, readings: int = 1) -> Optional[Rejection]:
+        """Take tokens for a farm's readings, or explain why they are rejected"""
+        now = time.monotonic()
+        with self._lock:
+            reason = self.shedder.overloaded(now)
+            if reason:
+                self.rejected["shed"] += 1
+                return Rejection(503, 1, f"Ingestion overloaded ({reason}), retry later")
+
+            if settings.ingest_farm_rate_per_second > 0:
+                bucket = self._farm_bucket(farm_id, now)
+                wait = bucket.take(readings, now)
+                if wait:
+                    self.rejected["farm"] += 1
+                    return Rejection(429, _retry_after(wait), f"Rate limit exceeded for farm {farm_id}")
+            else:
+                bucket = None
+
+            if settings.ingest_global_rate_per_second > 0:
+                wait = self._global.take(readings, now)
+                if wait:
+                    # Don't charge the farm for a reading that was not admitted
+                    if bucket is not None:
+                        bucket.refund(readings)
+                    self.rejected["global"] += 1
+                    return Rejection(429, _retry_after(wait), "Global ingestion rate limit exceeded")
+
+        return None
+
+    def admit_bulk(self, readings: int) -> Optional[Rejection]:
+        """
+        Take tokens for a batch of a bulk upload (backlog catch-up)
+
+        Backlogs are far larger than a farm's burst, so bulk batches are only
+        shed under overload and charged to the global bucket; callers wait
+        and retry instead of failing the upload.
+        """
+        now = time.monotonic()
+        with self._lock:
+            reason = self.shedder.overloaded(now)
+            if reason:
+                self.rejected["shed"] += 1
+                return Rejection(503, 1, f"Ingestion overloaded ({reason}), retry later")
+
+            if settings.ingest_global_rate_per_second > 0:
+                wait = self._global.take(min(readings, self._global.burst), now)
+                if wait:
+                    return Rejection(429, _retry_after(wait), "Global ingestion rate limit exceeded")
+
+        return None
+
+    @contextmanager
+    def track(self):
+        """Count an admitted ingest as in flight and feed its latency to the shedder"""
+        with self._lock:
+            self.shedder.inflight += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            finished = time.monotonic()
+            with self._lock:
+                self.shedder.inflight -= 1
+                self.shedder.observe((finished - started) * 1000, finished)
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                "inflight": self.shedder.inflight,
+                "latency_ms_ewma": round(self.shedder.current_latency_ms(time.monotonic()), 2),
+                "tracked_farms": len(self._farms),
+                "rejected": dict(self.rejected),
+            }
+
+
+def _retry_after(wait: float) -> int:
+    """Whole seconds for Retry-After (at least 1; a day if the request can never fit)"""
+    return 86400 if math.isinf(wait) else max(1, math.ceil(wait))
+
+
+ingest_guard = IngestGuard()
@@ -0,0 +1,163 @@
+"""
+Address Lookup Table management
+
+v0 transactions can reference accounts through an on-chain address lookup
+table (ALT) with a 1-byte index instead of a full 32-byte key. We keep one
+ALT holding the WaterCredits mint, the farm token accounts and the program
+IDs, so batch operations fit many more instructions per transaction.
+"""
+
+import logging
+import struct
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from solana.rpc.api import Client
+from solana.rpc.commitment import Finalized
+from solders.address_lookup_table_account import (
+    ID as ADDRESS_LOOKUP_TABLE_PROGRAM_ID,
+    LOOKUP_TABLE_MAX_ADDRESSES,
+    AddressLookupTable,
+    AddressLookupTableAccount,
+    derive_lookup_table_address,
+)
+from solders.instruction import Instruction, AccountMeta
+from solders.keypair import Keypair
+from solders.pubkey import Pubkey
+
+from app.services.tx_sender import TransactionSender
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROGRAM_ID = Pubkey.from_string("11111111111111111111111111111111")
+# Keeps each extend transaction under the packet size limit
+EXTEND_CHUNK_SIZE = 20
+
+
+def create_lookup_table_ix(
+    authority: Pubkey,
+    payer: Pubkey,
+    recent_slot: int
+) -> Tuple[Instruction, Pubkey]:
+    """CreateLookupTable instruction and the derived table address"""
+    table, bump = derive_lookup_table_address(authority, recent_slot)
+    data = struct.pack("<I Q B", 0, recent_slot, bump)  # 0 = CreateLookupTable
+    ix = Instruction(
+        program_id=ADDRESS_LOOKUP_TABLE_PROGRAM_ID,
+        accounts=[
+            AccountMeta(pubkey=table, is_signer=False, is_writable=True),
+            AccountMeta(pubkey=authority, is_signer=True, is_writable=False),
+            AccountMeta(pubkey=payer, is_signer=True, is_writable=True),
+            AccountMeta(pubkey=SYSTEM_PROGRAM_ID, is_signer=False, is_writable=False),
+        ],
+        data=data
+    )
+    return ix, table
+
+
+def extend_lookup_table_ix(
+    table: Pubkey,
+    authority: Pubkey,
+    payer: Pubkey,
+    addresses: Sequence[Pubkey]
+) -> Instruction:
+    """ExtendLookupTable instruction"""
+    data = struct.pack("<I Q", 2, len(addresses)) + b"".join(bytes(a) for a in addresses)  # 2 = Extend
+    return Instruction(
+        program_id=ADDRESS_LOOKUP_TABLE_PROGRAM_ID,
+        accounts=[
+            AccountMeta(pubkey=table, is_signer=False, is_writable=True),
+            AccountMeta(pubkey=authority, is_signer=True, is_writable=False),
+            AccountMeta(pubkey=payer, is_signer=True, is_writable=True),
+            AccountMeta(pubkey=SYSTEM_PROGRAM_ID, is_signer=False, is_writable=False),
+        ],
+        data=data
+    )
+
+
+class LookupTableManager:
+    """Creates, extends and caches the service's address lookup table"""
+
+    def __init__(self, client: Client, authority: Keypair, sender: TransactionSender,
+                 address: Optional[Pubkey] = None):
+        self.client = client
+        self.authority = authority
+        self.sender = sender
+        self.address = address
+        self._account: Optional[AddressLookupTableAccount] = None
+
+    async def _send(self, instructions: List[Instruction]):
+        """Send a legacy transaction signed by the authority and wait for it"""
+        sent = await self.sender.send_instructions(instructions, [self.authority], label="Lookup table")
+        if not sent["success"]:
+            raise RuntimeError(f"Lookup table transaction failed: {sent['error']}")
+        return sent["signature"]
+
+    async def create(self) -> Dict:
+        """Create a new, empty lookup table owned by the authority"""
+        recent_slot = self.client.get_slot(commitment=Finalized).value
+        ix, table = create_lookup_table_ix(self.authority.pubkey(), self.authority.pubkey(), recent_slot)
+        signature = await self._send([ix])
+
+        self.address = table
+        self._account = AddressLookupTableAccount(key=table, addresses=[])
+
+        logger.info(f"📇 Lookup table created: {table}")
+        logger.info(f"💾 Save this to .env:")
+        logger.info(f"   WATERCREDITS_LOOKUP_TABLE={table}")
+
+        return {"lookup_table": str(table), "transaction_signature": str(signature)}
+
+    def load(self) -> Optional[AddressLookupTableAccount]:
+        """Fetch the table's addresses from chain"""
+        if not self.address:
+            return None
+
+        info = self.client.get_account_info(self.address).value
+        if info is None:
+            logger.warning(f"⚠️  Lookup table {self.address} not found on chain")
+            self._account = None
+            return None
+
+        table = AddressLookupTable.deserialize(bytes(info.data))
+        self._account = AddressLookupTableAccount(key=self.address, addresses=list(table.addresses))
+        return self._account
+
+    async def extend(self, addresses: Sequence[Pubkey]) -> List[str]:
+        """Add any addresses the table does not hold yet, returns transaction signatures"""
+        account = self._account or self.load()
+        if account is None:
+            raise RuntimeError("Lookup table not created yet")
+
+        known = {str(a) for a in account.addresses}
+        missing = []
+        for address in addresses:
+            if str(address) not in known:
+                known.add(str(address))
+                missing.append(address)
+
+        if len(account.addresses) + len(missing) > LOOKUP_TABLE_MAX_ADDRESSES:
+            raise RuntimeError(f"Lookup table would exceed {LOOKUP_TABLE_MAX_ADDRESSES} addresses")
+
+        signatures = []
+        for i in range(0, len(missing), EXTEND_CHUNK_SIZE):
+            chunk = missing[i:i + EXTEND_CHUNK_SIZE]
+            ix = extend_lookup_table_ix(self.address, self.authority.pubkey(), self.authority.pubkey(), chunk)
+            signatures.append(str(await self._send([ix])))
+
+        if missing:
+            self._account = AddressLookupTableAccount(
+                key=self.address,
+                addresses=list(account.addresses) + missing
+            )
+            logger.info(f"📇 Added {len(missing)} addresses to lookup table {self.address}")
+
+        return signatures
+
+    def table_accounts(self) -> List[AddressLookupTableAccount]:
+        """Lookup tables to compile v0 messages against (empty if none configured)"""
+        if self._account is None and self.address:
+            try:
+                self.load()
+            except Exception as e:
+                logger.warning(f"Could not load lookup table: {e}")
+        return [self._account] if self._account else []
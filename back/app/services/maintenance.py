@@ -0,0 +1,33 @@
+"""
+Startup Maintenance
+
+One-time database work before serving: create and upgrade tables, backfill
+rollups and period counters for databases that predate them, and archive
+closed months. It must run once per deployment, not once per worker: in
+multi-worker mode the signer runs it before it starts listening, and the
+workers, which start only once the signer socket exists, skip it.
+"""
+
+import logging
+
+from app.models.database import init_db, SessionLocal
+from app.services.rollup_service import RollupService
+from app.services.period_service import PeriodUsageService
+from app.services.partition_service import PartitionService
+
+logger = logging.getLogger(__name__)
+
+
+def run_startup_maintenance():
+    """Initialize the database and bring derived tables up to date"""
+    init_db()
+    logger.info("Database initialized")
+
+    db = SessionLocal()
+    try:
+        RollupService.ensure_backfilled(db)
+        PeriodUsageService.ensure_backfilled(db)
+        if PartitionService.enabled():
+            PartitionService.archive_closed_periods(db)
+    finally:
+        db.close()
@@ -0,0 +1,268 @@
+"""
+Monthly Usage Partitions
+
+New readings always land in the hot `water_usage_records` table. Closed
+months older than the hot window are moved whole into one SQLite file per
+month (PARTITION_DIR/water_usage_YYYY-MM.db), recorded in the
+`usage_partitions` catalog. Inserts then only touch the small hot indexes,
+old months can be archived or dropped as files, and time-range reads open
+just the partitions their range overlaps and merge them in order.
+
+Rows keep their IDs when moved, so cursors and exports stay stable. The
+unique reading_key index only covers the hot table, so ingestion looks up
+retries of readings from archived months in their month's partition
+(find_archived).
+"""
+
+import heapq
+import logging
+import os
+import threading
+from datetime import datetime
+from itertools import chain, islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import MetaData, create_engine, delete, func, insert, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.periods import period_bounds, period_key
+from app.models.database import UsagePartition, WaterUsageRecord, engine
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# The dashboard reads 30 days of history (and deltas within it), so the hot
+# window always covers the current and the previous month
+MIN_HOT_MONTHS = 2
+
+_archive_table = WaterUsageRecord.__table__.to_metadata(MetaData(), schema="archive")
+_engines: Dict[str, Engine] = {}
+_engines_lock = threading.Lock()
+
+
+def partition_path(period: str) -> str:
+    return os.path.join(settings.partition_dir, f"water_usage_{period}.db")
+
+
+def _engine(path: str) -> Engine:
+    """Cached engine for a partition file"""
+    with _engines_lock:
+        engine = _engines.get(path)
+        if engine is None:
+            engine = _engines[path] = create_engine(
+                f"sqlite:///{path}", connect_args={"check_same_thread": False}
+            )
+        return engine
+
+
+def _shift_months(period: str, months: int) -> str:
+    start, _ = period_bounds(period)
+    index = start.year * 12 + start.month - 1 + months
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+class PartitionService:
+    """Service for monthly partitions of the usage records table"""
+
+    @staticmethod
+    def enabled() -> bool:
+        return bool(settings.partition_dir)
+
+    @staticmethod
+    def archived_engines(
+        db: Session,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> List[Engine]:
+        """Engines of the archived partitions overlapping [start, end), oldest first"""
+        partitions = db.query(UsagePartition).order_by(UsagePartition.period).all()
+        engines = []
+        for partition in partitions:
+            period_start, period_end = period_bounds(partition.period)
+            if (end is None or period_start < end) and (start is None or period_end > start):
+                engines.append(_engine(partition.path))
+        return engines
+
+    @staticmethod
+    def find_archived(db: Session, readings: Dict[str, datetime]) -> Dict[str, Any]:
+        """
+        Archived records of reading keys, by key
+
+        Takes {reading_key: reading timestamp}; only readings from months
+        before the hot window are looked up, each in its month's partition.
+        """
+        first_hot = _shift_months(period_key(), -(MIN_HOT_MONTHS - 1))
+        by_period: Dict[str, List[str]] = {}
+        for key, timestamp in readings.items():
+            period = period_key(timestamp)
+            if period < first_hot:
+                by_period.setdefault(period, []).append(key)
+        if not by_period:
+            return {}
+
+        records = WaterUsageRecord.__table__
+        found = {}
+        partitions = db.query(UsagePartition).filter(UsagePartition.period.in_(list(by_period))).all()
+        for partition in partitions:
+            with _engine(partition.path).connect() as conn:
+                rows = conn.execute(
+                    select(records).where(records.c.reading_key.in_(by_period[partition.period]))
+                )
+                found.update((row.reading_key, row) for row in rows)
+        return found
+
+    @staticmethod
+    def fetch_all(
+        db: Session,
+        query,
+        key: Callable,
+        reverse: bool = False,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> List:
+        """
+        Run a query against the hot table and every partition in [start, end)
+
+        Each source must return rows already ordered by `key`; the results
+        are merged into one ordered list.
+        """
+        sources: List[Iterable] = [db.execute(query).all()]
+        for engine in PartitionService.archived_engines(db, start, end):
+            with engine.connect() as conn:
+                sources.append(conn.execute(query).all())
+
+        if len(sources) == 1:
+            return list(sources[0])
+        return list(heapq.merge(*sources, key=key, reverse=reverse))
+
+    @staticmethod
+    def iter_chunks(
+        db: Session,
+        query,
+        key: Optional[Callable],
+        chunk_size: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Iterator[List]:
+        """
+        Stream a query across the hot table and partitions in chunks
+
+        With a key, each source must be ordered by it and the streams are
+        merged in order; without one they are read one after another.
+        """
+        engines = PartitionService.archived_engines(db, start, end)
+        query = query.execution_options(stream_results=True, yield_per=chunk_size)
+        result = db.execute(query)
+
+        if not engines:
+            for partition in result.partitions(chunk_size):
+                yield partition
+            return
+
+        connections = [engine.connect() for engine in engines]
+        try:
+            streams = [result] + [conn.execute(query) for conn in connections]
+            rows = heapq.merge(*streams, key=key) if key else chain(*streams)
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            for conn in connections:
+                conn.close()
+
+    @staticmethod
+    def archive_period(period: str) -> int:
+        """
+        Move a month's records from the hot table into its partition file
+
+        Safe to re-run: late readings for an archived month are swept into
+        the same file. Returns the number of records moved.
+        """
+        if not PartitionService.enabled():
+            raise ValueError("Partitioning is disabled (PARTITION_DIR is not set)")
+        start, end = period_bounds(period)
+        if period >= _shift_months(period_key(), -(MIN_HOT_MONTHS - 1)):
+            raise ValueError(f"Period {period} is inside the hot window")
+
+        path = partition_path(period)
+        os.makedirs(settings.partition_dir, exist_ok=True)
+        WaterUsageRecord.__table__.create(bind=_engine(path), checkfirst=True)
+
+        records = WaterUsageRecord.__table__
+        columns = [column.name for column in records.columns]
+
+        # One dedicated connection: the ATTACH must outlive the commit
+        with engine.connect() as conn:
+            conn.execute(text("ATTACH DATABASE :path AS archive"), {"path": path})
+            try:
+                # SQLite reuses max(id) + 1, so the newest record always stays hot
+                max_id = conn.execute(select(func.max(records.c.id))).scalar() or 0
+                in_period = [
+                    records.c.timestamp >= start,
+                    records.c.timestamp < end,
+                    records.c.id < max_id,
+                ]
+                moved = conn.execute(
+                    insert(_archive_table).from_select(
+                        columns,
+                        select(*[records.c[name] for name in columns]).where(*in_period)
+                    )
+                ).rowcount
+                conn.execute(delete(records).where(*in_period))
+
+                catalog = UsagePartition.__table__
+                if conn.execute(select(catalog.c.id).where(catalog.c.period == period)).first():
+                    conn.execute(catalog.update().where(catalog.c.period == period).values(
+                        records=catalog.c.records + moved, archived_at=datetime.now()
+                    ))
+                else:
+                    conn.execute(catalog.insert().values(
+                        period=period, path=path, records=moved, archived_at=datetime.now()
+                    ))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.execute(text("DETACH DATABASE archive"))
+
+        if moved:
+            logger.info(f"📦 Archived {moved} records of {period} to {path}")
+        return moved
+
+    @staticmethod
+    def archive_closed_periods(db: Session) -> Dict[str, int]:
+        """Archive every month older than the hot window"""
+        hot_months = max(MIN_HOT_MONTHS, settings.partition_hot_months)
+        first_hot = period_bounds(_shift_months(period_key(), -(hot_months - 1)))[0]
+
+        months = db.query(func.strftime("%Y-%m", WaterUsageRecord.timestamp)).filter(
+            WaterUsageRecord.timestamp < first_hot
+        ).distinct().all()
+        periods = sorted(month for (month,) in months)
+
+        return {period: PartitionService.archive_period(period) for period in periods}
+
+    @staticmethod
+    def drop_period(db: Session, period: str) -> bool:
+        """Delete an archived month's records (its rollups and period totals are kept)"""
+        partition = db.query(UsagePartition).filter(UsagePartition.period == period).first()
+        if not partition:
+            return False
+
+        with _engines_lock:
+            engine = _engines.pop(partition.path, None)
+        if engine is not None:
+            engine.dispose()
+
+        db.delete(partition)
+        db.commit()
+        if os.path.exists(partition.path):
+            os.remove(partition.path)
+
+        logger.info(f"🗑️  Dropped partition {period}")
+        return True
@@ -0,0 +1,191 @@
+"""
+Period Quota Accounting
+
+Keeps per-farm usage counters for each accounting period (calendar month),
+updated on ingest. Current-period statistics are a single indexed row
+lookup, and a new month starts from zero automatically because readings
+land in the row keyed by their own period.
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.core.periods import period_key
+from app.models.database import FarmPeriodUsage, FarmProfile, WaterUsageRollup
+from app.services.farm_ledger import farm_ledger
+
+logger = logging.getLogger(__name__)
+
+
+def usage_status(water_used: float, water_limit: float) -> Tuple[float, str]:
+    """Percentage of the limit used and the resulting status"""
+    percentage = (water_used / water_limit * 100) if water_limit > 0 else 0.0
+    return percentage, "economy" if percentage <= 100 else "overspend"
+
+
+def _counter_upsert():
+    """INSERT a period row, or add the row's counters to the existing one"""
+    table = FarmPeriodUsage.__table__
+    stmt = sqlite_insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.farm_id, table.c.period],
+        set_={
+            "water_liters": table.c.water_liters + stmt.excluded.water_liters,
+            "tokens_consumed": table.c.tokens_consumed + stmt.excluded.tokens_consumed,
+            "readings": table.c.readings + stmt.excluded.readings,
+            "last_updated": stmt.excluded.last_updated,
+        }
+    )
+
+
+_upsert = _counter_upsert()
+
+
+class PeriodUsageService:
+    """Service for per-period farm usage counters"""
+
+    @staticmethod
+    def _new_usage(farm_id: int, period: str, water_limit: float) -> FarmPeriodUsage:
+        return FarmPeriodUsage(
+            farm_id=farm_id,
+            period=period,
+            water_limit=water_limit,
+            water_liters=0.0,
+            tokens_consumed=0.0,
+            readings=0
+        )
+
+    @staticmethod
+    def apply(
+        db: Session,
+        farm_id: int,
+        water_limit: float,
+        timestamp: datetime,
+        water_liters: float,
+        tokens_consumed: float
+    ) -> FarmPeriodUsage:
+        """Add a reading to its period's counters (caller commits)"""
+        usages = PeriodUsageService.apply_many(
+            db, {farm_id: water_limit}, [(farm_id, timestamp, water_liters, tokens_consumed)]
+        )
+        return usages[(farm_id, period_key(timestamp))]
+
+    @staticmethod
+    def apply_many(
+        db: Session,
+        water_limits: Dict[int, float],
+        readings: Sequence[Tuple[int, datetime, float, float]]
+    ) -> Dict[Tuple[int, str], FarmPeriodUsage]:
+        """
+        Add a batch of (farm_id, timestamp, liters, tokens) readings to their
+        period counters with one upsert (caller commits)
+
+        Counters are incremented in SQL (ON CONFLICT DO UPDATE SET x = x + ...),
+        so concurrent workers never lose each other's readings. Returns the
+        touched counters, read back after the update, keyed by (farm_id, period).
+        """
+        sums: Dict[Tuple[int, str], list] = {}
+        for farm_id, timestamp, water_liters, tokens_consumed in readings:
+            key = (farm_id, period_key(timestamp))
+            acc = sums.get(key)
+            if acc is None:
+                acc = sums[key] = [0.0, 0.0, 0]
+            acc[0] += water_liters
+            acc[1] += tokens_consumed
+            acc[2] += 1
+        if not sums:
+            return {}
+
+        now = datetime.now()
+        db.execute(_upsert, [
+            {
+                "farm_id": farm_id,
+                "period": period,
+                "water_limit": water_limits[farm_id],  # Kept from when the period opened
+                "water_liters": water_liters,
+                "tokens_consumed": tokens_consumed,
+                "readings": count,
+                "last_updated": now,
+            }
+            for (farm_id, period), (water_liters, tokens_consumed, count) in sums.items()
+        ])
+
+        usages = db.query(FarmPeriodUsage).populate_existing().filter(
+            FarmPeriodUsage.farm_id.in_({farm_id for farm_id, _ in sums}),
+            FarmPeriodUsage.period.in_({period for _, period in sums})
+        )
+        return {
+            (usage.farm_id, usage.period): usage
+            for usage in usages
+            if (usage.farm_id, usage.period) in sums
+        }
+
+    @staticmethod
+    def get_usage(db: Session, farm_id: int, period: Optional[str] = None) -> Optional[FarmPeriodUsage]:
+        """Counters of one farm for a period (defaults to the current one)"""
+        return db.query(FarmPeriodUsage).filter(
+            FarmPeriodUsage.farm_id == farm_id,
+            FarmPeriodUsage.period == (period or period_key())
+        ).first()
+
+    @staticmethod
+    def get_period_usage(db: Session, period: Optional[str] = None) -> Dict[int, FarmPeriodUsage]:
+        """Counters of every farm with usage in a period, keyed by farm ID"""
+        rows = db.query(FarmPeriodUsage).filter(
+            FarmPeriodUsage.period == (period or period_key())
+        ).all()
+        return {row.farm_id: row for row in rows}
+
+    @staticmethod
+    def get_history(db: Session, farm_id: int, limit: int = 12) -> List[FarmPeriodUsage]:
+        """A farm's most recent periods with usage, newest first"""
+        return db.query(FarmPeriodUsage).filter(
+            FarmPeriodUsage.farm_id == farm_id
+        ).order_by(FarmPeriodUsage.period.desc()).limit(limit).all()
+
+    @staticmethod
+    def rebuild(db: Session) -> int:
+        """Recompute all period counters from the hourly rollups"""
+        db.query(FarmPeriodUsage).delete()
+
+        limits = dict(db.query(FarmProfile.farm_id, FarmProfile.water_limit).all())
+        query = select(
+            WaterUsageRollup.farm_id,
+            WaterUsageRollup.hour,
+            WaterUsageRollup.readings,
+            WaterUsageRollup.water_liters,
+            WaterUsageRollup.tokens_consumed
+        )
+
+        usages: Dict[tuple, FarmPeriodUsage] = {}
+        for farm_id, hour, readings, liters, tokens in db.execute(query):
+            key = (farm_id, period_key(hour))
+            usage = usages.get(key)
+            if usage is None:
+                limit = limits.get(farm_id)
+                usage = usages[key] = PeriodUsageService._new_usage(
+                    farm_id, key[1], limit if limit is not None else 0.0
+                )
+            usage.water_liters += liters
+            usage.tokens_consumed += tokens
+            usage.readings += readings
+
+        db.add_all(usages.values())
+        db.commit()
+        farm_ledger.invalidate()
+
+        logger.info(f"Rebuilt {len(usages)} period usage rows")
+        return len(usages)
+
+    @staticmethod
+    def ensure_backfilled(db: Session):
+        """Build period counters once for databases that predate them (after rollups)"""
+        has_usage = db.query(FarmPeriodUsage.id).first() is not None
+        has_rollups = db.query(WaterUsageRollup.id).first() is not None
+        if has_rollups and not has_usage:
+            PeriodUsageService.rebuild(db)
@@ -13,7 +13,6 @@ import os
 
 from solana.rpc.api import Client
 from solana.rpc.commitment import Confirmed
-from solana.transaction import Transaction
 from solders.keypair import Keypair
 from solders.pubkey import Pubkey
 from solders.system_program import create_account, CreateAccountParams
@@ -22,6 +21,9 @@ from solders.sysvar import RENT
 import struct
 
 from app.core.config import get_settings
+from app.core.tracing import span, traced
+from app.services.transaction_builder import TransactionBuilder
+from app.services.tx_sender import TransactionSender
 from app.utils.nft_image import generate_certificate_image, save_certificate_image
 
 logger = logging.getLogger(__name__)
@@ -37,12 +39,14 @@ class ProductionNFTService:
     SYSTEM_PROGRAM_ID = Pubkey.from_string("11111111111111111111111111111111")
     METADATA_PROGRAM_ID = Pubkey.from_string("metaqbxxUerdq28cj1RbAWkYQm3ybzjb6a8bt518x1s")
 
-    def __init__(self):
+    def __init__(self, authority: Optional[Keypair] = None):
         self.client = Client(settings.solana_rpc_url, commitment=Confirmed)
 
-        # Load authority from env or create new
+        # Shared authority, else load from env or create new
         authority_key = os.getenv("SOLANA_AUTHORITY_KEY")
-        if authority_key:
+        if authority is not None:
+            self.authority = authority
+        elif authority_key:
             self.authority = Keypair.from_base58_string(authority_key)
         else:
             self.authority = Keypair()
@@ -50,11 +54,17 @@ class ProductionNFTService:
             logger.info(f"   Public key: {self.authority.pubkey()}")
             logger.info(f"   Private key (save to .env): {base58.b58encode(bytes(self.authority)).decode()}")
 
-        # Ensure authority has balance
-        self._ensure_balance()
+        self.tx_builder = TransactionBuilder(self.client, self.authority.pubkey())
+        self.sender = TransactionSender(self.client, self.tx_builder)
+
+        # Checked before the first mint, so building the service costs no RPC
+        self._balance_checked = False
 
     def _ensure_balance(self):
-        """Ensure authority has SOL for transactions"""
+        """Ensure authority has SOL for transactions (once per process)"""
+        if self._balance_checked:
+            return
+        self._balance_checked = True
         try:
             balance_response = self.client.get_balance(self.authority.pubkey())
             balance = balance_response.value
@@ -96,6 +106,7 @@ class ProductionNFTService:
         metadata, _ = Pubkey.find_program_address(seeds, self.METADATA_PROGRAM_ID)
         return metadata
 
+    @traced()
     async def mint_nft_certificate(
         self,
         farm_id: int,
@@ -116,21 +127,25 @@ class ProductionNFTService:
         """
         try:
             logger.info(f"🎨 [REAL NFT] Starting production mint for Farm #{farm_id}")
+            self._ensure_balance()
 
             # 1. Generate and save certificate image
             timestamp = metadata.get("timestamp", datetime.now().isoformat())
-            image_bytes = generate_certificate_image(
-                farm_id=farm_id,
-                water_consumed=water_consumed,
-                efficiency_score=efficiency_score,
-                timestamp=timestamp
-            )
+            with span("image.render", farm_id=farm_id) as render_span:
+                image_bytes = generate_certificate_image(
+                    farm_id=farm_id,
+                    water_consumed=water_consumed,
+                    efficiency_score=efficiency_score,
+                    timestamp=timestamp
+                )
+                render_span.set_attribute("bytes", len(image_bytes))
 
             # Save locally
             image_dir = "data/nft_images"
             os.makedirs(image_dir, exist_ok=True)
             image_filename = f"{image_dir}/farm_{farm_id}_{int(datetime.now().timestamp())}.png"
-            save_certificate_image(image_bytes, image_filename)
+            with span("image.save"):
+                save_certificate_image(image_bytes, image_filename)
             logger.info(f"💾 Image saved: {image_filename}")
 
             # 2. Create new mint keypair
@@ -140,7 +155,8 @@ class ProductionNFTService:
             logger.info(f"🔑 Mint account: {mint_pubkey}")
 
             # 3. Check authority balance
-            balance = self.client.get_balance(self.authority.pubkey()).value
+            with span("rpc.get_balance"):
+                balance = self.client.get_balance(self.authority.pubkey()).value
             logger.info(f"💰 Authority balance: {balance / 1e9:.4f} SOL")
 
             if balance < 10_000_000:  # Less than 0.01 SOL
@@ -157,11 +173,9 @@ class ProductionNFTService:
                     "faucet_url": "https://faucet.solana.com/"
                 }
 
-            # 4. Get recent blockhash
-            recent_blockhash = self.client.get_latest_blockhash().value.blockhash
-
-            # 5. Create mint account
-            mint_rent = self.client.get_minimum_balance_for_rent_exemption(82).value
+            # 4. Create mint account
+            with span("rpc.get_rent"):
+                mint_rent = self.client.get_minimum_balance_for_rent_exemption(82).value
             logger.info(f"💵 Mint rent required: {mint_rent} lamports ({mint_rent / 1e9:.6f} SOL)")
 
             create_mint_account_ix = create_account(
@@ -174,7 +188,7 @@ class ProductionNFTService:
                 )
             )
 
-            # 6. Initialize mint instruction (decimals=0 for NFT)
+            # 5. Initialize mint instruction (decimals=0 for NFT)
             init_mint_data = struct.pack(
                 "<B B 32s ? 32s",
                 0,  # InitializeMint instruction
@@ -193,7 +207,7 @@ class ProductionNFTService:
                 data=init_mint_data
             )
 
-            # 7. Create associated token account
+            # 6. Create associated token account
             ata = self._get_associated_token_address(mint_pubkey, self.authority.pubkey())
             logger.info(f"📦 Associated Token Account: {ata}")
 
@@ -212,7 +226,7 @@ class ProductionNFTService:
                 data=create_ata_data
             )
 
-            # 8. Mint 1 token instruction
+            # 7. Mint 1 token instruction
             mint_to_data = struct.pack(
                 "<B Q",
                 7,  # MintTo instruction
@@ -229,39 +243,23 @@ class ProductionNFTService:
                 data=mint_to_data
             )
 
-            # 9. Build transaction
-            tx = Transaction(
-                fee_payer=self.authority.pubkey(),
-                recent_blockhash=recent_blockhash
-            )
-            tx.add(create_mint_account_ix)
-            tx.add(init_mint_ix)
-            tx.add(create_ata_ix)
-            tx.add(mint_to_ix)
-
-            # 10. Send transaction (send_transaction handles signing internally)
+            # 8. Build (with compute-unit limit and priority fee), sign and send,
+            # rebroadcasting until confirmed or the blockhash expires
             logger.info("📤 Sending transaction to Solana...")
+            sent = await self.sender.send_instructions(
+                [create_mint_account_ix, init_mint_ix, create_ata_ix, mint_to_ix],
+                [self.authority, mint_keypair],
+                label=f"NFT mint Farm #{farm_id}"
+            )
+            signature = sent.get("signature")
 
-            # Skip preflight to see actual error on-chain
-            from solana.rpc.types import TxOpts
-            opts = TxOpts(skip_preflight=False, preflight_commitment=Confirmed)
-
-            tx_sig = self.client.send_transaction(tx, self.authority, mint_keypair, opts=opts)
-            signature = tx_sig.value
-
-            logger.info(f"✅ Transaction sent: {signature}")
-
-            # 11. Confirm transaction
-            logger.info("⏳ Confirming transaction...")
-            confirmation = self.client.confirm_transaction(signature, commitment=Confirmed)
-
-            if confirmation.value:
+            if sent["success"]:
                 logger.info("✅ Transaction confirmed!")
             else:
-                logger.error("❌ Transaction failed to confirm")
-                return {"success": False, "error": "Transaction failed"}
+                logger.error(f"❌ Transaction failed: {sent['error']}")
+                return {"success": False, "error": sent["error"]}
 
-            # 12. Create metadata
+            # 9. Create metadata
             nft_metadata = {
                 "name": f"Water Efficiency Certificate #{farm_id}",
                 "symbol": "WEC",
@@ -306,6 +304,5 @@ class ProductionNFTService:
                 "error": str(e)
             }
 
-
-# Singleton
-production_nft_service = ProductionNFTService()
+    def transaction_stats(self) -> Dict:
+        return self.sender.stats()
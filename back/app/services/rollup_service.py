@@ -0,0 +1,233 @@
+"""
+Hourly Usage Rollups
+
+Maintains per-farm hourly aggregates of water usage on ingest and loads
+them as column arrays for vectorized analytics.
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.database import WaterUsageRecord, WaterUsageRollup
+from app.services.partition_service import PartitionService
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_COLUMNS = [
+    "farm_id",
+    "hour",
+    "readings",
+    "water_liters",
+    "tokens_consumed",
+    "rainfall_sum",
+    "rainfall_count",
+    "temperature_sum",
+    "temperature_count",
+    "humidity_sum",
+    "humidity_count",
+]
+
+
+# Summed columns, in the order apply_many accumulates them
+_COUNTERS = ROLLUP_COLUMNS[2:]
+
+
+def _counter_upsert():
+    """INSERT a rollup row, or add the row's counters to the existing one"""
+    table = WaterUsageRollup.__table__
+    stmt = sqlite_insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.farm_id, table.c.hour],
+        set_={name: table.c[name] + stmt.excluded[name] for name in _COUNTERS}
+    )
+
+
+_upsert = _counter_upsert()
+
+
+def truncate_to_hour(moment: datetime) -> datetime:
+    """Truncate a timestamp to the start of its hour"""
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def farm_rows(farm_ids: np.ndarray, rollup_farm_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Map rollup farm IDs onto rows of a sorted farm ID array
+
+    Returns:
+        (row index per rollup, mask of rollups whose farm is known)
+    """
+    if len(farm_ids) == 0:
+        empty = np.zeros(len(rollup_farm_ids), dtype=np.int64)
+        return empty, np.zeros(len(rollup_farm_ids), dtype=bool)
+
+    rows = np.searchsorted(farm_ids, rollup_farm_ids)
+    known = farm_ids[np.minimum(rows, len(farm_ids) - 1)] == rollup_farm_ids
+    return rows, known
+
+
+class RollupService:
+    """Service for hourly usage rollups"""
+
+    @staticmethod
+    def _accumulate(
+        rollup: WaterUsageRollup,
+        water_liters: float,
+        tokens_consumed: float,
+        rainfall_mm: Optional[float],
+        temperature_c: Optional[float],
+        humidity_percent: Optional[float]
+    ):
+        """Add one reading to a rollup row"""
+        rollup.readings += 1
+        rollup.water_liters += water_liters
+        rollup.tokens_consumed += tokens_consumed
+        if rainfall_mm is not None:
+            rollup.rainfall_sum += rainfall_mm
+            rollup.rainfall_count += 1
+        if temperature_c is not None:
+            rollup.temperature_sum += temperature_c
+            rollup.temperature_count += 1
+        if humidity_percent is not None:
+            rollup.humidity_sum += humidity_percent
+            rollup.humidity_count += 1
+
+    @staticmethod
+    def _new_rollup(farm_id: int, hour: datetime) -> WaterUsageRollup:
+        return WaterUsageRollup(
+            farm_id=farm_id,
+            hour=hour,
+            readings=0,
+            water_liters=0.0,
+            tokens_consumed=0.0,
+            rainfall_sum=0.0,
+            rainfall_count=0,
+            temperature_sum=0.0,
+            temperature_count=0,
+            humidity_sum=0.0,
+            humidity_count=0
+        )
+
+    @staticmethod
+    def apply(db: Session, record: WaterUsageRecord):
+        """Fold a new usage record into its hourly rollup (caller commits)"""
+        RollupService.apply_many(db, [(
+            record.farm_id,
+            record.timestamp,
+            record.water_liters,
+            record.tokens_consumed,
+            record.rainfall_mm,
+            record.temperature_c,
+            record.humidity_percent
+        )])
+
+    @staticmethod
+    def apply_many(
+        db: Session,
+        readings: Sequence[Tuple[int, datetime, float, float, Optional[float], Optional[float], Optional[float]]]
+    ):
+        """
+        Fold a batch of new readings into their rollups (caller commits)
+
+        Readings are (farm_id, timestamp, water_liters, tokens_consumed,
+        rainfall_mm, temperature_c, humidity_percent). They are summed per
+        farm-hour in plain lists first, then added to the rollup rows with
+        one upsert (ON CONFLICT DO UPDATE SET x = x + ...), so concurrent
+        workers never lose each other's readings.
+        """
+        sums: Dict[tuple, list] = {}
+        for farm_id, timestamp, liters, tokens, rain, temp, humidity in readings:
+            key = (farm_id, truncate_to_hour(timestamp))
+            acc = sums.get(key)
+            if acc is None:
+                acc = sums[key] = [0, 0.0, 0.0, 0.0, 0, 0.0, 0, 0.0, 0]
+            acc[0] += 1
+            acc[1] += liters
+            acc[2] += tokens
+            if rain is not None:
+                acc[3] += rain
+                acc[4] += 1
+            if temp is not None:
+                acc[5] += temp
+                acc[6] += 1
+            if humidity is not None:
+                acc[7] += humidity
+                acc[8] += 1
+        if not sums:
+            return
+
+        db.execute(_upsert, [
+            {"farm_id": farm_id, "hour": hour, **dict(zip(_COUNTERS, acc))}
+            for (farm_id, hour), acc in sums.items()
+        ])
+
+    @staticmethod
+    def rebuild(db: Session, batch_size: int = 5000) -> int:
+        """Recompute all rollups from raw records, returns the number of rows"""
+        db.query(WaterUsageRollup).delete()
+
+        rollups: Dict[tuple, WaterUsageRollup] = {}
+        query = select(
+            WaterUsageRecord.farm_id,
+            WaterUsageRecord.timestamp,
+            WaterUsageRecord.water_liters,
+            WaterUsageRecord.tokens_consumed,
+            WaterUsageRecord.rainfall_mm,
+            WaterUsageRecord.temperature_c,
+            WaterUsageRecord.humidity_percent
+        )
+
+        # Archived months included
+        for chunk in PartitionService.iter_chunks(db, query, key=None, chunk_size=batch_size):
+            for farm_id, timestamp, liters, tokens, rain, temp, humidity in chunk:
+                key = (farm_id, truncate_to_hour(timestamp))
+                rollup = rollups.get(key)
+                if rollup is None:
+                    rollup = rollups[key] = RollupService._new_rollup(*key)
+                RollupService._accumulate(rollup, liters, tokens, rain, temp, humidity)
+
+        db.add_all(rollups.values())
+        db.commit()
+
+        logger.info(f"Rebuilt {len(rollups)} hourly rollups")
+        return len(rollups)
+
+    @staticmethod
+    def ensure_backfilled(db: Session):
+        """Build rollups once for databases that predate them"""
+        has_rollups = db.query(WaterUsageRollup.id).first() is not None
+        has_records = db.query(WaterUsageRecord.id).first() is not None
+        if has_records and not has_rollups:
+            RollupService.rebuild(db)
+
+    @staticmethod
+    def load_arrays(
+        db: Session,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Dict[str, np.ndarray]:
+        """Load rollups in [start, end) as a dict of column arrays"""
+        query = select(*[getattr(WaterUsageRollup, name) for name in ROLLUP_COLUMNS])
+        if start is not None:
+            query = query.where(WaterUsageRollup.hour >= start)
+        if end is not None:
+            query = query.where(WaterUsageRollup.hour < end)
+
+        rows = db.execute(query).all()
+        columns = list(zip(*rows)) if rows else [()] * len(ROLLUP_COLUMNS)
+
+        arrays = {}
+        for name, values in zip(ROLLUP_COLUMNS, columns):
+            if name == "hour":
+                arrays[name] = np.array(values, dtype="datetime64[s]")
+            elif name == "farm_id" or name == "readings" or name.endswith("_count"):
+                arrays[name] = np.array(values, dtype=np.int64)
+            else:
+                arrays[name] = np.array(values, dtype=np.float64)
+        return arrays
@@ -0,0 +1,279 @@
+"""
+Binary Sensor Listener
+
+Constrained meters and LoRa bridges cannot afford HTTP and JSON, so they can
+send readings as fixed 28-byte little-endian records over UDP or TCP:
+
+    offset  type  field
+    0       u32   farm_id           (1-10)
+    4       u64   timestamp, unix milliseconds (0: time of arrival)
+    12      f32   water_liters
+    16      f32   rainfall_mm       (NaN: not measured)
+    20      f32   temperature_c     (NaN: not measured)
+    24      f32   humidity_percent  (NaN: not measured)
+
+A datagram carries one or more whole records; a TCP connection is a plain
+stream of records. There are no replies. Readings go into a bounded buffer
+that one writer task drains into WaterManagementService.record_usage_batch,
+every INGEST_BATCH_SIZE readings or SENSOR_FLUSH_INTERVAL_MS, whichever
+comes first. When the buffer is full, UDP readings are dropped and TCP
+connections stop being read until the writer catches up.
+
+Readings carry no ID, so a retransmitted record is recognised as a
+duplicate by farm and timestamp.
+"""
+
+import asyncio
+import logging
+import math
+import socket
+import struct
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from app.core.config import get_settings
+from app.models.database import SessionLocal
+from app.models.schemas import WaterUsageData
+from app.services.ingest_guard import ingest_guard
+from app.services.traffic_capture import traffic_capture
+from app.services.water_service import WaterManagementService
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+READING = struct.Struct("<IQffff")
+
+# Datagrams queue in the kernel while a batch is being written; the kernel
+# caps this at net.core.rmem_max
+UDP_RECEIVE_BUFFER_BYTES = 8 * 1024 * 1024
+
+
+def decode_reading(farm_id: int, timestamp_ms: int, liters: float, rainfall: float,
+                   temperature: float, humidity: float) -> Optional[WaterUsageData]:
+    """A reading from unpacked record fields, or None if out of range"""
+    if not 1 <= farm_id <= 10:  # Farms the API accepts
+        return None
+    if not liters > 0 or math.isinf(liters):
+        return None
+
+    rainfall = None if math.isnan(rainfall) else rainfall
+    temperature = None if math.isnan(temperature) else temperature
+    humidity = None if math.isnan(humidity) else humidity
+    if rainfall is not None and not 0 <= rainfall < math.inf:
+        return None
+    if temperature is not None and math.isinf(temperature):
+        return None
+    if humidity is not None and not 0 <= humidity <= 100:
+        return None
+
+    try:
+        timestamp = datetime.fromtimestamp(timestamp_ms / 1000) if timestamp_ms else datetime.now()
+    except (ValueError, OverflowError, OSError):
+        return None  # Past year 9999 or beyond the platform's time_t
+
+    # Fields are checked above; skipping validation keeps parsing cheap
+    return WaterUsageData.model_construct(
+        farm_id=farm_id,
+        reading_id=None,
+        timestamp=timestamp,
+        water_liters=liters,
+        rainfall_mm=rainfall,
+        temperature_c=temperature,
+        humidity_percent=humidity,
+    )
+
+
+def encode_reading(farm_id: int, timestamp: Optional[datetime], water_liters: float,
+                   rainfall_mm: Optional[float] = None, temperature_c: Optional[float] = None,
+                   humidity_percent: Optional[float] = None) -> bytes:
+    """One binary record (for gateways, tests and load generators)"""
+    nan = float("nan")
+    return READING.pack(
+        farm_id,
+        int(timestamp.timestamp() * 1000) if timestamp else 0,
+        water_liters,
+        nan if rainfall_mm is None else rainfall_mm,
+        nan if temperature_c is None else temperature_c,
+        nan if humidity_percent is None else humidity_percent,
+    )
+
+
+class SensorListener:
+    """UDP/TCP listener feeding a batching writer"""
+
+    def __init__(self):
+        self.pending: List[WaterUsageData] = []
+        self.max_pending = max(settings.sensor_max_pending, settings.ingest_batch_size)
+        self.stats: Dict[str, int] = {
+            "received": 0,
+            "accepted": 0,
+            "duplicates": 0,
+            "invalid": 0,
+            "dropped": 0,
+            "failed": 0,
+        }
+        self._wakeup = asyncio.Event()
+        self._paused: Set[asyncio.Transport] = set()
+        self._servers: List = []
+        self._writer: Optional[asyncio.Task] = None
+
+    def feed(self, data: bytes, drop_when_full: bool = True) -> bool:
+        """
+        Queue the records in data; False if the buffer is full
+
+        With drop_when_full=False (TCP) the records are queued anyway and the
+        caller is expected to stop reading.
+        """
+        readings = []
+        invalid = 0
+        for fields in READING.iter_unpack(data):
+            reading = decode_reading(*fields)
+            if reading is None:
+                invalid += 1
+            else:
+                readings.append(reading)
+
+        self.stats["received"] += len(readings) + invalid
+        self.stats["invalid"] += invalid
+        if drop_when_full and len(self.pending) >= self.max_pending:
+            self.stats["dropped"] += len(readings)
+            return False
+
+        self.pending.extend(readings)
+        if len(self.pending) >= settings.ingest_batch_size:
+            self._wakeup.set()
+        return len(self.pending) < self.max_pending
+
+    def pause(self, transport: asyncio.Transport):
+        transport.pause_reading()
+        self._paused.add(transport)
+
+    async def _write(self, batch: List[WaterUsageData]):
+        db = SessionLocal()
+        try:
+            with ingest_guard.track():
+                counts = await WaterManagementService.record_usage_batch(db, batch)
+            self.stats["accepted"] += counts["accepted"]
+            self.stats["duplicates"] += counts["duplicates"]
+            if traffic_capture:
+                traffic_capture.record(batch)
+        except Exception as e:
+            self.stats["failed"] += len(batch)
+            logger.error(f"Error writing sensor batch: {e}")
+        finally:
+            db.close()
+
+    async def _run_writer(self):
+        interval = settings.sensor_flush_interval_ms / 1000
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            while self.pending:
+                batch = self.pending[:settings.ingest_batch_size]
+                del self.pending[:settings.ingest_batch_size]
+                await self._write(batch)
+
+            # Caught up: resume paused TCP connections
+            for transport in self._paused:
+                if not transport.is_closing():
+                    transport.resume_reading()
+            self._paused.clear()
+
+    async def start(self):
+        """Bind the configured ports and start the writer"""
+        loop = asyncio.get_running_loop()
+        host = settings.sensor_listener_host
+        # reuse_port lets every worker process bind the same ports
+        if settings.sensor_udp_port:
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda: _DatagramProtocol(self), local_addr=(host, settings.sensor_udp_port), reuse_port=True
+            )
+            transport.get_extra_info("socket").setsockopt(
+                socket.SOL_SOCKET, socket.SO_RCVBUF, UDP_RECEIVE_BUFFER_BYTES
+            )
+            self._servers.append(transport)
+            logger.info(f"📡 Sensor listener on udp://{host}:{settings.sensor_udp_port}")
+        if settings.sensor_tcp_port:
+            server = await loop.create_server(
+                lambda: _StreamProtocol(self), host, settings.sensor_tcp_port, reuse_port=True
+            )
+            self._servers.append(server)
+            logger.info(f"📡 Sensor listener on tcp://{host}:{settings.sensor_tcp_port}")
+        self._writer = asyncio.create_task(self._run_writer())
+
+    async def stop(self):
+        """Close the listeners and write out what is buffered"""
+        for server in self._servers:
+            server.close()
+        self._servers = []
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
+        while self.pending:
+            batch = self.pending[:settings.ingest_batch_size]
+            del self.pending[:settings.ingest_batch_size]
+            await self._write(batch)
+        logger.info(f"Sensor listener stopped: {self.stats}")
+
+    def status(self) -> Dict:
+        return {**self.stats, "pending": len(self.pending), "paused_connections": len(self._paused)}
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, listener: SensorListener):
+        self.listener = listener
+
+    def datagram_received(self, data: bytes, addr):
+        if len(data) % READING.size:
+            # Truncated or foreign datagram: its record boundaries are unknown
+            self.listener.stats["invalid"] += 1
+            return
+        self.listener.feed(data)
+
+
+class _StreamProtocol(asyncio.Protocol):
+    def __init__(self, listener: SensorListener):
+        self.listener = listener
+        self.buffer = b""
+        self.transport: Optional[asyncio.Transport] = None
+
+    def connection_made(self, transport: asyncio.Transport):
+        self.transport = transport
+
+    def data_received(self, data: bytes):
+        data = self.buffer + data if self.buffer else data
+        whole = len(data) - len(data) % READING.size
+        self.buffer = data[whole:]
+        if whole and not self.listener.feed(data[:whole], drop_when_full=False):
+            self.listener.pause(self.transport)
+
+
+sensor_listener: Optional[SensorListener] = None
+
+
+async def start_sensor_listener():
+    """Start the listener if a UDP or TCP port is configured"""
+    global sensor_listener
+    if not (settings.sensor_udp_port or settings.sensor_tcp_port):
+        return
+    sensor_listener = SensorListener()
+    await sensor_listener.start()
+
+
+async def stop_sensor_listener():
+    global sensor_listener
+    if sensor_listener is not None:
+        await sensor_listener.stop()
+        sensor_listener = None
+
+
+def sensor_listener_status() -> Optional[Dict]:
+    return sensor_listener.status() if sensor_listener is not None else None
@@ -0,0 +1,143 @@
+"""
+Signer process for multi-worker deployments
+
+Owns the authority keypair, the RPC clients and the transaction sender, and
+serves chain-service calls from the HTTP workers over a unix socket, so
+workers never hold the key. Calls run concurrently on one event loop and
+interleave while transactions wait for confirmation, except that
+transactions debiting the same token account are sent in call order
+(tx_sender.account_locks).
+
+Before listening it runs the one-time startup maintenance (migrations,
+backfills, archiving) that the workers then skip.
+
+Workers authenticate with SIGNER_AUTHKEY, which must be set to a secret
+shared by the workers and the signer; the signer refuses to start without it.
+
+Run with:
+    SIGNER_SOCKET=/tmp/sucount-signer.sock SIGNER_AUTHKEY=... python -m app.services.signer
+"""
+
+import asyncio
+import inspect
+import logging
+import os
+import threading
+from multiprocessing.connection import Connection, Listener
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import get_settings
+from app.core.tracing import SPAN_KIND_SERVER, span
+from app.services.chain import load_authority
+from app.services.maintenance import run_startup_maintenance
+from app.services.signer_client import REMOTE_METHODS
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class SignerServer:
+    """Serves REMOTE_METHODS of the local chain services over IPC"""
+
+    def __init__(self, services: Dict[str, Any], address: str, authkey: bytes):
+        self.services = services
+        self.address = address
+        self.authkey = authkey
+        self.loop = asyncio.new_event_loop()
+
+    async def _invoke(
+        self,
+        name: str,
+        method: str,
+        args: tuple,
+        kwargs: dict,
+        trace: Optional[Tuple[str, str]] = None
+    ) -> Any:
+        if method not in REMOTE_METHODS.get(name, {}):
+            raise AttributeError(f"{name} service has no remote method '{method}'")
+
+        with span(f"signer.{name}.{method}", SPAN_KIND_SERVER, remote_parent=trace):
+            result = getattr(self.services[name], method)(*args, **kwargs)
+            if inspect.isawaitable(result):
+                result = await result
+        return result
+
+    def _handle(self, conn: Connection):
+        """Serve one worker connection until it closes"""
+        with conn:
+            while True:
+                try:
+                    name, method, args, kwargs, trace = conn.recv()
+                except (EOFError, OSError):
+                    return
+
+                try:
+                    future = asyncio.run_coroutine_threadsafe(
+                        self._invoke(name, method, args, kwargs, trace), self.loop
+                    )
+                    reply = (True, future.result())
+                except Exception as e:
+                    logger.error(f"❌ Signer call {name}.{method} failed: {e}")
+                    reply = (False, f"{type(e).__name__}: {e}")
+
+                try:
+                    conn.send(reply)
+                except (EOFError, OSError):
+                    return
+
+    def serve_forever(self):
+        threading.Thread(target=self.loop.run_forever, name="signer-loop", daemon=True).start()
+
+        if os.path.exists(self.address):
+            os.unlink(self.address)  # Stale socket from a previous run
+        listener = Listener(self.address, family="AF_UNIX", authkey=self.authkey)
+        os.chmod(self.address, 0o600)
+
+        logger.info(f"🔏 Signer listening on {self.address}")
+
+        with listener:
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    logger.warning(f"⚠️  Rejected signer connection: {e}")
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+
+    if not settings.signer_socket:
+        raise SystemExit("SIGNER_SOCKET is not set")
+    if not settings.signer_authkey:
+        raise SystemExit("SIGNER_AUTHKEY is not set")
+
+    # Once for all workers, which start after the socket appears
+    run_startup_maintenance()
+
+    # Imported here: these build the keypair and RPC clients
+    from app.services.watercredits_service import WaterCreditsService
+    from app.services.real_nft_service import ProductionNFTService
+    from app.services.solana_service import SolanaService
+
+    # One authority signs for every service
+    authority = load_authority()
+    services = {
+        "watercredits": WaterCreditsService(authority=authority),
+        "nft": ProductionNFTService(authority=authority),
+        "solana": SolanaService(authority=authority),
+    }
+    server = SignerServer(services, settings.signer_socket, settings.signer_authkey.encode())
+
+    if settings.balance_subscriber_enabled:
+        server.loop.call_soon_threadsafe(services["watercredits"].start_balance_subscriber)
+
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Signer IPC client
+
+In multi-worker mode the HTTP workers hold no keys and no chain clients.
+Every call to a chain service is forwarded over a local unix socket to the
+single signer process (app.services.signer), which owns the authority
+keypair. Calls run concurrently there; only transactions debiting the same
+token account are ordered (tx_sender.account_locks).
+"""
+
+import asyncio
+import logging
+import queue
+from multiprocessing.connection import Client, Connection
+from typing import Any, Dict, Optional
+
+from app.core.config import get_settings
+from app.core.tracing import SPAN_KIND_CLIENT, span, trace_context
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Methods each service exposes over IPC, and whether they are coroutines
+REMOTE_METHODS: Dict[str, Dict[str, bool]] = {
+    "watercredits": {
+        "create_watercredits_token": True,
+        "mint_quota_to_farmer": True,
+        "burn_on_water_usage": True,
+        "burn_batch": True,
+        "transfer_batch": True,
+        "setup_lookup_table": True,
+        "post_memo": True,
+        "get_balance": True,
+        "get_token_info": False,
+        "transaction_stats": False,
+        "balance_cache_status": False,
+    },
+    "nft": {
+        "mint_nft_certificate": True,
+        "transaction_stats": False,
+    },
+    "solana": {
+        "record_water_usage": True,
+        "record_water_usage_batch": True,
+    },
+}
+
+
+class RemoteService:
+    """Proxy running a chain service's methods in the signer process"""
+
+    def __init__(self, name: str, address: Optional[str] = None, authkey: Optional[bytes] = None):
+        self.name = name
+        self.address = address or settings.signer_socket
+        self.authkey = authkey or settings.signer_authkey.encode()
+        self._methods = REMOTE_METHODS[name]
+        # Idle connections; each in-flight call holds one exclusively
+        self._pool: "queue.SimpleQueue[Connection]" = queue.SimpleQueue()
+
+    def _connection(self) -> Connection:
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return Client(self.address, family="AF_UNIX", authkey=self.authkey)
+
+    def _call(self, method: str, args: tuple, kwargs: dict) -> Any:
+        with span(f"signer.{self.name}.{method}", SPAN_KIND_CLIENT):
+            conn = self._connection()
+            try:
+                # The signer continues the caller's trace
+                conn.send((self.name, method, args, kwargs, trace_context()))
+                ok, value = conn.recv()
+            except Exception:
+                # The signer may have restarted; never reuse a broken connection
+                conn.close()
+                raise
+            self._pool.put(conn)
+
+        if not ok:
+            raise RuntimeError(f"Signer error in {self.name}.{method}: {value}")
+        return value
+
+    def __getattr__(self, method: str):
+        if method.startswith("_") or method not in self._methods:
+            raise AttributeError(f"{self.name} service has no remote method '{method}'")
+
+        if self._methods[method]:
+            async def call_async(*args, **kwargs):
+                return await asyncio.to_thread(self._call, method, args, kwargs)
+            return call_async
+
+        def call(*args, **kwargs):
+            return self._call(method, args, kwargs)
+        return call
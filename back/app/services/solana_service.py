@@ -2,7 +2,7 @@ from solana.rpc.api import Client
 from solders.keypair import Keypair
 from solders.system_program import TransferParams, transfer
 from solders.transaction import Transaction
-from typing import Optional
+from typing import List, Optional, Tuple
 import logging
 from app.core.config import get_settings
 
@@ -13,10 +13,10 @@ settings = get_settings()
 class SolanaService:
     """Service for interacting with Solana blockchain"""
 
-    def __init__(self):
+    def __init__(self, authority: Optional[Keypair] = None):
         self.client = Client(settings.solana_rpc_url)
-        # For MVP, we'll use a generated keypair. In production, load from secure storage
-        self.keypair = Keypair()
+        # For MVP, a generated keypair unless given the shared authority
+        self.keypair = authority or Keypair()
         logger.info(f"Solana service initialized on {settings.solana_network}")
         logger.info(f"Public key: {self.keypair.pubkey()}")
 
@@ -54,6 +54,19 @@ class SolanaService:
             logger.error(f"Error recording on Solana: {e}")
             return None
 
+    async def record_water_usage_batch(
+        self,
+        usages: List[Tuple[int, float, float]]
+    ) -> List[Optional[str]]:
+        """Record many (farm_id, water_liters, tokens_consumed) usages, one ID each"""
+        # For MVP: same mock signatures as record_water_usage, logged once per batch
+        tx_signatures = [
+            f"mock_tx_{farm_id}_{int(water_liters)}_{int(tokens_consumed)}"
+            for farm_id, water_liters, tokens_consumed in usages
+        ]
+        logger.info(f"[SOLANA] Recording {len(usages)} water usages (mock)")
+        return tx_signatures
+
     async def mint_nft_certificate(
         self,
         farm_id: int,
@@ -96,7 +109,3 @@ class SolanaService:
         except Exception as e:
             logger.error(f"Error getting balance: {e}")
             return 0.0
-
-
-# Singleton instance
-solana_service = SolanaService()
@@ -0,0 +1,80 @@
+"""
+Ingestion Traffic Capture
+
+With INGEST_CAPTURE_PATH set, every reading accepted by the ingestion API is
+appended to an NDJSON trace, one line per reading:
+
+    {"t": 1761566400.123, "reading": {"farm_id": 3, "water_liters": 150.5, ...}}
+
+`t` is the wall-clock time the reading was accepted and `reading` holds the
+fields exactly as the client sent them. scripts/replay_trace.py replays a
+trace against another backend with the same relative timing, to reproduce
+production bursts when validating performance changes.
+
+Each line is written with a single O_APPEND write, so several workers can
+share one trace file.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Iterable, Optional
+
+from app.core.config import get_settings
+from app.models.schemas import WaterUsageData
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class TrafficCapture:
+    """Appends accepted readings to an NDJSON trace file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.captured = 0
+        self._fd: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _open(self) -> int:
+        if self._fd is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            logger.info(f"🎙️  Capturing accepted readings to {self.path}")
+        return self._fd
+
+    def record(self, readings: Iterable[WaterUsageData], accepted_at: Optional[float] = None):
+        """Append readings (as sent by the client) to the trace"""
+        accepted_at = time.time() if accepted_at is None else accepted_at
+        lines = "".join(
+            json.dumps(
+                {"t": round(accepted_at, 6), "reading": reading.model_dump(mode="json", exclude_unset=True)},
+                separators=(",", ":")
+            ) + "\n"
+            for reading in readings
+        )
+        if not lines:
+            return
+
+        try:
+            with self._lock:
+                os.write(self._open(), lines.encode())
+                self.captured += lines.count("\n")
+        except OSError as e:
+            # Capture must never fail ingestion
+            logger.error(f"Error writing capture trace: {e}")
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+traffic_capture: Optional[TrafficCapture] = (
+    TrafficCapture(settings.ingest_capture_path) if settings.ingest_capture_path else None
+)
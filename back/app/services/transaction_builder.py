@@ -0,0 +1,200 @@
+"""
+Compute-budget aware transaction builder
+
+Prepends ComputeBudget instructions to every transaction we send:
+- SetComputeUnitLimit sized from a simulation of the transaction
+- SetComputeUnitPrice from a percentile of recent prioritization fees paid
+  for the transaction's writable accounts, capped by a configurable ceiling
+
+Builds legacy transactions, or v0 versioned transactions compiled against
+address lookup tables for densely packed batches.
+"""
+
+import logging
+import math
+from typing import List, Optional, Sequence
+
+import httpx
+from solana.rpc.api import Client
+from solana.transaction import Transaction
+from solders.address_lookup_table_account import AddressLookupTableAccount
+from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price
+from solders.hash import Hash
+from solders.instruction import Instruction
+from solders.keypair import Keypair
+from solders.message import MessageV0
+from solders.pubkey import Pubkey
+from solders.signature import Signature
+from solders.transaction import VersionedTransaction
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+MAX_COMPUTE_UNITS = 1_400_000
+PACKET_DATA_SIZE = 1232  # Maximum serialized transaction size
+# Budget for the two ComputeBudget instructions themselves
+COMPUTE_BUDGET_OVERHEAD_UNITS = 300
+
+
+def fee_percentile(fees: List[int], percentile: float) -> int:
+    """Nearest-rank percentile of a list of fees (0 for an empty list)"""
+    if not fees:
+        return 0
+    ordered = sorted(fees)
+    rank = max(1, math.ceil(percentile / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def writable_accounts(instructions: Sequence[Instruction]) -> List[Pubkey]:
+    """Unique writable accounts referenced by a set of instructions"""
+    seen = {}
+    for ix in instructions:
+        for meta in ix.accounts:
+            if meta.is_writable:
+                seen[str(meta.pubkey)] = meta.pubkey
+    return list(seen.values())
+
+
+class TransactionBuilder:
+    """Builds transactions with compute-unit limit and priority fee set"""
+
+    def __init__(self, client: Client, payer: Pubkey, rpc_url: Optional[str] = None):
+        self.client = client
+        self.payer = payer
+        self.rpc_url = rpc_url or settings.solana_rpc_url
+
+    def get_priority_fee(self, accounts: List[Pubkey]) -> int:
+        """
+        Priority fee in micro-lamports per compute unit
+
+        Uses getRecentPrioritizationFees for the writable accounts, takes the
+        configured percentile and clamps it to [min, max].
+        """
+        try:
+            response = httpx.post(
+                self.rpc_url,
+                json={
+                    "jsonrpc": "2.0",
+                    "id": 1,
+                    "method": "getRecentPrioritizationFees",
+                    "params": [[str(account) for account in accounts[:128]]]
+                },
+                timeout=5.0
+            )
+            response.raise_for_status()
+            fees = [entry["prioritizationFee"] for entry in response.json().get("result", [])]
+        except Exception as e:
+            logger.warning(f"Could not fetch prioritization fees: {e}")
+            fees = []
+
+        fee = fee_percentile(fees, settings.priority_fee_percentile)
+        return max(settings.priority_fee_min_micro_lamports, min(fee, settings.priority_fee_max_micro_lamports))
+
+    def _probe(
+        self,
+        instructions: Sequence[Instruction],
+        recent_blockhash: Hash,
+        lookup_tables: Optional[Sequence[AddressLookupTableAccount]] = None
+    ):
+        """Unsigned transaction used for simulation"""
+        budget = [set_compute_unit_limit(MAX_COMPUTE_UNITS)]
+        if lookup_tables is None:
+            probe = Transaction(fee_payer=self.payer, recent_blockhash=recent_blockhash)
+            for ix in budget + list(instructions):
+                probe.add(ix)
+            return probe
+
+        message = MessageV0.try_compile(self.payer, budget + list(instructions), lookup_tables, recent_blockhash)
+        signatures = [Signature.default()] * message.header.num_required_signatures
+        return VersionedTransaction.populate(message, signatures)
+
+    def estimate_compute_units(
+        self,
+        instructions: Sequence[Instruction],
+        recent_blockhash: Hash,
+        lookup_tables: Optional[Sequence[AddressLookupTableAccount]] = None
+    ) -> int:
+        """Simulate the instructions and size the compute-unit limit from usage"""
+        probe = self._probe(instructions, recent_blockhash, lookup_tables)
+
+        try:
+            result = self.client.simulate_transaction(probe, sig_verify=False).value
+            if result.err is None and result.units_consumed:
+                units = math.ceil(result.units_consumed * settings.compute_unit_margin)
+                return min(MAX_COMPUTE_UNITS, units + COMPUTE_BUDGET_OVERHEAD_UNITS)
+            logger.warning(f"Simulation did not report usage (err={result.err}), using fallback limit")
+        except Exception as e:
+            logger.warning(f"Simulation failed: {e}, using fallback limit")
+
+        return settings.compute_unit_limit_fallback
+
+    def compute_budget_instructions(
+        self,
+        instructions: Sequence[Instruction],
+        recent_blockhash: Hash,
+        lookup_tables: Optional[Sequence[AddressLookupTableAccount]] = None
+    ) -> List[Instruction]:
+        """ComputeBudget instructions to prepend to a set of instructions"""
+        unit_limit = self.estimate_compute_units(instructions, recent_blockhash, lookup_tables)
+        unit_price = self.get_priority_fee(writable_accounts(instructions))
+
+        logger.info(f"⛽ Compute budget: {unit_limit} CU @ {unit_price} µlamports/CU")
+
+        return [set_compute_unit_limit(unit_limit), set_compute_unit_price(unit_price)]
+
+    def build(self, instructions: Sequence[Instruction], recent_blockhash: Hash) -> Transaction:
+        """Build an unsigned legacy transaction with the compute budget set"""
+        tx = Transaction(fee_payer=self.payer, recent_blockhash=recent_blockhash)
+        for ix in self.compute_budget_instructions(instructions, recent_blockhash):
+            tx.add(ix)
+        for ix in instructions:
+            tx.add(ix)
+        return tx
+
+    def build_v0(
+        self,
+        instructions: Sequence[Instruction],
+        recent_blockhash: Hash,
+        signers: Sequence[Keypair],
+        lookup_tables: Sequence[AddressLookupTableAccount] = ()
+    ) -> VersionedTransaction:
+        """Build a signed v0 transaction with the compute budget set"""
+        lookup_tables = list(lookup_tables)
+        budget = self.compute_budget_instructions(instructions, recent_blockhash, lookup_tables)
+        message = MessageV0.try_compile(self.payer, budget + list(instructions), lookup_tables, recent_blockhash)
+        return VersionedTransaction(message, list(signers))
+
+    def pack_v0(
+        self,
+        instructions: Sequence[Instruction],
+        recent_blockhash: Hash,
+        lookup_tables: Sequence[AddressLookupTableAccount] = ()
+    ) -> List[List[Instruction]]:
+        """
+        Split instructions into groups that each fit one v0 transaction
+
+        Sizes are measured with placeholder ComputeBudget instructions, which
+        encode to the same length as the final ones.
+        """
+        lookup_tables = list(lookup_tables)
+        placeholder_budget = [set_compute_unit_limit(MAX_COMPUTE_UNITS), set_compute_unit_price(0)]
+
+        def fits(group: List[Instruction]) -> bool:
+            message = MessageV0.try_compile(self.payer, placeholder_budget + group, lookup_tables, recent_blockhash)
+            signatures = [Signature.default()] * message.header.num_required_signatures
+            return len(bytes(VersionedTransaction.populate(message, signatures))) <= PACKET_DATA_SIZE
+
+        groups: List[List[Instruction]] = []
+        current: List[Instruction] = []
+        for ix in instructions:
+            if current and not fits(current + [ix]):
+                groups.append(current)
+                current = []
+            current.append(ix)
+            if len(current) == 1 and not fits(current):
+                raise ValueError("Instruction does not fit in a single transaction")
+        if current:
+            groups.append(current)
+        return groups
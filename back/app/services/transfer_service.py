@@ -0,0 +1,426 @@
+"""
+WaterCredits Transfer Order Book
+
+Farm-to-farm transfers are recorded as orders off-chain and settled in
+batches. A settlement claims every open order, nets them into one position
+per farm (in token base units, so nothing is lost to rounding) and pays the
+positions off with the fewest transfers it can find: exact debtor/creditor
+matches first, then the largest debtor pays the largest creditor until
+everyone is square - at most one transfer fewer than the farms involved,
+however many orders there were.
+
+Net transfers go out as SPL Transfer instructions packed into v0
+transactions (WaterCreditsService.transfer_batch), signed by the authority
+as owner of the shared account or as delegate of a farm wallet. Transfers
+between two farms holding the same token account (farms without
+FARM_WALLETS share the authority's) move nothing on-chain and settle in
+the book only.
+
+Orders are only accepted up to the paying farm's balance less its other
+unsettled orders. Settlements are claimed like anchors, so several workers
+can run the scheduler; a failed settlement is retried with the transfers
+it has not sent yet, without holding up later ones, until it goes through
+or an admin cancels it and returns its orders to the book.
+"""
+
+import asyncio
+import heapq
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.tracing import span, traced
+from app.models.database import CreditSettlement, CreditTransferOrder, SessionLocal
+from app.models.schemas import TransferOrderRequest
+from app.services.chain import get_watercredits_service
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# WaterCreditsService.DECIMALS (not imported, to keep the chain stack lazy)
+CREDIT_UNITS = 10 ** 6
+# A "sending" claim older than this is treated as a crashed sender
+STALE_SEND = timedelta(minutes=10)
+
+
+class CreditsUnavailable(Exception):
+    """A farm's balance could not be read to check an order"""
+
+
+def to_units(amount: float) -> int:
+    return round(amount * CREDIT_UNITS)
+
+
+def net_positions(orders: Iterable[Tuple[int, int, int]]) -> Dict[int, int]:
+    """Net units per farm (received minus paid) of (from, to, units) orders"""
+    positions: Dict[int, int] = defaultdict(int)
+    for from_farm_id, to_farm_id, units in orders:
+        positions[from_farm_id] -= units
+        positions[to_farm_id] += units
+    return {farm_id: units for farm_id, units in positions.items() if units}
+
+
+def net_transfers(positions: Dict[int, int]) -> List[Tuple[int, int, int]]:
+    """
+    Transfers that settle net positions (summing to zero)
+
+    Finding the fewest transfers is NP-hard in general; pairing equal debts
+    and credits and then matching largest to largest gets close and never
+    needs more than one transfer fewer than the farms involved.
+    """
+    debts = {farm_id: -units for farm_id, units in positions.items() if units < 0}
+    credits = {farm_id: units for farm_id, units in positions.items() if units > 0}
+    transfers = []
+
+    # Exact matches settle two farms with one transfer
+    creditors_by_amount: Dict[int, List[int]] = defaultdict(list)
+    for farm_id, units in sorted(credits.items()):
+        creditors_by_amount[units].append(farm_id)
+    for debtor, units in sorted(debts.items()):
+        if creditors_by_amount.get(units):
+            creditor = creditors_by_amount[units].pop(0)
+            transfers.append((debtor, creditor, units))
+            del debts[debtor], credits[creditor]
+
+    debt_heap = [(-units, farm_id) for farm_id, units in debts.items()]
+    credit_heap = [(-units, farm_id) for farm_id, units in credits.items()]
+    heapq.heapify(debt_heap)
+    heapq.heapify(credit_heap)
+    while debt_heap and credit_heap:
+        owed, debtor = heapq.heappop(debt_heap)
+        due, creditor = heapq.heappop(credit_heap)
+        units = min(-owed, -due)
+        transfers.append((debtor, creditor, units))
+        if -owed > units:
+            heapq.heappush(debt_heap, (owed + units, debtor))
+        if -due > units:
+            heapq.heappush(credit_heap, (due + units, creditor))
+    return transfers
+
+
+def shares_account(from_farm_id: int, to_farm_id: int) -> bool:
+    """True if both farms hold the same token account (see WaterCreditsService.farm_owner)"""
+    return settings.farm_wallets.get(from_farm_id) == settings.farm_wallets.get(to_farm_id)
+
+
+class TransferService:
+    """Service for the WaterCredits transfer order book and its settlement"""
+
+    @staticmethod
+    def enabled() -> bool:
+        return settings.transfer_settlement_minutes > 0
+
+    @staticmethod
+    async def available_credits(db: Session, farm_id: int) -> Optional[float]:
+        """A farm's on-chain balance less what its unsettled orders already pay out; None if unknown"""
+        balance = await get_watercredits_service().get_balance(farm_id)
+        if not balance.get("success"):
+            return None
+        committed = db.query(func.coalesce(func.sum(CreditTransferOrder.amount), 0.0)).filter(
+            CreditTransferOrder.from_farm_id == farm_id,
+            CreditTransferOrder.status.in_(["open", "settling"])
+        ).scalar()
+        return balance["balance"] - committed
+
+    @staticmethod
+    async def create_order(db: Session, request: TransferOrderRequest) -> CreditTransferOrder:
+        """
+        Record an open order; a retried client_order_id returns the original
+
+        Raises:
+            ValueError: amount too large, or more than the paying farm has available
+            CreditsUnavailable: the paying farm's balance could not be read
+        """
+        if request.amount > settings.transfer_max_order_amount:
+            raise ValueError(f"Amount must not exceed {settings.transfer_max_order_amount:g} WC")
+
+        if request.client_order_id:
+            existing = db.query(CreditTransferOrder).filter(
+                CreditTransferOrder.client_order_id == request.client_order_id
+            ).first()
+            if existing:
+                return existing
+
+        # Orders the payer cannot cover would fail their settlement on every run
+        available = await TransferService.available_credits(db, request.from_farm_id)
+        if available is None:
+            raise CreditsUnavailable(f"Could not read the balance of farm {request.from_farm_id}")
+        if request.amount > available:
+            raise ValueError(f"Farm {request.from_farm_id} has only {max(available, 0.0):g} WC available")
+
+        order = CreditTransferOrder(
+            client_order_id=request.client_order_id,
+            from_farm_id=request.from_farm_id,
+            to_farm_id=request.to_farm_id,
+            amount=request.amount,
+            status="open"
+        )
+        db.add(order)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another request with the same client_order_id got there first
+            db.rollback()
+            return db.query(CreditTransferOrder).filter(
+                CreditTransferOrder.client_order_id == request.client_order_id
+            ).one()
+        db.refresh(order)
+
+        logger.info(f"📝 Transfer order #{order.id}: {order.amount} WC farm {order.from_farm_id} → {order.to_farm_id}")
+        return order
+
+    @staticmethod
+    def cancel_order(db: Session, order_id: int) -> Optional[CreditTransferOrder]:
+        """Cancel an open order; None if it does not exist, unchanged if no longer open"""
+        db.query(CreditTransferOrder).filter(
+            CreditTransferOrder.id == order_id,
+            CreditTransferOrder.status == "open"
+        ).update({"status": "cancelled"}, synchronize_session=False)
+        db.commit()
+        return db.query(CreditTransferOrder).filter(CreditTransferOrder.id == order_id).first()
+
+    @staticmethod
+    def list_orders(
+        db: Session,
+        farm_id: Optional[int] = None,
+        status: Optional[str] = None,
+        limit: int = 100
+    ) -> List[CreditTransferOrder]:
+        """Most recent orders first, optionally for one farm (either side)"""
+        query = db.query(CreditTransferOrder)
+        if farm_id is not None:
+            query = query.filter(or_(
+                CreditTransferOrder.from_farm_id == farm_id,
+                CreditTransferOrder.to_farm_id == farm_id
+            ))
+        if status is not None:
+            query = query.filter(CreditTransferOrder.status == status)
+        return query.order_by(CreditTransferOrder.id.desc()).limit(limit).all()
+
+    @staticmethod
+    def _finish(db: Session, settlement: CreditSettlement):
+        settlement.status = "settled"
+        settlement.settled_at = datetime.now()
+        settlement.error = None
+        db.query(CreditTransferOrder).filter(
+            CreditTransferOrder.settlement_id == settlement.id
+        ).update({"status": "settled", "settled_at": settlement.settled_at}, synchronize_session=False)
+
+    @staticmethod
+    def net_open_orders(db: Session) -> Optional[CreditSettlement]:
+        """Claim every open order into a new settlement and net it; None if there were none"""
+        settlement = CreditSettlement(status="pending", legs="[]")
+        db.add(settlement)
+        db.flush()
+
+        claimed = db.query(CreditTransferOrder).filter(CreditTransferOrder.status == "open").update(
+            {"status": "settling", "settlement_id": settlement.id},
+            synchronize_session=False
+        )
+        if not claimed:
+            db.rollback()
+            return None
+
+        orders = db.query(
+            CreditTransferOrder.from_farm_id,
+            CreditTransferOrder.to_farm_id,
+            CreditTransferOrder.amount
+        ).filter(CreditTransferOrder.settlement_id == settlement.id).all()
+
+        with span("transfers.net", orders=len(orders)) as net_span:
+            transfers = net_transfers(net_positions(
+                (from_farm_id, to_farm_id, to_units(amount)) for from_farm_id, to_farm_id, amount in orders
+            ))
+            net_span.set_attribute("transfers", len(transfers))
+
+        legs = [
+            {
+                "from_farm_id": from_farm_id,
+                "to_farm_id": to_farm_id,
+                "amount_units": units,
+                "on_chain": not shares_account(from_farm_id, to_farm_id),
+                "signature": None,
+            }
+            for from_farm_id, to_farm_id, units in transfers
+        ]
+        settlement.orders = len(orders)
+        settlement.gross_amount = sum(to_units(amount) for _, _, amount in orders) / CREDIT_UNITS
+        settlement.net_amount = sum(leg["amount_units"] for leg in legs) / CREDIT_UNITS
+        settlement.legs = json.dumps(legs)
+        if not any(leg["on_chain"] for leg in legs):
+            TransferService._finish(db, settlement)
+        db.commit()
+
+        logger.info(
+            f"⚖️  Settlement #{settlement.id}: {len(orders)} orders netted to {len(legs)} transfer(s) "
+            f"({settlement.gross_amount:g} WC requested, {settlement.net_amount:g} WC moved)"
+        )
+        return settlement
+
+    @staticmethod
+    async def send_pending(db: Session) -> Dict[str, int]:
+        """Send the unsent transfers of pending and failed settlements, oldest first"""
+        now = datetime.now()
+        sendable = or_(
+            CreditSettlement.status.in_(["pending", "failed"]),
+            and_(CreditSettlement.status == "sending", CreditSettlement.attempted_at < now - STALE_SEND)
+        )
+        counts = {"settled": 0, "failed": 0}
+
+        for settlement in db.query(CreditSettlement).filter(sendable).order_by(CreditSettlement.id).all():
+            # Claim the send; another worker may have got there first
+            claimed = db.query(CreditSettlement).filter(CreditSettlement.id == settlement.id, sendable).update(
+                {"status": "sending", "attempted_at": now, "attempts": CreditSettlement.attempts + 1},
+                synchronize_session=False
+            )
+            db.commit()
+            if not claimed:
+                continue
+
+            db.refresh(settlement)
+            legs = json.loads(settlement.legs)
+            unsent = [leg for leg in legs if leg["on_chain"] and leg["signature"] is None]
+            result = await get_watercredits_service().transfer_batch([
+                (leg["from_farm_id"], leg["to_farm_id"], leg["amount_units"]) for leg in unsent
+            ])
+
+            # Transactions are sent in order, each covering the next few transfers
+            sent = iter(unsent)
+            for transaction in result.get("transactions", []):
+                for _ in range(transaction["transfers"]):
+                    next(sent)["signature"] = transaction["signature"]
+            settlement.legs = json.dumps(legs)
+            settlement.transactions += len(result.get("transactions", []))
+
+            if result.get("success"):
+                TransferService._finish(db, settlement)
+                counts["settled"] += 1
+            else:
+                settlement.status = "failed"
+                settlement.error = result.get("error")
+                counts["failed"] += 1
+            db.commit()
+
+            if settlement.status == "failed":
+                # Later settlements do not depend on this one, so they still go out
+                logger.warning(f"⚠️  Settlement #{settlement.id} not completed: {settlement.error}")
+
+        return counts
+
+    @staticmethod
+    def cancel_settlement(db: Session, settlement_id: int) -> Optional[CreditSettlement]:
+        """
+        Give up on a settlement and return its orders to the book as open
+
+        Only settlements that are not being sent and have no transfer on-chain
+        yet can be cancelled; None if the settlement does not exist.
+
+        Raises:
+            ValueError: the settlement cannot be cancelled
+        """
+        settlement = db.query(CreditSettlement).filter(CreditSettlement.id == settlement_id).first()
+        if settlement is None:
+            return None
+        if any(leg["signature"] for leg in json.loads(settlement.legs)):
+            raise ValueError(f"Settlement #{settlement_id} already has transfers on-chain")
+
+        claimed = db.query(CreditSettlement).filter(
+            CreditSettlement.id == settlement_id,
+            CreditSettlement.status.in_(["pending", "failed"])
+        ).update({"status": "cancelled"}, synchronize_session=False)
+        if not claimed:
+            db.rollback()
+            raise ValueError(f"Settlement #{settlement_id} is {settlement.status}")
+
+        db.query(CreditTransferOrder).filter(CreditTransferOrder.settlement_id == settlement_id).update(
+            {"status": "open", "settlement_id": None},
+            synchronize_session=False
+        )
+        db.commit()
+        db.refresh(settlement)
+
+        logger.info(f"↩️  Settlement #{settlement_id} cancelled, {settlement.orders} orders back in the book")
+        return settlement
+
+    @staticmethod
+    @traced()
+    async def run(db: Session) -> Dict[str, int]:
+        """Net the open orders and send every pending settlement"""
+        settlement = TransferService.net_open_orders(db)
+        counts = await TransferService.send_pending(db)
+        return {"netted_orders": settlement.orders if settlement else 0, **counts}
+
+    @staticmethod
+    def settlement_summary(settlement: CreditSettlement) -> Dict:
+        return {
+            "id": settlement.id,
+            "status": settlement.status,
+            "orders": settlement.orders,
+            "gross_amount": settlement.gross_amount,
+            "net_amount": settlement.net_amount,
+            "legs": [
+                {
+                    "from_farm_id": leg["from_farm_id"],
+                    "to_farm_id": leg["to_farm_id"],
+                    "amount": leg["amount_units"] / CREDIT_UNITS,
+                    "on_chain": leg["on_chain"],
+                    "signature": leg["signature"],
+                }
+                for leg in json.loads(settlement.legs)
+            ],
+            "transactions": settlement.transactions,
+            "error": settlement.error,
+            "attempts": settlement.attempts,
+            "created_at": settlement.created_at,
+            "settled_at": settlement.settled_at,
+        }
+
+    @staticmethod
+    def list_settlements(db: Session, limit: int = 50) -> List[Dict]:
+        settlements = db.query(CreditSettlement).order_by(CreditSettlement.id.desc()).limit(limit).all()
+        return [TransferService.settlement_summary(settlement) for settlement in settlements]
+
+
+class SettlementScheduler:
+    """Background task running TransferService.run every TRANSFER_SETTLEMENT_MINUTES"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.transfer_settlement_minutes * 60)
+            db = SessionLocal()
+            try:
+                result = await TransferService.run(db)
+                if result["netted_orders"] or result["settled"] or result["failed"]:
+                    logger.info(f"💸 Settlement: {result}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error settling transfer orders: {e}")
+            finally:
+                db.close()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+settlement_scheduler = SettlementScheduler()
@@ -0,0 +1,259 @@
+"""
+Transaction Rebroadcast Engine
+
+Sends a signed transaction and re-sends the same bytes at a fixed interval
+until it is confirmed or its blockhash expires (lastValidBlockHeight has
+passed). Only after expiry, when the old signature can no longer land, is
+the transaction rebuilt and re-signed with a fresh blockhash, so the same
+instructions never execute twice.
+
+Transactions that debit the same token account are sent one after another,
+in call order, across every service in the process (account_locks), so a
+burn cannot race a transfer for the same balance; others run concurrently.
+
+Attempts and landing latency are recorded per transaction.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Deque, Dict, Iterable, List, Optional, Sequence, Union
+
+from solana.rpc.api import Client
+from solana.rpc.commitment import Confirmed
+from solana.rpc.types import TxOpts
+from solana.transaction import Transaction
+from solders.address_lookup_table_account import AddressLookupTableAccount
+from solders.hash import Hash
+from solders.instruction import Instruction
+from solders.keypair import Keypair
+from solders.pubkey import Pubkey
+from solders.signature import Signature
+from solders.transaction import VersionedTransaction
+from solders.transaction_status import TransactionConfirmationStatus
+
+from app.core.config import get_settings
+from app.core.tracing import SPAN_KIND_CLIENT, span
+from app.services.transaction_builder import TransactionBuilder
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+SignedTransaction = Union[Transaction, VersionedTransaction]
+
+LANDED = (TransactionConfirmationStatus.Confirmed, TransactionConfirmationStatus.Finalized)
+
+
+def _serialize(tx: SignedTransaction) -> bytes:
+    return tx.serialize() if isinstance(tx, Transaction) else bytes(tx)
+
+
+def _signature(tx: SignedTransaction) -> Signature:
+    return tx.signatures[0]
+
+
+class AccountLocks:
+    """Per-account locks that order transactions touching the same accounts"""
+
+    def __init__(self):
+        self._locks: Dict[Pubkey, asyncio.Lock] = {}
+
+    @asynccontextmanager
+    async def hold(self, accounts: Iterable[Pubkey]) -> AsyncIterator[None]:
+        """Hold the locks of all accounts; taken in a fixed order so holders never deadlock"""
+        held = []
+        try:
+            for account in sorted(set(accounts), key=str):
+                lock = self._locks.get(account)
+                if lock is None:
+                    lock = self._locks[account] = asyncio.Lock()
+                await lock.acquire()
+                held.append(lock)
+            yield
+        finally:
+            for lock in reversed(held):
+                lock.release()
+
+
+account_locks = AccountLocks()
+
+
+class TransactionSender:
+    """Sends transactions with rebroadcast until confirmation or blockhash expiry"""
+
+    def __init__(self, client: Client, tx_builder: TransactionBuilder, history_size: int = 500):
+        self.client = client
+        self.tx_builder = tx_builder
+        self.history: Deque[Dict] = deque(maxlen=history_size)
+
+    def _landed(self, signatures: List[Signature], search_history: bool = False) -> Optional[Dict]:
+        """Return the status of the first of the signatures that landed, if any"""
+        statuses = self.client.get_signature_statuses(
+            signatures, search_transaction_history=search_history
+        ).value
+        for signature, status in zip(signatures, statuses):
+            if status is not None and status.confirmation_status in LANDED:
+                return {"signature": signature, "err": status.err}
+        return None
+
+    async def send(
+        self,
+        build: Callable[[Hash], SignedTransaction],
+        label: str = "transaction"
+    ) -> Dict:
+        """
+        Send a transaction built and signed by `build(recent_blockhash)`
+
+        Returns:
+            {
+                "success": True,
+                "signature": "...",
+                "attempts": 3,      # broadcasts, including re-sends
+                "resigns": 0,       # rebuilds with a fresh blockhash
+                "latency_ms": 1840
+            }
+        """
+        with span("tx.transaction", SPAN_KIND_CLIENT, label=label) as tx_span:
+            result = await self._send(build, label)
+            tx_span.set_attributes(
+                success=result["success"],
+                attempts=result.get("attempts", 0),
+                resigns=result.get("resigns", 0)
+            )
+            if result.get("signature"):
+                tx_span.set_attribute("signature", str(result["signature"]))
+        return result
+
+    async def _send(self, build: Callable[[Hash], SignedTransaction], label: str) -> Dict:
+        started = time.monotonic()
+        signatures: List[Signature] = []
+        attempts = 0
+        resigns = 0
+        result: Dict
+
+        try:
+            while True:
+                with span("tx.blockhash"):
+                    latest = self.client.get_latest_blockhash(commitment=Confirmed).value
+                with span("tx.build", resign=resigns):
+                    tx = build(latest.blockhash)
+                    raw = _serialize(tx)
+                signatures.append(_signature(tx))
+                opts = TxOpts(skip_preflight=attempts > 0, preflight_commitment=Confirmed, max_retries=0)
+
+                landed = None
+                while True:
+                    attempts += 1
+                    with span("tx.send", attempt=attempts, preflight=not opts.skip_preflight):
+                        self.client.send_raw_transaction(raw, opts=opts)
+                    opts = TxOpts(skip_preflight=True, max_retries=0)
+
+                    with span("tx.confirm", attempt=attempts) as confirm_span:
+                        await asyncio.sleep(settings.tx_rebroadcast_interval_seconds)
+
+                        landed = self._landed([signatures[-1]])
+                        confirm_span.set_attribute("landed", landed is not None)
+                        if landed:
+                            break
+
+                        block_height = self.client.get_block_height(commitment=Confirmed).value
+                        if block_height > latest.last_valid_block_height:
+                            break
+
+                if not landed:
+                    # Expired; make sure no earlier signature landed before re-signing
+                    with span("tx.history_check", signatures=len(signatures)):
+                        landed = self._landed(signatures, search_history=True)
+
+                if landed:
+                    latency_ms = int((time.monotonic() - started) * 1000)
+                    if landed["err"] is not None:
+                        result = {
+                            "success": False,
+                            "error": f"Transaction failed on chain: {landed['err']}",
+                            "signature": str(landed["signature"]),
+                        }
+                    else:
+                        result = {"success": True, "signature": landed["signature"]}
+                    result.update(attempts=attempts, resigns=resigns, latency_ms=latency_ms)
+                    break
+
+                if resigns >= settings.tx_max_resigns:
+                    result = {
+                        "success": False,
+                        "error": f"Transaction expired after {resigns + 1} blockhash(es)",
+                        "signature": str(signatures[-1]),
+                        "attempts": attempts,
+                        "resigns": resigns,
+                    }
+                    break
+
+                resigns += 1
+                logger.warning(f"⌛ {label} {signatures[-1]} expired, re-signing with a fresh blockhash")
+
+        except Exception as e:
+            logger.error(f"❌ Error sending {label}: {e}", exc_info=True)
+            result = {"success": False, "error": str(e), "attempts": attempts, "resigns": resigns}
+
+        self.history.append({
+            "label": label,
+            "success": result["success"],
+            "signature": str(result.get("signature")) if result.get("signature") else None,
+            "attempts": attempts,
+            "resigns": resigns,
+            "latency_ms": result.get("latency_ms"),
+            "sent_at": time.time() - (time.monotonic() - started),
+        })
+
+        if result["success"]:
+            logger.info(f"📬 {label} landed in {result['latency_ms']}ms after {attempts} send(s)")
+
+        return result
+
+    async def send_instructions(
+        self,
+        instructions: Sequence[Instruction],
+        signers: Sequence[Keypair],
+        label: str = "transaction",
+        lookup_tables: Optional[Sequence[AddressLookupTableAccount]] = None,
+        debits: Sequence[Pubkey] = ()
+    ) -> Dict:
+        """
+        Build, sign and send instructions as a legacy or (with lookup tables) v0 transaction
+
+        Waits for earlier transactions debiting any of the `debits` accounts
+        to land or fail before building.
+        """
+        def build(recent_blockhash: Hash) -> SignedTransaction:
+            if lookup_tables is None:
+                tx = self.tx_builder.build(instructions, recent_blockhash)
+                tx.sign(*signers)
+                return tx
+            return self.tx_builder.build_v0(instructions, recent_blockhash, signers, lookup_tables)
+
+        async with account_locks.hold(debits):
+            return await self.send(build, label)
+
+    def stats(self) -> Dict:
+        """Landing rate, attempts and latency over recent transactions"""
+        records = list(self.history)
+        landed = [r for r in records if r["success"]]
+        latencies = sorted(r["latency_ms"] for r in landed)
+
+        def percentile(p: float) -> Optional[int]:
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+
+        return {
+            "transactions": len(records),
+            "landed": len(landed),
+            "landing_rate": round(len(landed) / len(records), 4) if records else None,
+            "avg_attempts": round(sum(r["attempts"] for r in records) / len(records), 2) if records else None,
+            "resigned": sum(1 for r in records if r["resigns"]),
+            "latency_ms_p50": percentile(50),
+            "latency_ms_p95": percentile(95),
+            "recent": records[-20:],
+        }
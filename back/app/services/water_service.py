@@ -1,15 +1,39 @@
+import asyncio
+from sqlalchemy import bindparam, insert, select, update, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
-from typing import List, Dict
+from types import SimpleNamespace
+from typing import List, Dict, Optional
 import logging
 from app.models.database import WaterUsageRecord, FarmProfile
-from app.models.schemas import WaterUsageData, FarmStatistics
-from app.services.solana_service import solana_service
+from app.models.schemas import WaterUsageData, FarmStatistics, FarmPeriodStatistics, FarmPeriodHistory
+from app.services.chain import get_solana_service
+from app.services.rollup_service import RollupService
+from app.services.period_service import PeriodUsageService, usage_status
+from app.services.partition_service import PartitionService
+from app.services.idempotency import ReadingInFlight, recent_readings, reading_key
+from app.services.farm_ledger import FarmDelta, FarmEntry, farm_ledger
+from app.services.anomaly_service import AnomalyService
 from app.core.config import get_settings
+from app.core.cache import bump_generation
+from app.core.periods import period_key
+from app.core.tracing import current_span, span, traced
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+HISTORY_FIELDS = [
+    "farm_id",
+    "timestamp",
+    "water_liters",
+    "tokens_consumed",
+    "rainfall_mm",
+    "temperature_c",
+    "humidity_percent",
+]
+
 
 class WaterManagementService:
     """Service for water management business logic"""
@@ -20,46 +44,120 @@ class WaterManagementService:
         return water_liters * settings.water_credit_rate
 
     @staticmethod
+    def _create_profiles(db: Session, farm_ids: List[int], water_limit: float):
+        """Create profiles for new farms; one another worker just created is left as is"""
+        if not farm_ids:
+            return
+        db.execute(
+            sqlite_insert(FarmProfile.__table__).on_conflict_do_nothing(index_elements=["farm_id"]),
+            [
+                {
+                    "farm_id": farm_id,
+                    "water_limit": water_limit,
+                    "total_water_used": 0.0,
+                    "total_tokens_consumed": 0.0,
+                    "status": "economy",
+                }
+                for farm_id in farm_ids
+            ]
+        )
+
+    @staticmethod
+    def _usage_result(record: WaterUsageRecord, duplicate: bool = False) -> Dict:
+        """Build the ingestion response for a stored record"""
+        return {
+            "success": True,
+            "message": "Duplicate reading ignored" if duplicate else "Water usage recorded successfully",
+            "farm_id": record.farm_id,
+            "water_liters": record.water_liters,
+            "tokens_consumed": record.tokens_consumed,
+            "solana_tx_id": record.solana_tx_id,
+            "timestamp": record.timestamp,
+            "duplicate": duplicate
+        }
+
+    @staticmethod
+    @traced()
     async def record_usage(
         db: Session,
         usage_data: WaterUsageData
     ) -> Dict:
-        """Record water usage and update farm profile"""
+        """
+        Record water usage and update farm profile
+
+        Ingestion is idempotent: a retried reading (same reading_id, or same
+        farm and timestamp) returns the original result without updating
+        totals or sending another transaction.
+
+        Raises:
+            ReadingInFlight: the original is still being recorded after the wait
+        """
+        key = reading_key(usage_data)
+        current_span().set_attributes(farm_id=usage_data.farm_id, water_liters=usage_data.water_liters)
+
+        cached = recent_readings.get(key)
+        if cached is not None:
+            current_span().set_attribute("duplicate", "cache")
+            return {**cached, "message": "Duplicate reading ignored", "duplicate": True}
+
+        if not await recent_readings.wait_claim(key, settings.ingest_inflight_wait_seconds):
+            raise ReadingInFlight(f"Reading {key} is still being recorded by another request")
+
         try:
+            with span("db.query", table="water_usage_records", by="reading_key"):
+                existing = db.query(WaterUsageRecord).filter(
+                    WaterUsageRecord.reading_key == key
+                ).first()
+                if existing is None and PartitionService.enabled():
+                    existing = PartitionService.find_archived(db, {key: usage_data.timestamp}).get(key)
+            if existing:
+                current_span().set_attribute("duplicate", "db")
+                result = WaterManagementService._usage_result(existing)
+                recent_readings.put(key, result)
+                return WaterManagementService._usage_result(existing, duplicate=True)
+
             # Calculate tokens consumed
             tokens = WaterManagementService.calculate_tokens(usage_data.water_liters)
 
-            # Get or create farm profile
-            farm = db.query(FarmProfile).filter(
-                FarmProfile.farm_id == usage_data.farm_id
-            ).first()
-
-            if not farm:
-                farm = FarmProfile(
+            # Record transaction on Solana
+            with span("chain.record_water_usage"):
+                tx_id = await get_solana_service().record_water_usage(
                     farm_id=usage_data.farm_id,
-                    water_limit=settings.default_water_limit_liters
+                    water_liters=usage_data.water_liters,
+                    tokens_consumed=tokens
                 )
-                db.add(farm)
 
-            # Update farm totals
-            farm.total_water_used += usage_data.water_liters
-            farm.total_tokens_consumed += tokens
-            farm.last_updated = datetime.now()
+            # Farm limit from the ledger; a new farm gets a profile
+            entry = farm_ledger.get(db, usage_data.farm_id)
+            if entry is None:
+                water_limit = settings.default_water_limit_liters
+                WaterManagementService._create_profiles(db, [usage_data.farm_id], water_limit)
+            else:
+                water_limit = entry.water_limit
 
-            # Determine status
-            percentage = (farm.total_water_used / farm.water_limit) * 100
-            farm.status = "economy" if percentage <= 100 else "overspend"
+            # Update the reading's period counters; status follows the current period
+            with span("db.period_usage"):
+                period_usage = PeriodUsageService.apply(
+                    db, usage_data.farm_id, water_limit, usage_data.timestamp, usage_data.water_liters, tokens
+                )
 
-            # Record transaction on Solana
-            tx_id = await solana_service.record_water_usage(
-                farm_id=usage_data.farm_id,
-                water_liters=usage_data.water_liters,
-                tokens_consumed=tokens
+            # Update lifetime farm totals in place, without loading the profile
+            farm_values = {
+                "total_water_used": FarmProfile.total_water_used + usage_data.water_liters,
+                "total_tokens_consumed": FarmProfile.total_tokens_consumed + tokens,
+                "last_updated": datetime.now(),
+            }
+            if period_usage.period == period_key():
+                _, farm_values["status"] = usage_status(period_usage.water_liters, water_limit)
+            db.execute(
+                update(FarmProfile).where(FarmProfile.farm_id == usage_data.farm_id).values(**farm_values),
+                execution_options={"synchronize_session": False}
             )
 
             # Save water usage record
             record = WaterUsageRecord(
                 farm_id=usage_data.farm_id,
+                reading_key=key,
                 timestamp=usage_data.timestamp,
                 water_liters=usage_data.water_liters,
                 rainfall_mm=usage_data.rainfall_mm,
@@ -69,79 +167,408 @@ class WaterManagementService:
                 solana_tx_id=tx_id
             )
             db.add(record)
-            db.commit()
-            db.refresh(record)
+            with span("db.rollup"):
+                RollupService.apply(db, record)
+
+            try:
+                with span("db.commit"):
+                    db.commit()
+            except IntegrityError:
+                # Another worker stored the same reading first (the only
+                # constraint left: profiles and counters are upserts)
+                db.rollback()
+                existing = db.query(WaterUsageRecord).filter(
+                    WaterUsageRecord.reading_key == key
+                ).first()
+                if not existing:
+                    raise
+                recent_readings.put(key, WaterManagementService._usage_result(existing))
+                return WaterManagementService._usage_result(existing, duplicate=True)
+
+            with span("db.refresh"):
+                db.refresh(record)
+            bump_generation(period_usage.period)
+            farm_ledger.apply([FarmDelta(
+                usage_data.farm_id, water_limit, usage_data.water_liters, tokens, period_usage.period
+            )])
+            AnomalyService.observe(db, [(
+                key, usage_data.farm_id, usage_data.timestamp, usage_data.water_liters, usage_data.rainfall_mm
+            )])
 
             logger.info(f"Recorded usage for farm {usage_data.farm_id}: {usage_data.water_liters}L")
 
-            return {
-                "success": True,
-                "message": "Water usage recorded successfully",
-                "farm_id": usage_data.farm_id,
-                "water_liters": usage_data.water_liters,
-                "tokens_consumed": tokens,
-                "solana_tx_id": tx_id,
-                "timestamp": usage_data.timestamp
-            }
+            result = WaterManagementService._usage_result(record)
+            recent_readings.put(key, result)
+            return result
 
         except Exception as e:
             db.rollback()
             logger.error(f"Error recording usage: {e}")
             raise
+        finally:
+            recent_readings.release(key)
 
     @staticmethod
-    def get_farm_statistics(db: Session, farm_id: int) -> FarmStatistics:
-        """Get statistics for a specific farm"""
-        farm = db.query(FarmProfile).filter(FarmProfile.farm_id == farm_id).first()
-
-        if not farm:
-            return FarmStatistics(
-                farm_id=farm_id,
-                total_water_used=0.0,
-                water_limit=settings.default_water_limit_liters,
-                tokens_consumed=0.0,
-                status="economy",
-                percentage_used=0.0
+    @traced()
+    async def record_usage_batch(
+        db: Session,
+        readings: List[WaterUsageData]
+    ) -> Dict[str, int]:
+        """
+        Record a batch of readings in one transaction
+
+        Same semantics as record_usage (idempotent, rollups, period counters,
+        farm status) with a fixed number of queries per batch instead of per
+        reading. Keep batches to a few hundred readings.
+
+        Returns:
+            {"accepted": 480, "duplicates": 20}
+
+        Raises:
+            ReadingInFlight: a reading is still being recorded elsewhere after the wait
+        """
+        current_span().set_attribute("readings", len(readings))
+
+        # Drop retries: within the batch or recently seen
+        fresh: Dict[str, WaterUsageData] = {}
+        waiting: Dict[str, WaterUsageData] = {}
+        duplicates = 0
+        for usage_data in readings:
+            key = reading_key(usage_data)
+            if key in fresh or key in waiting or recent_readings.get(key) is not None:
+                duplicates += 1
+            elif recent_readings.claim(key):
+                fresh[key] = usage_data
+            else:
+                waiting[key] = usage_data
+
+        try:
+            # Readings in flight elsewhere: wait for them, then check the database like the rest
+            if waiting:
+                claimed = await asyncio.gather(*(
+                    recent_readings.wait_claim(key, settings.ingest_inflight_wait_seconds) for key in waiting
+                ))
+                for (key, usage_data), ok in zip(waiting.items(), claimed):
+                    if ok:
+                        fresh[key] = usage_data
+                if not all(claimed):
+                    raise ReadingInFlight(
+                        f"{len(claimed) - sum(claimed)} readings are still being recorded by another request"
+                    )
+
+            if fresh:
+                with span("db.query", table="water_usage_records", by="reading_key"):
+                    stored = {
+                        key for (key,) in db.query(WaterUsageRecord.reading_key).filter(
+                            WaterUsageRecord.reading_key.in_(list(fresh))
+                        )
+                    }
+                    if PartitionService.enabled():
+                        stored.update(PartitionService.find_archived(db, {
+                            key: usage_data.timestamp for key, usage_data in fresh.items() if key not in stored
+                        }))
+                for key in stored:
+                    del fresh[key]
+                    recent_readings.release(key)
+                duplicates += len(stored)
+
+            if not fresh:
+                return {"accepted": 0, "duplicates": duplicates}
+
+            tokens = {
+                key: WaterManagementService.calculate_tokens(usage_data.water_liters)
+                for key, usage_data in fresh.items()
+            }
+
+            with span("chain.record_water_usage_batch"):
+                tx_ids = await get_solana_service().record_water_usage_batch([
+                    (usage_data.farm_id, usage_data.water_liters, tokens[key])
+                    for key, usage_data in fresh.items()
+                ])
+
+            # Farm limits from the ledger; new farms get profiles
+            water_limits: Dict[int, float] = {}
+            new_farms = []
+            for farm_id in {usage_data.farm_id for usage_data in fresh.values()}:
+                entry = farm_ledger.get(db, farm_id)
+                if entry is None:
+                    water_limits[farm_id] = settings.default_water_limit_liters
+                    new_farms.append(farm_id)
+                else:
+                    water_limits[farm_id] = entry.water_limit
+            WaterManagementService._create_profiles(db, new_farms, settings.default_water_limit_liters)
+
+            rows = []
+            farm_sums: Dict[int, list] = {}
+            ledger_sums: Dict[tuple, list] = {}  # Per farm and period
+            for (key, usage_data), tx_id in zip(fresh.items(), tx_ids):
+                rows.append({
+                    "farm_id": usage_data.farm_id,
+                    "reading_key": key,
+                    "timestamp": usage_data.timestamp,
+                    "water_liters": usage_data.water_liters,
+                    "rainfall_mm": usage_data.rainfall_mm,
+                    "temperature_c": usage_data.temperature_c,
+                    "humidity_percent": usage_data.humidity_percent,
+                    "tokens_consumed": tokens[key],
+                    "solana_tx_id": tx_id,
+                })
+                sums = farm_sums.setdefault(usage_data.farm_id, [0.0, 0.0])
+                sums[0] += usage_data.water_liters
+                sums[1] += tokens[key]
+                sums = ledger_sums.setdefault((usage_data.farm_id, period_key(usage_data.timestamp)), [0.0, 0.0, 0])
+                sums[0] += usage_data.water_liters
+                sums[1] += tokens[key]
+                sums[2] += 1
+
+            # Period counters; status follows the current period
+            with span("db.period_usage"):
+                period_usages = PeriodUsageService.apply_many(db, water_limits, [
+                    (row["farm_id"], row["timestamp"], row["water_liters"], row["tokens_consumed"])
+                    for row in rows
+                ])
+            current = period_key()
+            statuses = {
+                farm_id: usage_status(usage.water_liters, water_limits[farm_id])[1]
+                for (farm_id, period), usage in period_usages.items()
+                if period == current
+            }
+
+            # Lifetime farm totals, one executemany per shape of update
+            now = datetime.now()
+            farm_table = FarmProfile.__table__
+            for with_status in (False, True):
+                params = [
+                    {
+                        "fid": farm_id,
+                        "liters": water_liters,
+                        "tokens": tokens_consumed,
+                        "now": now,
+                        **({"status": statuses[farm_id]} if with_status else {}),
+                    }
+                    for farm_id, (water_liters, tokens_consumed) in farm_sums.items()
+                    if (farm_id in statuses) == with_status
+                ]
+                if not params:
+                    continue
+                values = {
+                    "total_water_used": farm_table.c.total_water_used + bindparam("liters"),
+                    "total_tokens_consumed": farm_table.c.total_tokens_consumed + bindparam("tokens"),
+                    "last_updated": bindparam("now"),
+                }
+                if with_status:
+                    values["status"] = bindparam("status")
+                db.execute(
+                    update(farm_table).where(farm_table.c.farm_id == bindparam("fid")).values(**values),
+                    params
+                )
+
+            with span("db.rollup"):
+                RollupService.apply_many(db, [
+                    (row["farm_id"], row["timestamp"], row["water_liters"], row["tokens_consumed"],
+                     row["rainfall_mm"], row["temperature_c"], row["humidity_percent"])
+                    for row in rows
+                ])
+
+            try:
+                # One executemany instead of an ORM object per reading
+                with span("db.insert", table="water_usage_records", rows=len(rows)):
+                    db.execute(insert(WaterUsageRecord.__table__), rows)
+                with span("db.commit"):
+                    db.commit()
+            except IntegrityError:
+                # Another worker stored some of these readings first: fall back
+                # to one reading at a time, which sorts out the duplicates
+                db.rollback()
+                for key in fresh:
+                    recent_readings.release(key)
+                pending = list(fresh.values())
+                fresh = {}
+                accepted = 0
+                for usage_data in pending:
+                    result = await WaterManagementService.record_usage(db, usage_data)
+                    if result.get("duplicate"):
+                        duplicates += 1
+                    else:
+                        accepted += 1
+                return {"accepted": accepted, "duplicates": duplicates}
+
+            for period in {period for _, period in period_usages}:
+                bump_generation(period)
+            farm_ledger.apply(
+                FarmDelta(farm_id, water_limits[farm_id], water_liters, tokens_consumed, period, readings)
+                for (farm_id, period), (water_liters, tokens_consumed, readings) in ledger_sums.items()
             )
+            AnomalyService.observe(db, (
+                (row["reading_key"], row["farm_id"], row["timestamp"], row["water_liters"], row["rainfall_mm"])
+                for row in rows
+            ))
+            for row in rows:
+                recent_readings.put(row["reading_key"], WaterManagementService._usage_result(SimpleNamespace(**row)))
+
+            logger.info(f"Recorded {len(rows)} usage readings in a batch ({duplicates} duplicates)")
+            return {"accepted": len(rows), "duplicates": duplicates}
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error recording usage batch: {e}")
+            raise
+        finally:
+            for key in fresh:
+                recent_readings.release(key)
 
-        percentage = (farm.total_water_used / farm.water_limit) * 100
+    @staticmethod
+    def _period_statistics(
+        farm_id: int,
+        water_limit: float,
+        entry: Optional[FarmEntry],
+        period: str
+    ) -> FarmStatistics:
+        """Current-period statistics from a farm's ledger row"""
+        water_used = entry.period_liters if entry else 0.0
+        percentage, status = usage_status(water_used, water_limit)
 
         return FarmStatistics(
-            farm_id=farm.farm_id,
-            total_water_used=farm.total_water_used,
-            water_limit=farm.water_limit,
-            tokens_consumed=farm.total_tokens_consumed,
-            status=farm.status,
-            percentage_used=round(percentage, 2)
+            farm_id=farm_id,
+            total_water_used=water_used,
+            water_limit=water_limit,
+            tokens_consumed=entry.period_tokens if entry else 0.0,
+            status=status,
+            percentage_used=round(percentage, 2),
+            period=period
         )
 
+    @staticmethod
+    def get_farm_statistics(db: Session, farm_id: int) -> FarmStatistics:
+        """Get current-period statistics for a specific farm"""
+        entry = farm_ledger.get(db, farm_id)
+        water_limit = entry.water_limit if entry else settings.default_water_limit_liters
+        return WaterManagementService._period_statistics(farm_id, water_limit, entry, farm_ledger.period)
+
     @staticmethod
     def get_all_statistics(db: Session) -> List[FarmStatistics]:
-        """Get statistics for all farms"""
-        farms = db.query(FarmProfile).all()
+        """Get current-period statistics for all farms"""
+        entries = farm_ledger.all(db)
         return [
-            WaterManagementService.get_farm_statistics(db, farm.farm_id)
-            for farm in farms
+            WaterManagementService._period_statistics(entry.farm_id, entry.water_limit, entry, farm_ledger.period)
+            for entry in entries
         ]
 
     @staticmethod
-    def get_usage_history(db: Session, days: int = 30) -> List[Dict]:
-        """Get water usage history for the last N days"""
+    def get_period_history(db: Session, farm_id: int, limit: int = 12) -> FarmPeriodHistory:
+        """Per-period usage of a farm, most recent first"""
+        periods = []
+        for usage in PeriodUsageService.get_history(db, farm_id, limit):
+            percentage, status = usage_status(usage.water_liters, usage.water_limit)
+            periods.append(FarmPeriodStatistics(
+                period=usage.period,
+                water_used=usage.water_liters,
+                water_limit=usage.water_limit,
+                tokens_consumed=usage.tokens_consumed,
+                readings=usage.readings,
+                percentage_used=round(percentage, 2),
+                status=status
+            ))
+        return FarmPeriodHistory(farm_id=farm_id, periods=periods)
+
+    @staticmethod
+    def get_latest_record_id(db: Session) -> int:
+        """Highest usage record ID, used as the delta-sync cursor"""
+        return db.query(func.max(WaterUsageRecord.id)).scalar() or 0
+
+    @staticmethod
+    def _history_rows(
+        db: Session,
+        days: int,
+        since_id: Optional[int] = None,
+        until_id: Optional[int] = None
+    ):
+        """
+        Select raw history columns for the last N days
+
+        With since_id, only records added after that ID are returned, oldest
+        first, each with its ID appended so the caller can advance its cursor.
+        until_id caps a full history at a previously read cursor.
+        """
         start_date = datetime.now() - timedelta(days=days)
+        columns = [getattr(WaterUsageRecord, name) for name in HISTORY_FIELDS]
+
+        if since_id is None:
+            query = select(*columns).where(
+                WaterUsageRecord.timestamp >= start_date
+            ).order_by(WaterUsageRecord.timestamp.desc())
+            if until_id is not None:
+                query = query.where(WaterUsageRecord.id <= until_id)
+            if PartitionService.enabled():
+                return PartitionService.fetch_all(
+                    db, query, key=lambda row: row[1], reverse=True, start=start_date
+                )
+        else:
+            # New records are always in the hot table
+            query = select(*columns, WaterUsageRecord.id).where(
+                WaterUsageRecord.id > since_id,
+                WaterUsageRecord.timestamp >= start_date
+            ).order_by(WaterUsageRecord.id)
 
-        records = db.query(WaterUsageRecord).filter(
-            WaterUsageRecord.timestamp >= start_date
-        ).order_by(WaterUsageRecord.timestamp.desc()).all()
+        return db.execute(query).all()
 
+    @staticmethod
+    def _rows_to_records(rows) -> List[Dict]:
         return [
             {
-                "farm_id": record.farm_id,
-                "timestamp": record.timestamp.isoformat(),
-                "water_liters": record.water_liters,
-                "tokens_consumed": record.tokens_consumed,
-                "rainfall_mm": record.rainfall_mm,
-                "temperature_c": record.temperature_c,
-                "humidity_percent": record.humidity_percent
+                "farm_id": row[0],
+                "timestamp": row[1].isoformat(),
+                "water_liters": row[2],
+                "tokens_consumed": row[3],
+                "rainfall_mm": row[4],
+                "temperature_c": row[5],
+                "humidity_percent": row[6]
             }
-            for record in records
+            for row in rows
         ]
+
+    @staticmethod
+    def _rows_to_columns(rows) -> Dict[str, list]:
+        columns = list(zip(*rows)) if rows else [()] * len(HISTORY_FIELDS)
+        return {name: list(values) for name, values in zip(HISTORY_FIELDS, columns)}
+
+    @staticmethod
+    def get_usage_history(db: Session, days: int = 30, until_id: Optional[int] = None) -> List[Dict]:
+        """Get water usage history for the last N days"""
+        rows = WaterManagementService._history_rows(db, days, until_id=until_id)
+        return WaterManagementService._rows_to_records(rows)
+
+    @staticmethod
+    def get_usage_history_columns(
+        db: Session,
+        days: int = 30,
+        until_id: Optional[int] = None
+    ) -> Dict[str, list]:
+        """Get water usage history for the last N days as parallel arrays"""
+        rows = WaterManagementService._history_rows(db, days, until_id=until_id)
+        return WaterManagementService._rows_to_columns(rows)
+
+    @staticmethod
+    def get_usage_delta(db: Session, since_id: int, days: int = 30, columnar: bool = False) -> Dict:
+        """
+        Get history added after a record ID cursor
+
+        Returns:
+            {
+                "history": [...] or {column: [...]},
+                "farm_ids": {farm IDs with new records},
+                "cursor": highest record ID seen (since_id if nothing is new)
+            }
+        """
+        rows = WaterManagementService._history_rows(db, days, since_id)
+
+        if columnar:
+            history = WaterManagementService._rows_to_columns(rows)
+        else:
+            history = WaterManagementService._rows_to_records(rows)
+
+        return {
+            "history": history,
+            "farm_ids": {row[0] for row in rows},
+            "cursor": rows[-1][-1] if rows else since_id
+        }
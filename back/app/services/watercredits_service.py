@@ -4,22 +4,28 @@ WaterCredits SPL Token Service
 Реальный токен на Solana для управления водными квотами
 """
 
+import asyncio
 import logging
 import os
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 import struct
 
 from solana.rpc.api import Client
 from solana.rpc.commitment import Confirmed
-from solana.transaction import Transaction
 from solders.keypair import Keypair
 from solders.pubkey import Pubkey
 from solders.system_program import create_account, CreateAccountParams
 from solders.instruction import Instruction, AccountMeta
 from solders.sysvar import RENT
+from solders.compute_budget import ID as COMPUTE_BUDGET_PROGRAM_ID
 import base58
 
 from app.core.config import get_settings
+from app.core.tracing import current_span, span, traced
+from app.services.transaction_builder import TransactionBuilder
+from app.services.lookup_table import LookupTableManager
+from app.services.tx_sender import TransactionSender
+from app.services.balance_subscriber import BalanceSubscriber
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -39,6 +45,7 @@ class WaterCreditsService:
     # Program IDs
     TOKEN_PROGRAM_ID = Pubkey.from_string("TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA")
     ASSOCIATED_TOKEN_PROGRAM_ID = Pubkey.from_string("ATokenGPvbdGVxr1b2hvZbsiqW5xWH25efTNsLJA8knL")
+    MEMO_PROGRAM_ID = Pubkey.from_string("MemoSq4gqABAXKb96qnH8TysNcWxMyWCqXgDLGmfcHr")
     SYSTEM_PROGRAM_ID = Pubkey.from_string("11111111111111111111111111111111")
 
     # Token configuration
@@ -49,17 +56,22 @@ class WaterCreditsService:
     TOKEN_IMAGE_URL = os.getenv("TOKEN_IMAGE_URL", "http://localhost:8000/static/watercredits-logo.svg")
     TOKEN_METADATA_URL = os.getenv("TOKEN_METADATA_URL", "http://localhost:8000/static/watercredits-metadata.json")
 
-    def __init__(self):
+    def __init__(self, authority: Optional[Keypair] = None):
         self.client = Client(settings.solana_rpc_url, commitment=Confirmed)
 
-        # Load or create authority
+        # Shared authority, else load or create one
         authority_key = os.getenv("SOLANA_AUTHORITY_KEY")
-        if authority_key:
+        if authority is not None:
+            self.authority = authority
+        elif authority_key:
             self.authority = Keypair.from_base58_string(authority_key)
         else:
             self.authority = Keypair()
             logger.warning(f"⚠️  No SOLANA_AUTHORITY_KEY. Generated new keypair.")
 
+        self.tx_builder = TransactionBuilder(self.client, self.authority.pubkey())
+        self.sender = TransactionSender(self.client, self.tx_builder)
+
         # WaterCredits mint address (load from env or will be created)
         mint_address = os.getenv("WATERCREDITS_MINT")
         if mint_address:
@@ -69,13 +81,31 @@ class WaterCreditsService:
             self.watercredits_mint = None
             logger.warning("⚠️  WATERCREDITS_MINT not set. Create token first.")
 
-        self._ensure_balance()
+        # Address lookup table for v0 batch transactions (optional)
+        lookup_table = os.getenv("WATERCREDITS_LOOKUP_TABLE")
+        self.lookup_tables = LookupTableManager(
+            self.client,
+            self.authority,
+            self.sender,
+            Pubkey.from_string(lookup_table) if lookup_table else None
+        )
+
+        # Websocket-fed balance cache, started by start_balance_subscriber()
+        self.balances: Optional[BalanceSubscriber] = None
+
+        # Checked (and topped up on devnet) before the first chain write, so
+        # building the service costs no RPC round trips
+        self._balance_checked = False
         logger.info("💧 WaterCredits Service initialized")
 
     def _ensure_balance(self):
-        """Ensure authority has SOL for operations"""
+        """Ensure authority has SOL for operations (once per process)"""
+        if self._balance_checked:
+            return
+        self._balance_checked = True
         try:
-            balance = self.client.get_balance(self.authority.pubkey()).value
+            with span("rpc.ensure_balance"):
+                balance = self.client.get_balance(self.authority.pubkey()).value
             balance_sol = balance / 1e9
 
             logger.info(f"💰 Authority balance: {balance_sol:.4f} SOL")
@@ -95,6 +125,49 @@ class WaterCreditsService:
         ata, _ = Pubkey.find_program_address(seeds, self.ASSOCIATED_TOKEN_PROGRAM_ID)
         return ata
 
+    def farm_owner(self, farm_id: int) -> Pubkey:
+        """
+        Owner of a farm's WaterCredits account
+
+        Farms listed in FARM_WALLETS hold their own accounts (the authority
+        must be approved as delegate to burn from them); all others use the
+        authority's account, as in the MVP.
+        """
+        wallet = settings.farm_wallets.get(farm_id)
+        return Pubkey.from_string(wallet) if wallet else self.authority.pubkey()
+
+    def farm_token_account(self, farm_id: int) -> Pubkey:
+        """WaterCredits token account (ATA) of a farm"""
+        return self._get_associated_token_address(self.watercredits_mint, self.farm_owner(farm_id))
+
+    def _burn_ix(self, farm_id: int, water_liters: float) -> Instruction:
+        """SPL Burn instruction for a farm's water usage"""
+        burn_amount = int(water_liters * (10 ** self.DECIMALS))
+        burn_data = struct.pack("<B Q", 8, burn_amount)  # 8 = Burn
+        return Instruction(
+            program_id=self.TOKEN_PROGRAM_ID,
+            accounts=[
+                AccountMeta(pubkey=self.farm_token_account(farm_id), is_signer=False, is_writable=True),
+                AccountMeta(pubkey=self.watercredits_mint, is_signer=False, is_writable=True),
+                AccountMeta(pubkey=self.authority.pubkey(), is_signer=True, is_writable=False),
+            ],
+            data=burn_data
+        )
+
+    def _transfer_ix(self, from_farm_id: int, to_farm_id: int, amount_units: int) -> Instruction:
+        """SPL Transfer instruction between two farms' accounts (authority as owner or delegate)"""
+        transfer_data = struct.pack("<B Q", 3, amount_units)  # 3 = Transfer
+        return Instruction(
+            program_id=self.TOKEN_PROGRAM_ID,
+            accounts=[
+                AccountMeta(pubkey=self.farm_token_account(from_farm_id), is_signer=False, is_writable=True),
+                AccountMeta(pubkey=self.farm_token_account(to_farm_id), is_signer=False, is_writable=True),
+                AccountMeta(pubkey=self.authority.pubkey(), is_signer=True, is_writable=False),
+            ],
+            data=transfer_data
+        )
+
+    @traced()
     async def create_watercredits_token(self) -> Dict:
         """
         Создает WaterCredits SPL Token (один раз при первом запуске)
@@ -108,6 +181,7 @@ class WaterCreditsService:
             }
         """
         try:
+            self._ensure_balance()
             logger.info("🪙 Creating WaterCredits SPL Token...")
 
             # 1. Generate mint keypair
@@ -119,10 +193,7 @@ class WaterCreditsService:
             # 2. Calculate rent
             mint_rent = self.client.get_minimum_balance_for_rent_exemption(82).value
 
-            # 3. Get recent blockhash
-            recent_blockhash = self.client.get_latest_blockhash().value.blockhash
-
-            # 4. Create mint account instruction
+            # 3. Create mint account instruction
             create_mint_account_ix = create_account(
                 CreateAccountParams(
                     from_pubkey=self.authority.pubkey(),
@@ -133,7 +204,7 @@ class WaterCreditsService:
                 )
             )
 
-            # 5. Initialize mint instruction
+            # 4. Initialize mint instruction
             init_mint_data = struct.pack(
                 "<B B 32s ? 32s",
                 0,  # InitializeMint instruction
@@ -152,24 +223,20 @@ class WaterCreditsService:
                 data=init_mint_data
             )
 
-            # 6. Build and send transaction
-            tx = Transaction(
-                fee_payer=self.authority.pubkey(),
-                recent_blockhash=recent_blockhash
-            )
-            tx.add(create_mint_account_ix)
-            tx.add(init_mint_ix)
-
+            # 5. Build, send and rebroadcast until confirmed
             logger.info("📤 Sending transaction...")
-            tx_sig = self.client.send_transaction(tx, self.authority, mint_keypair)
-            signature = tx_sig.value
-
-            logger.info(f"⏳ Confirming... TX: {signature}")
-            confirmation = self.client.confirm_transaction(signature, commitment=Confirmed)
+            sent = await self.sender.send_instructions(
+                [create_mint_account_ix, init_mint_ix],
+                [self.authority, mint_keypair],
+                label="Create WaterCredits"
+            )
+            signature = sent.get("signature")
 
-            if confirmation.value:
+            if sent["success"]:
                 logger.info("✅ WaterCredits Token created!")
                 self.watercredits_mint = mint_pubkey
+                if settings.balance_subscriber_enabled:
+                    self.start_balance_subscriber()
 
                 # Save to env for future use
                 logger.info(f"💾 Save this to .env:")
@@ -185,12 +252,13 @@ class WaterCreditsService:
                     "explorer_url": f"https://explorer.solana.com/address/{mint_pubkey}?cluster={settings.solana_network}"
                 }
             else:
-                return {"success": False, "error": "Transaction failed to confirm"}
+                return {"success": False, "error": sent["error"]}
 
         except Exception as e:
             logger.error(f"❌ Error creating token: {e}", exc_info=True)
             return {"success": False, "error": str(e)}
 
+    @traced()
     async def mint_quota_to_farmer(self, farm_id: int, amount: float = 100000.0) -> Dict:
         """
         Mint WaterCredits quota to farmer
@@ -209,37 +277,31 @@ class WaterCreditsService:
             }
         """
         try:
+            self._ensure_balance()
             if not self.watercredits_mint:
                 return {"success": False, "error": "WaterCredits token not created yet"}
 
             logger.info(f"💰 Minting {amount} WC to Farm #{farm_id}...")
 
-            # For MVP: mint to authority's ATA (в production будет farmer's wallet)
-            ata = self._get_associated_token_address(
-                self.watercredits_mint,
-                self.authority.pubkey()
-            )
+            # For MVP: mint to authority's ATA unless the farm has its own wallet
+            owner = self.farm_owner(farm_id)
+            ata = self.farm_token_account(farm_id)
 
             # Convert amount to token units (with decimals)
             amount_units = int(amount * (10 ** self.DECIMALS))
 
-            recent_blockhash = self.client.get_latest_blockhash().value.blockhash
-
             # Check if ATA exists
             ata_exists = False
             try:
-                ata_info = self.client.get_account_info(ata)
+                with span("rpc.get_account_info"):
+                    ata_info = self.client.get_account_info(ata)
                 ata_exists = ata_info.value is not None
                 if ata_exists:
                     logger.info(f"   ATA already exists: {ata}")
             except:
                 pass
 
-            # Build transaction
-            tx = Transaction(
-                fee_payer=self.authority.pubkey(),
-                recent_blockhash=recent_blockhash
-            )
+            instructions = []
 
             # Create ATA if doesn't exist
             if not ata_exists:
@@ -249,14 +311,14 @@ class WaterCreditsService:
                     accounts=[
                         AccountMeta(pubkey=self.authority.pubkey(), is_signer=True, is_writable=True),
                         AccountMeta(pubkey=ata, is_signer=False, is_writable=True),
-                        AccountMeta(pubkey=self.authority.pubkey(), is_signer=False, is_writable=False),
+                        AccountMeta(pubkey=owner, is_signer=False, is_writable=False),
                         AccountMeta(pubkey=self.watercredits_mint, is_signer=False, is_writable=False),
                         AccountMeta(pubkey=self.SYSTEM_PROGRAM_ID, is_signer=False, is_writable=False),
                         AccountMeta(pubkey=self.TOKEN_PROGRAM_ID, is_signer=False, is_writable=False),
                     ],
                     data=bytes([])
                 )
-                tx.add(create_ata_ix)
+                instructions.append(create_ata_ix)
 
             # Mint instruction
             mint_to_data = struct.pack("<B Q", 7, amount_units)  # 7 = MintTo
@@ -269,15 +331,15 @@ class WaterCreditsService:
                 ],
                 data=mint_to_data
             )
-            tx.add(mint_to_ix)
-
-            # Send
-            tx_sig = self.client.send_transaction(tx, self.authority)
-            signature = tx_sig.value
+            instructions.append(mint_to_ix)
 
-            confirmation = self.client.confirm_transaction(signature, commitment=Confirmed)
+            # Build with compute budget and send
+            sent = await self.sender.send_instructions(
+                instructions, [self.authority], label=f"Mint quota Farm #{farm_id}", debits=[ata]
+            )
+            signature = sent.get("signature")
 
-            if confirmation.value:
+            if sent["success"]:
                 logger.info(f"✅ Minted {amount} WC to Farm #{farm_id}")
                 logger.info(f"   Token Account: {ata}")
                 logger.info(f"   TX: {signature}")
@@ -291,12 +353,13 @@ class WaterCreditsService:
                     "explorer_url": f"https://explorer.solana.com/tx/{signature}?cluster={settings.solana_network}"
                 }
             else:
-                return {"success": False, "error": "Transaction failed"}
+                return {"success": False, "error": sent["error"]}
 
         except Exception as e:
             logger.error(f"❌ Error minting quota: {e}", exc_info=True)
             return {"success": False, "error": str(e)}
 
+    @traced()
     async def burn_on_water_usage(self, farm_id: int, water_liters: float) -> Dict:
         """
         Burn WaterCredits when water is used
@@ -315,45 +378,22 @@ class WaterCreditsService:
             }
         """
         try:
+            self._ensure_balance()
             if not self.watercredits_mint:
                 return {"success": False, "error": "WaterCredits token not created"}
 
             logger.info(f"🔥 Burning {water_liters} WC for Farm #{farm_id}...")
 
-            # Convert to token units
-            burn_amount = int(water_liters * (10 ** self.DECIMALS))
-
-            ata = self._get_associated_token_address(
-                self.watercredits_mint,
-                self.authority.pubkey()
-            )
-
-            recent_blockhash = self.client.get_latest_blockhash().value.blockhash
-
             # Burn instruction (instruction 8)
-            burn_data = struct.pack("<B Q", 8, burn_amount)
-            burn_ix = Instruction(
-                program_id=self.TOKEN_PROGRAM_ID,
-                accounts=[
-                    AccountMeta(pubkey=ata, is_signer=False, is_writable=True),
-                    AccountMeta(pubkey=self.watercredits_mint, is_signer=False, is_writable=True),
-                    AccountMeta(pubkey=self.authority.pubkey(), is_signer=True, is_writable=False),
-                ],
-                data=burn_data
-            )
+            burn_ix = self._burn_ix(farm_id, water_liters)
 
-            tx = Transaction(
-                fee_payer=self.authority.pubkey(),
-                recent_blockhash=recent_blockhash
+            sent = await self.sender.send_instructions(
+                [burn_ix], [self.authority], label=f"Burn Farm #{farm_id}",
+                debits=[self.farm_token_account(farm_id)]
             )
-            tx.add(burn_ix)
-
-            tx_sig = self.client.send_transaction(tx, self.authority)
-            signature = tx_sig.value
+            signature = sent.get("signature")
 
-            confirmation = self.client.confirm_transaction(signature, commitment=Confirmed)
-
-            if confirmation.value:
+            if sent["success"]:
                 logger.info(f"✅ Burned {water_liters} WC for Farm #{farm_id}")
                 logger.info(f"   TX: {signature}")
 
@@ -366,12 +406,209 @@ class WaterCreditsService:
                     "explorer_url": f"https://explorer.solana.com/tx/{signature}?cluster={settings.solana_network}"
                 }
             else:
-                return {"success": False, "error": "Burn transaction failed"}
+                return {"success": False, "error": sent["error"]}
 
         except Exception as e:
             logger.error(f"❌ Error burning tokens: {e}", exc_info=True)
             return {"success": False, "error": str(e)}
 
+    @traced()
+    async def burn_batch(self, usages: List[Tuple[int, float]]) -> Dict:
+        """
+        Burn WaterCredits for many farm usages in as few transactions as possible
+
+        Burn instructions are packed into v0 transactions compiled against the
+        lookup table (if configured), so each transaction carries many more
+        burns than a legacy one.
+
+        Args:
+            usages: (farm_id, water_liters) pairs
+
+        Returns:
+            {
+                "success": True,
+                "burns": 120,
+                "transactions": [{"signature": "...", "burns": 60}, ...]
+            }
+        """
+        try:
+            self._ensure_balance()
+            if not self.watercredits_mint:
+                return {"success": False, "error": "WaterCredits token not created"}
+
+            instructions = [self._burn_ix(farm_id, liters) for farm_id, liters in usages]
+            lookup_tables = self.lookup_tables.table_accounts()
+
+            with span("tx.pack_v0", instructions=len(instructions)) as pack_span:
+                recent_blockhash = self.client.get_latest_blockhash().value.blockhash
+                groups = self.tx_builder.pack_v0(instructions, recent_blockhash, lookup_tables)
+                pack_span.set_attribute("transactions", len(groups))
+
+            logger.info(f"🔥 Burning for {len(usages)} usages in {len(groups)} v0 transaction(s)...")
+
+            transactions = []
+            for i, group in enumerate(groups, 1):
+                sent = await self.sender.send_instructions(
+                    group, [self.authority], label=f"Batch burn {i}/{len(groups)}", lookup_tables=lookup_tables,
+                    debits=[ix.accounts[0].pubkey for ix in group]  # Burned-from accounts
+                )
+                if not sent["success"]:
+                    return {
+                        "success": False,
+                        "error": f"Batch burn transaction failed: {sent['error']}",
+                        "transactions": transactions
+                    }
+                transactions.append({"signature": str(sent["signature"]), "burns": len(group)})
+
+            logger.info(f"✅ Batch burn complete: {len(transactions)} transaction(s)")
+
+            return {
+                "success": True,
+                "burns": len(instructions),
+                "transactions": transactions,
+                "lookup_table": str(self.lookup_tables.address) if lookup_tables else None
+            }
+
+        except Exception as e:
+            logger.error(f"❌ Error in batch burn: {e}", exc_info=True)
+            return {"success": False, "error": str(e)}
+
+    @traced()
+    async def transfer_batch(self, transfers: List[Tuple[int, int, int]]) -> Dict:
+        """
+        Move WaterCredits between farms in as few transactions as possible
+
+        Transfers are packed into v0 transactions like burn_batch and sent in
+        order; on failure the transactions already sent are returned, so the
+        caller knows which transfers went through.
+
+        Args:
+            transfers: (from_farm_id, to_farm_id, amount in base units) triples
+
+        Returns:
+            {
+                "success": True,
+                "transfers": 9,
+                "transactions": [{"signature": "...", "transfers": 9}]
+            }
+        """
+        transactions = []
+        try:
+            self._ensure_balance()
+            if not self.watercredits_mint:
+                return {"success": False, "error": "WaterCredits token not created", "transactions": transactions}
+
+            instructions = [self._transfer_ix(*transfer) for transfer in transfers]
+            lookup_tables = self.lookup_tables.table_accounts()
+
+            with span("tx.pack_v0", instructions=len(instructions)) as pack_span:
+                recent_blockhash = self.client.get_latest_blockhash().value.blockhash
+                groups = self.tx_builder.pack_v0(instructions, recent_blockhash, lookup_tables)
+                pack_span.set_attribute("transactions", len(groups))
+
+            logger.info(f"💸 Transferring {len(transfers)} net amount(s) in {len(groups)} v0 transaction(s)...")
+
+            for i, group in enumerate(groups, 1):
+                sent = await self.sender.send_instructions(
+                    group, [self.authority], label=f"Transfer batch {i}/{len(groups)}", lookup_tables=lookup_tables,
+                    debits=[ix.accounts[0].pubkey for ix in group]  # Source accounts
+                )
+                if not sent["success"]:
+                    return {
+                        "success": False,
+                        "error": f"Transfer transaction failed: {sent['error']}",
+                        "transactions": transactions
+                    }
+                transactions.append({"signature": str(sent["signature"]), "transfers": len(group)})
+
+            logger.info(f"✅ Transfers complete: {len(transactions)} transaction(s)")
+
+            return {
+                "success": True,
+                "transfers": len(instructions),
+                "transactions": transactions
+            }
+
+        except Exception as e:
+            logger.error(f"❌ Error in transfer batch: {e}", exc_info=True)
+            return {"success": False, "error": str(e), "transactions": transactions}
+
+    @traced()
+    async def setup_lookup_table(self, farm_ids: List[int]) -> Dict:
+        """
+        Create (if needed) and extend the address lookup table with the
+        WaterCredits mint, the farms' token accounts and the program IDs
+        """
+        try:
+            self._ensure_balance()
+            if not self.watercredits_mint:
+                return {"success": False, "error": "WaterCredits token not created"}
+
+            created = None
+            if not self.lookup_tables.address:
+                created = await self.lookup_tables.create()
+
+            addresses = [
+                self.watercredits_mint,
+                self.authority.pubkey(),
+                self.TOKEN_PROGRAM_ID,
+                self.ASSOCIATED_TOKEN_PROGRAM_ID,
+                self.SYSTEM_PROGRAM_ID,
+                COMPUTE_BUDGET_PROGRAM_ID,
+            ] + [self.farm_token_account(farm_id) for farm_id in farm_ids]
+
+            signatures = await self.lookup_tables.extend(addresses)
+
+            return {
+                "success": True,
+                "lookup_table": str(self.lookup_tables.address),
+                "created": created is not None,
+                "extend_signatures": signatures,
+                "note": "New addresses become usable one slot after the extend transaction"
+            }
+
+        except Exception as e:
+            logger.error(f"❌ Error setting up lookup table: {e}", exc_info=True)
+            return {"success": False, "error": str(e)}
+
+    @traced()
+    async def post_memo(self, memo: str) -> Dict:
+        """
+        Post a memo signed by the authority (one Memo program instruction)
+
+        Returns:
+            {
+                "success": True,
+                "transaction_signature": "...",
+                "explorer_url": "..."
+            }
+        """
+        try:
+            self._ensure_balance()
+            memo_ix = Instruction(
+                program_id=self.MEMO_PROGRAM_ID,
+                accounts=[AccountMeta(pubkey=self.authority.pubkey(), is_signer=True, is_writable=False)],
+                data=memo.encode()
+            )
+
+            sent = await self.sender.send_instructions([memo_ix], [self.authority], label="Memo")
+            signature = sent.get("signature")
+
+            if sent["success"]:
+                logger.info(f"📝 Memo posted: {signature}")
+                return {
+                    "success": True,
+                    "transaction_signature": str(signature),
+                    "explorer_url": f"https://explorer.solana.com/tx/{signature}?cluster={settings.solana_network}"
+                }
+            else:
+                return {"success": False, "error": sent["error"]}
+
+        except Exception as e:
+            logger.error(f"❌ Error posting memo: {e}", exc_info=True)
+            return {"success": False, "error": str(e)}
+
+    @traced()
     async def get_balance(self, farm_id: int) -> Dict:
         """
         Get real on-chain WaterCredits balance
@@ -391,13 +628,29 @@ class WaterCreditsService:
             if not self.watercredits_mint:
                 return {"success": False, "error": "Token not created", "balance": 0}
 
-            ata = self._get_associated_token_address(
-                self.watercredits_mint,
-                self.authority.pubkey()
-            )
+            ata = self.farm_token_account(farm_id)
+
+            # Served from memory while the websocket subscription is live
+            if self.balances is not None:
+                try:
+                    balance_units = self.balances.balance_units(farm_id)
+                    current_span().set_attribute("source", "cache")
+                    if balance_units is None:
+                        return {"success": False, "error": "Token account not found", "balance": 0}
+                    return {
+                        "success": True,
+                        "farm_id": farm_id,
+                        "balance": balance_units / (10 ** self.DECIMALS),
+                        "token_account": str(ata),
+                        "mint_address": str(self.watercredits_mint),
+                        "source": "cache"
+                    }
+                except KeyError:
+                    pass
 
             # Get token account balance
-            response = self.client.get_token_account_balance(ata)
+            with span("rpc.get_token_account_balance"):
+                response = self.client.get_token_account_balance(ata)
 
             if response.value:
                 balance_units = int(response.value.amount)
@@ -424,6 +677,37 @@ class WaterCreditsService:
         self.watercredits_mint = Pubkey.from_string(mint_address)
         logger.info(f"💧 WaterCredits mint set: {mint_address}")
 
+    def start_balance_subscriber(self, farm_ids: Optional[List[int]] = None):
+        """Start (or restart for a new mint) the websocket balance cache"""
+        farm_ids = farm_ids or list(range(1, 11))
+        if not self.watercredits_mint:
+            logger.warning("⚠️  Balance subscriber not started: WaterCredits token not created")
+            return
+        if self.balances is not None and self.balances.mint == self.watercredits_mint:
+            self.balances.start()
+            return
+
+        previous = self.balances
+        self.balances = BalanceSubscriber(
+            self.client,
+            self.watercredits_mint,
+            {farm_id: self.farm_token_account(farm_id) for farm_id in farm_ids}
+        )
+        if previous is not None:
+            asyncio.create_task(previous.stop())
+        self.balances.start()
+
+    async def stop_balance_subscriber(self):
+        if self.balances is not None:
+            await self.balances.stop()
+
+    def balance_cache_status(self) -> Optional[Dict]:
+        """Status of the balance cache, None if it was never started"""
+        return self.balances.status() if self.balances else None
+
+    def transaction_stats(self) -> Dict:
+        return self.sender.stats()
+
     def get_token_info(self) -> Dict:
         """
         Get complete token information with metadata
@@ -437,9 +721,11 @@ class WaterCreditsService:
                 "image": "...",
                 "mint_address": "...",
                 "metadata_url": "...",
+                "supply": 250000.0,  # From the balance cache, None if not live
                 "supply_model": "deflationary"
             }
         """
+        supply_units = self.balances.supply_units() if self.balances else None
         return {
             "name": self.TOKEN_NAME,
             "symbol": self.TOKEN_SYMBOL,
@@ -448,6 +734,7 @@ class WaterCreditsService:
             "image": self.TOKEN_IMAGE_URL,
             "metadata_url": self.TOKEN_METADATA_URL,
             "mint_address": str(self.watercredits_mint) if self.watercredits_mint else None,
+            "supply": supply_units / (10 ** self.DECIMALS) if supply_units is not None else None,
             "supply_model": "deflationary",
             "use_case": "Water Quota Management",
             "blockchain": "Solana",
@@ -460,7 +747,3 @@ class WaterCreditsService:
                 "Transferable between farms"
             ]
         }
-
-
-# Singleton
-watercredits_service = WaterCreditsService()
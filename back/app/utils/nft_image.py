@@ -4,7 +4,6 @@ NFT Certificate Image Generator
 Создает изображения для NFT сертификатов водной эффективности
 """
 
-from PIL import Image, ImageDraw, ImageFont
 import io
 import base64
 from datetime import datetime
@@ -22,6 +21,9 @@ def generate_certificate_image(
     Returns:
         bytes: PNG изображение в виде байтов
     """
+    # PIL is only needed when minting, so it is not loaded at API startup
+    from PIL import Image, ImageDraw, ImageFont
+
     # Размер изображения
     width, height = 800, 600
 
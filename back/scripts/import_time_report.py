@@ -0,0 +1,90 @@
+"""
+Import-Time Report for the API process
+
+Runs `python -X importtime -c "import app.main"` in a clean process and
+lists the slowest imports. Also checks that the chain stack (solana,
+solders, httpx, PIL) stays out of API startup: app.services.chain loads
+it on first use.
+
+Usage (from back/):
+    python scripts/import_time_report.py
+    python scripts/import_time_report.py --top 40 --budget-ms 600
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import List, Tuple
+
+BACK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Top-level packages that must not be imported by `import app.main`
+LAZY_PACKAGES = ("solana", "solders", "httpx", "PIL", "base58", "websockets")
+
+
+def measure(module: str) -> List[Tuple[str, int, int, int]]:
+    """(module, self µs, cumulative µs, depth) for every import, in import order"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACK_DIR,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        sys.exit(f"import {module} failed:\n{result.stderr}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report import time of the API process")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=25, help="Heaviest modules to list")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="Exit non-zero if the total import time exceeds this")
+    args = parser.parse_args()
+
+    rows = measure(args.module)
+    total_ms = next(cumulative for name, _, cumulative, _ in rows if name == args.module) / 1000
+
+    print(f"Heaviest imports of {args.module} (cumulative ms, self ms):")
+    for name, self_us, cumulative_us, depth in sorted(rows, key=lambda r: -r[2])[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} {self_us / 1000:8.1f}  {'  ' * depth}{name}")
+
+    print("\nBy top-level package (self ms summed over its modules):")
+    packages = {}
+    for name, self_us, _, _ in rows:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    for package, self_us in sorted(packages.items(), key=lambda p: -p[1])[:10]:
+        print(f"  {self_us / 1000:8.1f}  {package}")
+
+    eager = sorted({
+        name.split(".")[0] for name, _, _, _ in rows
+        if name.split(".")[0] in LAZY_PACKAGES
+    })
+
+    print(f"\nTotal: {total_ms:.1f} ms")
+    failed = False
+    if eager:
+        print(f"❌ Loaded eagerly (should be lazy): {', '.join(eager)}")
+        failed = True
+    else:
+        print("✅ Chain stack and PIL are not loaded at startup")
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"❌ Over budget: {total_ms:.1f} ms > {args.budget_ms:.0f} ms")
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
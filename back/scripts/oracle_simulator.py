@@ -13,6 +13,7 @@ ML Oracle Simulator for Water Management System
 
 import httpx
 import random
+import uuid
 import asyncio
 from datetime import datetime
 import logging
@@ -183,6 +184,7 @@ def generate_water_usage_data(farm_id: int) -> dict:
 
     return {
         "farm_id": farm_id,
+        "reading_id": uuid.uuid4().hex,  # Повторная отправка не задвоит показание
         "timestamp": datetime.now().isoformat(),
         "water_liters": water_liters,
         "rainfall_mm": weather["rainfall_mm"],
@@ -0,0 +1,55 @@
+"""
+Usage Partition Maintenance
+
+Moves closed months of water_usage_records into their own SQLite files
+and deletes old archives whole.
+
+Usage (from back/, with PARTITION_DIR set):
+    python scripts/partitions.py list
+    python scripts/partitions.py archive            # all months older than the hot window
+    python scripts/partitions.py archive 2025-08    # one month
+    python scripts/partitions.py drop 2025-01
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.models.database import SessionLocal, UsagePartition, init_db  # noqa: E402
+from app.services.partition_service import PartitionService  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage monthly usage partitions")
+    parser.add_argument("command", choices=["list", "archive", "drop"])
+    parser.add_argument("period", nargs="?", help="Month as YYYY-MM")
+    args = parser.parse_args()
+
+    if args.command != "list" and not PartitionService.enabled():
+        parser.error("PARTITION_DIR is not set")
+    if args.command == "drop" and not args.period:
+        parser.error("drop needs a period")
+
+    init_db()
+    db = SessionLocal()
+    try:
+        if args.command == "list":
+            for partition in db.query(UsagePartition).order_by(UsagePartition.period):
+                print(f"{partition.period}  {partition.records:>10} records  {partition.path}")
+        elif args.command == "archive" and args.period:
+            print(f"{args.period}: moved {PartitionService.archive_period(args.period)} records")
+        elif args.command == "archive":
+            for period, moved in PartitionService.archive_closed_periods(db).items():
+                print(f"{period}: moved {moved} records")
+        else:
+            if not PartitionService.drop_period(db, args.period):
+                sys.exit(f"No archived partition for {args.period}")
+            print(f"{args.period}: dropped")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Replay a captured ingestion trace
+
+Sends the readings of an NDJSON trace (INGEST_CAPTURE_PATH) to another
+backend with their captured spacing, sped up --speed times (1x-1000x).
+Readings of one farm are sent in captured order, one at a time; different
+farms are sent concurrently.
+
+By default each replay is made unique so the target does not ignore it as
+a retry: reading timestamps are all shifted by one offset so the first lands
+at the current time (their spacing stays as captured; --speed only
+compresses the send schedule), and reading IDs get a per-run suffix. Use
+--keep-timestamps / --keep-ids to replay verbatim, e.g. to exercise
+idempotency.
+
+Usage (from back/):
+    python scripts/replay_trace.py data/capture.ndjson --url http://staging:8000 --speed 60
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+MAX_SPEED = 1000.0
+
+
+def read_trace(path: str) -> Iterator[Tuple[float, Dict]]:
+    """(accepted_at, reading) per trace line, in file order"""
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+                yield float(entry["t"]), entry["reading"]
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"⚠️  Skipping malformed line {number}: {e}", file=sys.stderr)
+
+
+class Replayer:
+    """Schedules readings on their (time-warped) offsets, in order per farm"""
+
+    def __init__(self, client: httpx.AsyncClient, url: str, speed: float,
+                 time_shift: Optional[timedelta], id_suffix: Optional[str]):
+        self.client = client
+        self.url = url
+        self.speed = speed
+        self.time_shift = time_shift
+        self.id_suffix = id_suffix
+        self.farms: Dict[int, asyncio.Queue] = {}
+        self.workers: List[asyncio.Task] = []
+        self.statuses: Counter = Counter()
+        self.latencies_ms: List[float] = []
+        self.lags_ms: List[float] = []
+        self.started = 0.0
+
+    def _prepare(self, reading: Dict) -> Dict:
+        reading = dict(reading)
+        if self.time_shift is not None and "timestamp" in reading:
+            timestamp = datetime.fromisoformat(reading["timestamp"]) + self.time_shift
+            reading["timestamp"] = timestamp.isoformat()
+        if self.id_suffix and reading.get("reading_id"):
+            reading["reading_id"] = f"{reading['reading_id']}-{self.id_suffix}"[:128]
+        return reading
+
+    async def _farm_worker(self, queue: asyncio.Queue):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            due, reading = item
+            self.lags_ms.append(max(0.0, time.monotonic() - due) * 1000)
+
+            sent = time.monotonic()
+            try:
+                response = await self.client.post(self.url, json=reading)
+                self.statuses[response.status_code] += 1
+            except httpx.HTTPError as e:
+                self.statuses[type(e).__name__] += 1
+            self.latencies_ms.append((time.monotonic() - sent) * 1000)
+
+    def _queue(self, farm_id: int) -> asyncio.Queue:
+        queue = self.farms.get(farm_id)
+        if queue is None:
+            queue = self.farms[farm_id] = asyncio.Queue()
+            self.workers.append(asyncio.create_task(self._farm_worker(queue)))
+        return queue
+
+    async def run(self, trace: Iterator[Tuple[float, Dict]]) -> int:
+        first_t = None
+        count = 0
+        self.started = time.monotonic()
+
+        for t, reading in trace:
+            if first_t is None:
+                first_t = t
+            due = self.started + max(0.0, t - first_t) / self.speed
+
+            delay = due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            # Per-farm FIFO keeps each farm's readings in captured order
+            await self._queue(reading.get("farm_id")).put((due, self._prepare(reading)))
+            count += 1
+
+        for queue in self.farms.values():
+            await queue.put(None)
+        await asyncio.gather(*self.workers)
+        return count
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Replay a captured ingestion trace")
+    parser.add_argument("trace", help="NDJSON trace written with INGEST_CAPTURE_PATH")
+    parser.add_argument("--url", default=os.getenv("API_BASE_URL", "http://localhost:8000"),
+                        help="Backend base URL")
+    parser.add_argument("--speed", type=float, default=1.0, help="Time warp factor (1-1000)")
+    parser.add_argument("--keep-timestamps", action="store_true",
+                        help="Send reading timestamps as captured")
+    parser.add_argument("--keep-ids", action="store_true",
+                        help="Send reading IDs as captured (the target treats repeats as retries)")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    if not 1.0 <= args.speed <= MAX_SPEED:
+        parser.error(f"--speed must be between 1 and {MAX_SPEED:.0f}")
+    if not os.path.exists(args.trace):
+        parser.error(f"No such trace: {args.trace}")
+
+    time_shift = None
+    if not args.keep_timestamps:
+        first = next((r for _, r in read_trace(args.trace) if "timestamp" in r), None)
+        if first:
+            time_shift = datetime.now() - datetime.fromisoformat(first["timestamp"])
+
+    url = args.url.rstrip("/") + "/api/water-usage"
+    id_suffix = None if args.keep_ids else f"r{uuid.uuid4().hex[:8]}"
+
+    print(f"▶️  Replaying {args.trace} to {url} at {args.speed:g}x")
+    limits = httpx.Limits(max_connections=100, max_keepalive_connections=100)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        replayer = Replayer(client, url, args.speed, time_shift, id_suffix)
+        count = await replayer.run(read_trace(args.trace))
+
+    elapsed = time.monotonic() - replayer.started
+    print(f"\nSent {count} readings for {len(replayer.farms)} farms in {elapsed:.1f}s "
+          f"({count / elapsed if elapsed else 0:.1f}/s)")
+    print("Responses: " + ", ".join(f"{status}: {n}" for status, n in sorted(replayer.statuses.items(), key=str)))
+    if replayer.latencies_ms:
+        print(f"Latency ms: p50 {statistics.median(replayer.latencies_ms):.1f}, "
+              f"p95 {percentile(replayer.latencies_ms, 95):.1f}, "
+              f"p99 {percentile(replayer.latencies_ms, 99):.1f}")
+        print(f"Schedule lag ms: p50 {statistics.median(replayer.lags_ms):.1f}, "
+              f"p99 {percentile(replayer.lags_ms, 99):.1f} "
+              "(high lag: the target or a farm's previous reading held up sends)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""
+Load generator for the binary sensor listener
+
+Sends synthetic readings in the sensor listener's binary format
+(app/services/sensor_listener.py) over UDP or TCP, then prints the
+listener counters from /api/health to compare what was sent and received.
+
+Usage (from back/), against a backend started with SENSOR_UDP_PORT / SENSOR_TCP_PORT:
+    python scripts/sensor_load.py --tcp 127.0.0.1:9601 --readings 200000
+    python scripts/sensor_load.py --udp 127.0.0.1:9600 --readings 50000 --per-datagram 40
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import sys
+import time
+import urllib.request
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.services.sensor_listener import encode_reading  # noqa: E402
+
+
+def records(count: int, farms: int):
+    """Distinct readings spread over farms, one second apart per farm"""
+    start = datetime.now() - timedelta(seconds=count)
+    for i in range(count):
+        yield encode_reading(
+            farm_id=1 + i % farms,
+            timestamp=start + timedelta(seconds=i // farms, milliseconds=i % 1000),
+            water_liters=round(random.uniform(1.0, 50.0), 2),
+            rainfall_mm=None if i % 4 else round(random.uniform(0.0, 5.0), 1),
+            temperature_c=round(random.uniform(10.0, 35.0), 1),
+            humidity_percent=round(random.uniform(20.0, 90.0), 1),
+        )
+
+
+def address(value: str):
+    host, _, port = value.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Binary sensor listener load generator")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--udp", type=address, help="host:port of SENSOR_UDP_PORT")
+    target.add_argument("--tcp", type=address, help="host:port of SENSOR_TCP_PORT")
+    parser.add_argument("--readings", type=int, default=100000)
+    parser.add_argument("--farms", type=int, default=10)
+    parser.add_argument("--per-datagram", type=int, default=40, help="Records per UDP datagram")
+    parser.add_argument("--rate", type=float, default=0, help="Readings per second (0: as fast as possible)")
+    parser.add_argument("--url", default=os.getenv("API_BASE_URL", "http://localhost:8000"),
+                        help="Backend base URL for the listener counters")
+    args = parser.parse_args()
+
+    payload = list(records(args.readings, args.farms))
+    started = time.perf_counter()
+
+    def pace(sent: int):
+        if args.rate:
+            delay = started + sent / args.rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    step = args.per_datagram if args.udp else 1000
+    if args.tcp:
+        with socket.create_connection(args.tcp) as sock:
+            for i in range(0, len(payload), step):
+                sock.sendall(b"".join(payload[i:i + step]))
+                pace(i + step)
+    else:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            for i in range(0, len(payload), step):
+                sock.sendto(b"".join(payload[i:i + step]), args.udp)
+                pace(i + step)
+
+    elapsed = time.perf_counter() - started
+    print(f"Sent {args.readings} readings in {elapsed:.2f}s ({args.readings / elapsed:,.0f}/s)")
+
+    # Give the writer time to drain, then show what the listener made of it
+    time.sleep(2)
+    try:
+        with urllib.request.urlopen(args.url.rstrip("/") + "/api/health", timeout=10) as response:
+            print("Listener:", json.dumps(json.load(response).get("sensor_listener"), indent=2))
+    except OSError as e:
+        print(f"⚠️  Could not read listener counters: {e}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+#!/bin/sh
+# Start the API.
+#
+# WORKERS=1 (default): one uvicorn process that holds the signer itself.
+# WORKERS>1: one signer process owns the authority key and sends every chain
+# write; the uvicorn workers forward chain calls to it over a unix socket and
+# share cache invalidation through an mmap'd file.
+# SIGNER_AUTHKEY must be set; the signer refuses to start without it.
+set -e
+
+WORKERS="${WORKERS:-1}"
+
+if [ "$WORKERS" -le 1 ]; then
+    exec uvicorn app.main:app --host 0.0.0.0 --port 8000
+fi
+
+export SIGNER_SOCKET="${SIGNER_SOCKET:-/tmp/sucount-signer.sock}"
+export SHARED_STATE_PATH="${SHARED_STATE_PATH:-/tmp/sucount-generations.bin}"
+
+python -m app.services.signer &
+SIGNER_PID=$!
+trap 'kill $SIGNER_PID 2>/dev/null' EXIT INT TERM
+
+# Wait for the signer socket before accepting traffic; the signer migrates
+# and backfills the database before it listens
+for _ in $(seq 1 60); do
+    [ -S "$SIGNER_SOCKET" ] && break
+    kill -0 $SIGNER_PID 2>/dev/null || { echo "Signer process exited" >&2; exit 1; }
+    sleep 0.5
+done
+
+uvicorn app.main:app --host 0.0.0.0 --port 8000 --workers "$WORKERS"
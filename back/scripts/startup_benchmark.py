@@ -0,0 +1,94 @@
+"""
+Cold-Start Benchmark for the API process
+
+Starts uvicorn in a new process and times how long it takes until
+`/api/health` first answers. Each run uses a fresh SQLite database unless
+DATABASE_URL is given, like a new container.
+
+Usage (from back/):
+    python scripts/startup_benchmark.py
+    python scripts/startup_benchmark.py --runs 10 --budget 1.0
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BACK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_health(timeout: float, database_url: str = None) -> float:
+    """Seconds from starting uvicorn until /api/health answers 200"""
+    port = free_port()
+    env = dict(os.environ)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env["DATABASE_URL"] = database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+        log = open(os.path.join(tmp, "uvicorn.log"), "w+")
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app",
+             "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+            cwd=BACK_DIR,
+            env=env,
+            stdout=log,
+            stderr=subprocess.STDOUT
+        )
+        try:
+            while time.perf_counter() - started < timeout:
+                if process.poll() is not None:
+                    log.seek(0)
+                    sys.exit(f"uvicorn exited with code {process.returncode}:\n{log.read()[-2000:]}")
+                try:
+                    with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/health", timeout=1) as response:
+                        if response.status == 200:
+                            return time.perf_counter() - started
+                except OSError:
+                    time.sleep(0.01)
+            sys.exit(f"/api/health did not answer within {timeout:.0f}s")
+        finally:
+            process.terminate()
+            process.wait()
+            log.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure exec-to-healthy time of the API")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=1.0,
+                        help="Seconds; exit non-zero if the median run exceeds it")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--database-url", default=None,
+                        help="Use this database instead of a fresh one per run")
+    args = parser.parse_args()
+
+    timings = []
+    for run in range(1, args.runs + 1):
+        elapsed = time_to_health(args.timeout, args.database_url)
+        timings.append(elapsed)
+        print(f"Run {run}: {elapsed * 1000:.0f} ms")
+
+    median = statistics.median(timings)
+    print(f"\nmin {min(timings) * 1000:.0f} ms, median {median * 1000:.0f} ms, max {max(timings) * 1000:.0f} ms")
+
+    if median > args.budget:
+        print(f"❌ Median cold start is over the {args.budget:.1f}s budget")
+        sys.exit(1)
+    print(f"✅ Within the {args.budget:.1f}s budget")
+
+
+if __name__ == "__main__":
+    main()
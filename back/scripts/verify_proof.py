@@ -0,0 +1,137 @@
+"""
+Verify a usage reading against its on-chain Merkle anchor
+
+Checks a proof from GET /api/water-usage/proof without trusting the
+backend: hashes the leaf, folds the proof up to the root and compares it
+with the memo transaction fetched straight from Solana RPC.
+
+Checks, in order:
+  1. the proof folds the leaf up to the stated Merkle root;
+  2. the anchor memo names that root;
+  3. (unless --offline) the anchor transaction is confirmed and carries
+     exactly that memo in a Memo program instruction, signed by --authority
+     if given.
+
+Usage (from back/):
+    curl -s "http://localhost:8000/api/water-usage/proof?record_id=42" > proof.json
+    python scripts/verify_proof.py proof.json --rpc https://api.devnet.solana.com
+    python scripts/verify_proof.py --url http://localhost:8000 --record-id 42 --offline
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Dict, Optional
+
+import base58
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.core.merkle import root_from_proof  # noqa: E402 (standard library only)
+
+MEMO_PROGRAM_IDS = {
+    "MemoSq4gqABAXKb96qnH8TysNcWxMyWCqXgDLGmfcHr",
+    "Memo1UhkJRfHyvLMcVucJwxXeuD728EqVDDwQDxFMNo",
+}
+
+
+def fetch_proof(args) -> Dict:
+    if args.proof:
+        with open(args.proof) as f:
+            return json.load(f)
+    params = {"record_id": args.record_id} if args.record_id is not None else {"reading_key": args.reading_key}
+    response = httpx.get(args.url.rstrip("/") + "/api/water-usage/proof", params=params, timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+
+def chain_memo(rpc_url: str, signature: str) -> Dict:
+    """Memo text and signers of a confirmed transaction, straight from RPC"""
+    response = httpx.post(rpc_url, json={
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "getTransaction",
+        "params": [signature, {"encoding": "json", "commitment": "confirmed",
+                               "maxSupportedTransactionVersion": 0}],
+    }, timeout=30)
+    response.raise_for_status()
+    tx = response.json().get("result")
+    if tx is None:
+        raise ValueError("Transaction not found or not confirmed")
+    if tx["meta"]["err"] is not None:
+        raise ValueError(f"Transaction failed on-chain: {tx['meta']['err']}")
+
+    message = tx["transaction"]["message"]
+    keys = message["accountKeys"]
+    signers = keys[:message["header"]["numRequiredSignatures"]]
+    memos = [
+        base58.b58decode(ix["data"]).decode()
+        for ix in message["instructions"]
+        if keys[ix["programIdIndex"]] in MEMO_PROGRAM_IDS
+    ]
+    return {"memos": memos, "signers": signers, "slot": tx["slot"], "block_time": tx.get("blockTime")}
+
+
+def fail(message: str):
+    print(f"❌ {message}")
+    sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify a usage reading against its on-chain anchor")
+    parser.add_argument("proof", nargs="?", help="Proof JSON saved from /api/water-usage/proof")
+    parser.add_argument("--url", default=os.getenv("API_BASE_URL", "http://localhost:8000"),
+                        help="Backend to fetch the proof from when no file is given")
+    parser.add_argument("--record-id", type=int)
+    parser.add_argument("--reading-key")
+    parser.add_argument("--rpc", default=os.getenv("SOLANA_RPC_URL", "https://api.devnet.solana.com"))
+    parser.add_argument("--authority", help="Require the anchor to be signed by this public key")
+    parser.add_argument("--offline", action="store_true", help="Check the proof and memo only, not the chain")
+    args = parser.parse_args()
+
+    if not args.proof and args.record_id is None and not args.reading_key:
+        parser.error("Give a proof file, --record-id or --reading-key")
+
+    proof = fetch_proof(args)
+    anchor = proof["anchor"]
+
+    print("Reading:")
+    for field, value in json.loads(proof["leaf"]).items():
+        print(f"  {field}: {value}")
+
+    root = root_from_proof(proof["leaf"].encode(), proof["proof"])
+    if root.hex() != proof["merkle_root"]:
+        fail(f"Proof does not lead to the Merkle root (got {root.hex()})")
+    print(f"✅ Proof ({len(proof['proof'])} steps) leads to root {root.hex()}")
+
+    memo: Optional[Dict] = json.loads(anchor["memo"])
+    if memo.get("root") != root.hex():
+        fail("Anchor memo does not name this root")
+    print(f"✅ Anchor memo names the root (window {memo['window']}, {memo['leaves']} readings)")
+
+    if args.offline:
+        print("ℹ️  Offline: on-chain memo not checked")
+        return
+
+    signature = anchor.get("transaction_signature")
+    if not signature:
+        fail(f"Anchor not posted yet (status: {anchor['status']})")
+
+    try:
+        onchain = chain_memo(args.rpc, signature)
+    except (httpx.HTTPError, ValueError) as e:
+        fail(f"Could not load anchor transaction {signature}: {e}")
+
+    if anchor["memo"] not in onchain["memos"]:
+        fail(f"Transaction {signature} does not carry the anchor memo")
+    if args.authority and args.authority not in onchain["signers"]:
+        fail(f"Transaction not signed by {args.authority} (signers: {', '.join(onchain['signers'])})")
+
+    print(f"✅ Memo found on-chain in {signature} (slot {onchain['slot']}, signed by {onchain['signers'][0]})")
+    print("Reading verified.")
+
+
+if __name__ == "__main__":
+    main()
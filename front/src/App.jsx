@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { api } from './services/api';
 import Landing from './components/Landing';
 import RoleSelection from './components/RoleSelection';
@@ -7,6 +7,26 @@ import ModernProviderDashboard from './components/ProviderDashboard.modern';
 import { Icon } from './components/Icons';
 import { LoadingSpinner } from './components/UI';
 
+// The dashboard returns this much history; polled readings are kept to the same window
+const HISTORY_DAYS = 30;
+
+// Replace changed farms and append new ones, ordered by farm ID like the full dashboard
+const mergeFarms = (farms, changed) => {
+  const byId = new Map(farms.map(farm => [farm.farm_id, farm]));
+  changed.forEach(farm => byId.set(farm.farm_id, farm));
+  return [...byId.values()].sort((a, b) => a.farm_id - b.farm_id);
+};
+
+// Newest-first history within the window; backdated readings land in timestamp order
+const mergeHistory = (history, added) => {
+  const cutoff = Date.now() - HISTORY_DAYS * 24 * 60 * 60 * 1000;
+  return [...history, ...added]
+    .map(record => [new Date(record.timestamp).getTime(), record])
+    .filter(([time]) => time >= cutoff)
+    .sort((a, b) => b[0] - a[0])
+    .map(([, record]) => record);
+};
+
 function App() {
   const [showLanding, setShowLanding] = useState(true); // Show landing first
   const [role, setRole] = useState(null); // 'farmer' or 'provider'
@@ -14,6 +34,7 @@ function App() {
   const [dashboardData, setDashboardData] = useState(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
+  const cursorRef = useRef(null);
 
   // Load dashboard data
   const loadDashboard = async () => {
@@ -21,6 +42,7 @@ function App() {
       setLoading(true);
       setError(null);
       const data = await api.getDashboard();
+      cursorRef.current = data.cursor;
       setDashboardData(data);
     } catch (err) {
       console.error('Failed to load dashboard:', err);
@@ -30,11 +52,38 @@ function App() {
     }
   };
 
+  // Fetch only what changed since the last cursor and merge it in
+  const pollDashboard = async () => {
+    if (cursorRef.current === null) {
+      return loadDashboard();
+    }
+    try {
+      const delta = await api.getDashboardDelta(cursorRef.current);
+      cursorRef.current = delta.cursor;
+      setDashboardData(prev => {
+        if (!prev) return prev;
+        return {
+          ...prev,
+          farms: mergeFarms(prev.farms, delta.farms),
+          total_water_used: delta.total_water_used,
+          total_limit: delta.total_limit,
+          overall_status: delta.overall_status,
+          last_updated: delta.last_updated,
+          water_usage_history: mergeHistory(prev.water_usage_history, delta.water_usage_history),
+          cursor: delta.cursor,
+        };
+      });
+    } catch (err) {
+      console.error('Failed to poll dashboard:', err);
+    }
+  };
+
   // Auto-refresh every 30 seconds when role is selected
   useEffect(() => {
     if (role) {
+      cursorRef.current = null;
       loadDashboard();
-      const interval = setInterval(loadDashboard, 30000);
+      const interval = setInterval(pollDashboard, 30000);
       return () => clearInterval(interval);
     }
   }, [role]);
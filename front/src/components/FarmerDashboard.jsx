@@ -41,7 +41,7 @@ function FarmerDashboard({ farmId, dashboardData, onRefresh, onBack }) {
 
     try {
       alert('Minting NFT on Solana Devnet... This may take a few seconds.');
-      const nft = await api.mintNFT(farmId, farmStats.total_water_used, 0.95);
+      const nft = await api.mintNFT(farmId, farmStats.total_water_used);
 
       // Reload NFTs from database
       await loadNFTs();
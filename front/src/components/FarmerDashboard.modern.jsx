@@ -75,7 +75,7 @@ function ModernFarmerDashboard({ farmId, dashboardData, onRefresh, onBack }) {
     if (!farmStats) return;
     try {
       setLoading(true);
-      const nft = await api.mintNFT(farmId, farmStats.total_water_used, 0.95);
+      const nft = await api.mintNFT(farmId, farmStats.total_water_used);
       await loadNFTs();
       alert(`NFT Certificate minted!\n\nMint Address: ${nft.nft_address}`);
     } catch (err) {
@@ -82,7 +82,7 @@ function ImprovedFarmerDashboard({ farmId, dashboardData, onRefresh, onBack }) {
       setLoading(true);
       alert('Minting NFT Certificate on Solana...');
 
-      const nft = await api.mintNFT(farmId, farmStats.total_water_used, 0.95);
+      const nft = await api.mintNFT(farmId, farmStats.total_water_used);
       await loadNFTs();
 
       alert(`✅ NFT minted!\n\nMint Address: ${nft.nft_address}`);
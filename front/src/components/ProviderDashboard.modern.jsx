@@ -1,10 +1,22 @@
+import { useState, useEffect } from 'react';
 import { BarChart, Bar, LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer, PieChart, Pie, Cell } from 'recharts';
 import { Icon } from './Icons';
 import { Button, Card, StatCard, Badge, EmptyState, Progress } from './UI';
+import { api } from '../services/api';
 
 const CHART_COLORS = ['#3b82f6', '#10b981', '#f59e0b', '#ef4444', '#8b5cf6', '#ec4899', '#14b8a6', '#f97316', '#06b6d4', '#84cc16'];
 
 function ModernProviderDashboard({ dashboardData, onRefresh, onBack }) {
+  const [forecasts, setForecasts] = useState({});
+
+  // Refresh projections whenever new dashboard data arrives
+  useEffect(() => {
+    if (!dashboardData) return;
+    api.getForecast()
+      .then(report => setForecasts(Object.fromEntries(report.farms.map(f => [f.farm_id, f]))))
+      .catch(err => console.error('Failed to load forecast:', err));
+  }, [dashboardData]);
+
   if (!dashboardData) {
     return (
       <div className="min-h-screen flex items-center justify-center bg-gray-50">
@@ -207,11 +219,13 @@ function ModernProviderDashboard({ dashboardData, onRefresh, onBack }) {
                     <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase">Usage</th>
                     <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase">Tokens</th>
                     <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase">Status</th>
+                    <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase">Forecast</th>
                   </tr>
                 </thead>
                 <tbody className="bg-white divide-y divide-gray-100">
                   {farms.map(farm => {
                     const farmHealthy = farm.status === 'economy';
+                    const forecast = forecasts[farm.farm_id];
                     return (
                       <tr key={farm.farm_id} className="hover:bg-gray-50 transition-colors">
                         <td className="px-6 py-4 whitespace-nowrap">
@@ -246,6 +260,17 @@ function ModernProviderDashboard({ dashboardData, onRefresh, onBack }) {
                             {farm.status.toUpperCase()}
                           </Badge>
                         </td>
+                        <td className="px-6 py-4 whitespace-nowrap text-sm">
+                          {!forecast ? (
+                            <span className="text-gray-400">—</span>
+                          ) : forecast.limit_crossing_at && farmHealthy ? (
+                            <Badge variant="warning">
+                              Over limit by {new Date(forecast.limit_crossing_at).toLocaleDateString()}
+                            </Badge>
+                          ) : (
+                            <span className="text-gray-500">{forecast.projected_percentage.toFixed(0)}% projected</span>
+                          )}
+                        </td>
                       </tr>
                     );
                   })}
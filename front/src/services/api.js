@@ -21,9 +21,15 @@ const apiClient = axios.create({
 });
 
 export const api = {
-  // Dashboard data (all farms)
-  getDashboard: async () => {
-    const response = await apiClient.get('/dashboard');
+  // Dashboard data (all farms); layout 'columnar' returns history as parallel arrays
+  getDashboard: async (layout = 'rows') => {
+    const response = await apiClient.get('/dashboard', { params: { layout } });
+    return response.data;
+  },
+
+  // Farms and history changed since a cursor from a previous dashboard response
+  getDashboardDelta: async (since) => {
+    const response = await apiClient.get('/dashboard', { params: { since } });
     return response.data;
   },
 
@@ -39,14 +45,26 @@ export const api = {
     return response.data;
   },
 
-  // Mint NFT certificate
-  mintNFT: async (farmId, waterConsumed, efficiencyScore = 0.95) => {
+  // Mint NFT certificate (efficiency is scored server-side)
+  mintNFT: async (farmId, waterConsumed) => {
     const response = await apiClient.post('/nft/mint', null, {
-      params: { farm_id: farmId, water_consumed: waterConsumed, efficiency_score: efficiencyScore }
+      params: { farm_id: farmId, water_consumed: waterConsumed }
     });
     return response.data;
   },
 
+  // Efficiency scores for all farms
+  getEfficiency: async (period) => {
+    const response = await apiClient.get('/efficiency', { params: { period } });
+    return response.data;
+  },
+
+  // Quota burn-down forecast (all farms)
+  getForecast: async () => {
+    const response = await apiClient.get('/forecast');
+    return response.data;
+  },
+
   // Get farm NFTs
   getFarmNFTs: async (farmId) => {
     const response = await apiClient.get(`/farms/${farmId}/nfts`);